@@ -0,0 +1,513 @@
+"""In-process caches for data that is expensive to fetch."""
+import collections
+import contextlib
+import functools
+import hashlib
+import logging
+import os
+import pathlib
+import tempfile
+import threading
+import time
+from collections import abc
+from typing import NamedTuple
+
+from linguaweb_api.core import config
+
+settings = config.get_settings()
+LOGGER_NAME = settings.LOGGER_NAME
+AUDIO_CACHE_MEMORY_SIZE = settings.AUDIO_CACHE_MEMORY_SIZE
+AUDIO_CACHE_DIRECTORY = settings.AUDIO_CACHE_DIRECTORY
+AUDIO_CACHE_DISK_SIZE = settings.AUDIO_CACHE_DISK_SIZE
+TRANSCRIPTION_CACHE_SIZE = settings.TRANSCRIPTION_CACHE_SIZE
+TRANSCRIPTION_CACHE_TTL = settings.TRANSCRIPTION_CACHE_TTL
+
+logger = logging.getLogger(LOGGER_NAME)
+
+_TEMPORARY_PREFIX = ".tmp"
+
+
+def content_digest(data: bytes) -> str:
+    """Returns the digest used to identify cached content.
+
+    This is the MD5 hex digest, which matches the ETag that S3 assigns to
+    objects uploaded in a single part.
+
+    Args:
+        data: The content.
+
+    Returns:
+        The hex digest of the content.
+    """
+    return hashlib.md5(data, usedforsecurity=False).hexdigest()
+
+
+class MemoryCache:
+    """A thread-safe least-recently-used cache with a budget in bytes.
+
+    Attributes:
+        max_size: The maximum total size of the cached values in bytes.
+        size: The current total size of the cached values in bytes.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        """Initializes a new instance of the MemoryCache class.
+
+        Args:
+            max_size: The maximum total size of the cached values in bytes.
+        """
+        self.max_size = max_size
+        self.size = 0
+        self._entries: collections.OrderedDict[str, bytes] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        """Returns a cached value and marks it as recently used.
+
+        Args:
+            key: The key of the value.
+
+        Returns:
+            The value, or None if it is not cached.
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: bytes) -> None:
+        """Caches a value, evicting the least recently used values if needed.
+
+        Values larger than the budget are not cached.
+
+        Args:
+            key: The key of the value.
+            value: The value to cache.
+        """
+        if len(value) > self.max_size:
+            return
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = value
+            self.size += len(value)
+            while self.size > self.max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def pop(self, key: str) -> None:
+        """Removes a value from the cache, if present.
+
+        Args:
+            key: The key of the value.
+        """
+        with self._lock:
+            self._pop(key)
+
+    def _pop(self, key: str) -> None:
+        """Removes a value from the cache; the lock must be held."""
+        value = self._entries.pop(key, None)
+        if value is not None:
+            self.size -= len(value)
+
+
+class ExpiringCache:
+    """A thread-safe least-recently-used cache of strings that expire.
+
+    Attributes:
+        max_entries: The maximum number of cached values.
+        ttl: Seconds after which a cached value expires.
+        hits: The number of lookups answered by the cache.
+        misses: The number of lookups that were not cached or expired.
+    """
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        """Initializes a new instance of the ExpiringCache class.
+
+        Args:
+            max_entries: The maximum number of cached values.
+            ttl: Seconds after which a cached value expires.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: collections.OrderedDict[
+            str,
+            tuple[float, str],
+        ] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Returns the number of cached values, including expired ones."""
+        return len(self._entries)
+
+    def get(self, key: str) -> str | None:
+        """Returns a cached value and marks it as recently used.
+
+        Args:
+            key: The key of the value.
+
+        Returns:
+            The value, or None if it is not cached or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, value: str) -> None:
+        """Caches a value, evicting the least recently used values if needed.
+
+        Args:
+            key: The key of the value.
+            value: The value to cache.
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class DiskEntry(NamedTuple):
+    """A file in the disk cache."""
+
+    path: pathlib.Path
+    size: int
+    digest: str
+
+
+class DiskCache:
+    """A thread-safe least-recently-used cache of files with a budget in bytes.
+
+    Files are named after the hash of their key and their content digest. The
+    index of the cache is rebuilt from the filenames on initialization, such
+    that the cache survives restarts without reading the cached files.
+
+    Attributes:
+        directory: The directory in which the files are stored.
+        max_size: The maximum total size of the cached files in bytes.
+        size: The current total size of the cached files in bytes.
+    """
+
+    def __init__(self, directory: pathlib.Path | str, max_size: int) -> None:
+        """Initializes a new instance of the DiskCache class.
+
+        Args:
+            directory: The directory in which the files are stored.
+            max_size: The maximum total size of the cached files in bytes.
+        """
+        self.directory = pathlib.Path(directory)
+        self.max_size = max_size
+        self.size = 0
+        self._entries: collections.OrderedDict[
+            str,
+            DiskEntry,
+        ] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = sorted(self.directory.iterdir(), key=lambda path: path.stat().st_mtime)
+        with self._lock:
+            for file in files:
+                if file.name.startswith(_TEMPORARY_PREFIX):
+                    file.unlink(missing_ok=True)
+                    continue
+                name, _, digest = file.name.partition(".")
+                path = file
+                if not digest:
+                    digest = content_digest(file.read_bytes())
+                    path = file.replace(self.directory / f"{name}.{digest}")
+                self._remove(name)
+                size = path.stat().st_size
+                self._entries[name] = DiskEntry(path, size, digest)
+                self.size += size
+            self._evict()
+
+    def get(self, key: str) -> DiskEntry | None:
+        """Returns a cached file and marks it as recently used.
+
+        Args:
+            key: The key of the file.
+
+        Returns:
+            The cached file, or None if it is not cached.
+        """
+        name = self._filename(key)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                return None
+            if not entry.path.exists():
+                self._remove(name)
+                return None
+            self._entries.move_to_end(name)
+            return entry
+
+    def put(self, key: str, value: bytes) -> None:
+        """Caches a value as a file.
+
+        Args:
+            key: The key of the file.
+            value: The contents of the file.
+        """
+        with self.writer(key) as file:
+            file.write(value)
+
+    def writer(self, key: str) -> "_DiskCacheWriter":
+        """Returns a context manager that writes a file into the cache.
+
+        The file is written to a temporary location and only moved into the
+        cache once the context exits without an exception.
+
+        Args:
+            key: The key of the file.
+
+        Returns:
+            The writer context manager.
+        """
+        return _DiskCacheWriter(self, key)
+
+    def pop(self, key: str) -> None:
+        """Removes a file from the cache, if present.
+
+        Args:
+            key: The key of the file.
+        """
+        name = self._filename(key)
+        with self._lock:
+            self._remove(name)
+
+    def _commit(self, key: str, temporary_path: pathlib.Path, digest: str) -> None:
+        """Moves a fully written temporary file into the cache.
+
+        Args:
+            key: The key of the file.
+            temporary_path: The path of the temporary file.
+            digest: The content digest of the file.
+        """
+        name = self._filename(key)
+        size = temporary_path.stat().st_size
+        if size > self.max_size:
+            temporary_path.unlink(missing_ok=True)
+            return
+        with self._lock:
+            self._remove(name)
+            path = temporary_path.replace(self.directory / f"{name}.{digest}")
+            self._entries[name] = DiskEntry(path, size, digest)
+            self.size += size
+            self._evict()
+
+    def _evict(self) -> None:
+        """Evicts the least recently used files; the lock must be held."""
+        while self.size > self.max_size and self._entries:
+            name = next(iter(self._entries))
+            self._remove(name)
+
+    def _remove(self, name: str) -> None:
+        """Removes a file from the cache; the lock must be held."""
+        entry = self._entries.pop(name, None)
+        if entry is not None:
+            self.size -= entry.size
+            entry.path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _filename(key: str) -> str:
+        """Returns the filename of a key."""
+        return hashlib.sha256(key.encode()).hexdigest()
+
+
+class _DiskCacheWriter:
+    """Context manager that writes a file into a disk cache."""
+
+    def __init__(self, cache: DiskCache, key: str) -> None:
+        """Initializes a new instance of the _DiskCacheWriter class.
+
+        Args:
+            cache: The disk cache to write to.
+            key: The key of the file.
+        """
+        self._cache = cache
+        self._key = key
+        descriptor, path = tempfile.mkstemp(
+            prefix=_TEMPORARY_PREFIX,
+            dir=cache.directory,
+        )
+        self._path = pathlib.Path(path)
+        self._file = os.fdopen(descriptor, "wb")
+        self._hash = hashlib.md5(usedforsecurity=False)
+
+    def __enter__(self) -> "_DiskCacheWriter":
+        """Returns the writer."""
+        return self
+
+    def __exit__(self, exception_type: type[BaseException] | None, *_: object) -> None:
+        """Commits the file, or discards it if an exception was raised."""
+        self._file.close()
+        if exception_type is None:
+            self._cache._commit(  # noqa: SLF001
+                self._key,
+                self._path,
+                self._hash.hexdigest(),
+            )
+        else:
+            self._path.unlink(missing_ok=True)
+
+    def write(self, data: bytes) -> None:
+        """Writes data to the file.
+
+        Args:
+            data: The data to write.
+        """
+        self._file.write(data)
+        self._hash.update(data)
+
+
+class AudioCache:
+    """A two-tier cache for audio files, keyed by their S3 key.
+
+    The memory tier serves the most frequently requested audio directly from
+    memory, the disk tier serves files that can be sent with sendfile. Either
+    tier warms the other one on a hit.
+
+    Attributes:
+        memory: The memory tier, or None if disabled.
+        disk: The disk tier, or None if disabled.
+    """
+
+    def __init__(
+        self,
+        memory_size: int = AUDIO_CACHE_MEMORY_SIZE,
+        directory: pathlib.Path | str | None = AUDIO_CACHE_DIRECTORY,
+        disk_size: int = AUDIO_CACHE_DISK_SIZE,
+    ) -> None:
+        """Initializes a new instance of the AudioCache class.
+
+        Args:
+            memory_size: The budget of the memory tier in bytes, 0 disables it.
+            directory: The directory of the disk tier, None disables it.
+            disk_size: The budget of the disk tier in bytes.
+        """
+        self.memory = MemoryCache(memory_size) if memory_size > 0 else None
+        self.disk = DiskCache(directory, disk_size) if directory else None
+
+    def get_bytes(self, key: str) -> bytes | None:
+        """Returns audio from the memory tier.
+
+        Args:
+            key: The S3 key of the audio.
+
+        Returns:
+            The audio, or None if it is not in the memory tier.
+        """
+        return self.memory.get(key) if self.memory else None
+
+    def get_file(self, key: str) -> DiskEntry | None:
+        """Returns audio from the disk tier.
+
+        Args:
+            key: The S3 key of the audio.
+
+        Returns:
+            The cached file, or None if it is not in the disk tier.
+        """
+        return self.disk.get(key) if self.disk else None
+
+    def warm_disk(self, key: str, data: bytes) -> None:
+        """Writes audio served from memory to the disk tier, if missing.
+
+        Args:
+            key: The S3 key of the audio.
+            data: The audio.
+        """
+        if self.disk and not self.disk.get(key):
+            self.disk.put(key, data)
+
+    def warm_memory(self, key: str, path: pathlib.Path) -> None:
+        """Reads audio served from disk into the memory tier.
+
+        Args:
+            key: The S3 key of the audio.
+            path: The path to the audio in the disk tier.
+        """
+        if not self.memory:
+            return
+        try:
+            self.memory.put(key, path.read_bytes())
+        except FileNotFoundError:
+            logger.debug("Audio was evicted from disk before warming memory.")
+
+    def tee(
+        self,
+        key: str,
+        chunks: abc.Iterable[bytes],
+    ) -> abc.Generator[bytes, None, None]:
+        """Yields chunks of audio while storing them in both tiers.
+
+        The audio is only cached if all chunks were consumed.
+
+        Args:
+            key: The S3 key of the audio.
+            chunks: The chunks of the audio.
+
+        Returns:
+            An iterator over the chunks of the audio.
+        """
+        data: bytearray | None = bytearray() if self.memory else None
+        writer: _DiskCacheWriter | contextlib.nullcontext[None] = (
+            self.disk.writer(key) if self.disk else contextlib.nullcontext()
+        )
+        with writer:
+            for chunk in chunks:
+                if isinstance(writer, _DiskCacheWriter):
+                    writer.write(chunk)
+                if data is not None and self.memory:
+                    data.extend(chunk)
+                    if len(data) > self.memory.max_size:
+                        data = None
+                yield chunk
+        if data is not None and self.memory:
+            self.memory.put(key, bytes(data))
+
+    def invalidate(self, key: str) -> None:
+        """Removes audio from both tiers.
+
+        Args:
+            key: The S3 key of the audio.
+        """
+        logger.debug("Invalidating cached audio: %s", key)
+        if self.memory:
+            self.memory.pop(key)
+        if self.disk:
+            self.disk.pop(key)
+
+
+@functools.lru_cache
+def get_transcription_cache() -> ExpiringCache | None:
+    """Returns the process-wide cache of transcriptions.
+
+    Returns:
+        The transcription cache, or None if it is disabled.
+    """
+    if TRANSCRIPTION_CACHE_SIZE <= 0:
+        return None
+    return ExpiringCache(TRANSCRIPTION_CACHE_SIZE, TRANSCRIPTION_CACHE_TTL)
+
+
+@functools.lru_cache
+def get_audio_cache() -> AudioCache:
+    """Returns the process-wide audio cache.
+
+    Used for dependency injection in FastAPI.
+
+    Returns:
+        The audio cache.
+    """
+    return AudioCache()
@@ -0,0 +1,319 @@
+"""In-process catalog of the word bank.
+
+The word bank is only written by the admin endpoints, so reads are served from
+memory. The catalog is loaded on first use, refreshed incrementally based on
+the time_updated column, and updated directly when a word is added.
+"""
+import datetime
+import functools
+import logging
+import random
+import threading
+import time
+from collections import abc
+
+import sqlalchemy
+from fastapi import concurrency
+from sqlalchemy import orm
+
+from linguaweb_api.core import config, models
+
+settings = config.get_settings()
+LOGGER_NAME = settings.LOGGER_NAME
+WORD_CATALOG_REFRESH_INTERVAL = settings.WORD_CATALOG_REFRESH_INTERVAL
+
+logger = logging.getLogger(LOGGER_NAME)
+
+_MISS_REFRESH_INTERVAL = 1.0
+# Rows are re-read for this long before the newest known update, as now() is
+# the transaction start time in PostgreSQL and SQLite stores whole seconds.
+_REFRESH_OVERLAP = datetime.timedelta(seconds=5)
+
+
+class WordRecord:
+    """A compact, read-only copy of a row of the words table."""
+
+    __slots__ = (
+        "id",
+        "word",
+        "description",
+        "synonyms",
+        "antonyms",
+        "jeopardy",
+        "s3_key",
+        "time_updated",
+    )
+
+    def __init__(  # noqa: PLR0913
+        self,
+        *,
+        id: int,  # noqa: A002
+        word: str,
+        description: str,
+        synonyms: list[str],
+        antonyms: list[str],
+        jeopardy: str,
+        s3_key: str,
+        time_updated: datetime.datetime | None,
+    ) -> None:
+        """Initializes a new instance of the WordRecord class.
+
+        Args:
+            id: The id of the word.
+            word: The word.
+            description: The description of the word.
+            synonyms: The synonyms of the word.
+            antonyms: The antonyms of the word.
+            jeopardy: The Jeopardy!-style description of the word.
+            s3_key: The S3 key of the audio of the word.
+            time_updated: The time the word was last updated.
+        """
+        self.id = id
+        self.word = word
+        self.description = description
+        self.synonyms = synonyms
+        self.antonyms = antonyms
+        self.jeopardy = jeopardy
+        self.s3_key = s3_key
+        self.time_updated = time_updated
+
+    @classmethod
+    def from_model(cls, model: models.Word) -> "WordRecord":
+        """Creates a record from a word model.
+
+        Args:
+            model: The word model.
+
+        Returns:
+            The word record.
+        """
+        return cls(
+            id=model.id,
+            word=model.word,
+            description=model.description,
+            synonyms=list(model.synonyms),
+            antonyms=list(model.antonyms),
+            jeopardy=model.jeopardy,
+            s3_key=model.s3_key,
+            time_updated=model.time_updated,
+        )
+
+
+class WordCatalog:
+    """A read-mostly, in-memory index of all words.
+
+    Reads are answered from memory. The catalog queries the database only when
+    it has not been loaded yet, when it is older than the refresh interval, or
+    when an unknown id is requested and it was not refreshed very recently.
+    Refreshes only fetch rows updated since the last refresh.
+
+    Attributes:
+        refresh_interval: Seconds after which the catalog is refreshed.
+    """
+
+    def __init__(
+        self,
+        refresh_interval: float = WORD_CATALOG_REFRESH_INTERVAL,
+    ) -> None:
+        """Initializes a new instance of the WordCatalog class.
+
+        Args:
+            refresh_interval: Seconds after which the catalog is refreshed.
+        """
+        self.refresh_interval = refresh_interval
+        self._records: dict[int, WordRecord] = {}
+        self._ids: list[int] = []
+        self._last_updated: datetime.datetime | None = None
+        self._max_id: int | None = None
+        self._last_refresh: float | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the catalog has been loaded from the database."""
+        return self._last_refresh is not None
+
+    def load(
+        self,
+        session: orm.Session,
+        identifiers: abc.Collection[int] = (),
+    ) -> None:
+        """Loads, or incrementally refreshes, the catalog from the database.
+
+        A refresh reads rows updated since the last refresh and rows with an
+        id above the highest known id. As time_updated is the start time of
+        the writing transaction, a row inserted by a long transaction can be
+        older than the last refresh, so requested ids are read as well.
+
+        Args:
+            session: The database session.
+            identifiers: Ids of words to read regardless of their update time.
+        """
+        with self._lock:
+            query = session.query(models.Word)
+            if self._last_updated is not None:
+                since = self._last_updated - _REFRESH_OVERLAP
+                conditions = [models.Word.time_updated >= since]
+                if self._max_id is not None:
+                    conditions.append(models.Word.id > self._max_id)
+                if identifiers:
+                    conditions.append(models.Word.id.in_(identifiers))
+                query = query.filter(sqlalchemy.or_(*conditions))
+            rows = query.order_by(models.Word.id).all()
+            for row in rows:
+                self._add(WordRecord.from_model(row))
+            self._last_refresh = time.monotonic()
+        logger.debug("Loaded %d words into the catalog.", len(rows))
+
+    def upsert(self, model: models.Word) -> None:
+        """Adds or replaces a word without querying the full table.
+
+        Args:
+            model: The word model.
+        """
+        with self._lock:
+            self._add(WordRecord.from_model(model))
+
+    async def get(self, identifier: int, session: orm.Session) -> WordRecord | None:
+        """Returns a word by its id.
+
+        Args:
+            identifier: The id of the word.
+            session: The database session, only used if a refresh is needed.
+
+        Returns:
+            The word record, or None if the word does not exist.
+        """
+        await self._refresh_if_stale(session)
+        if identifier in self._records:
+            return self._records[identifier]
+        if self._seconds_since_refresh() > _MISS_REFRESH_INTERVAL:
+            await concurrency.run_in_threadpool(self.load, session, [identifier])
+        return self._records.get(identifier)
+
+    async def get_many(
+        self,
+        identifiers: abc.Iterable[int],
+        session: orm.Session,
+    ) -> dict[int, WordRecord | None]:
+        """Returns words by their ids.
+
+        Unknown ids trigger at most one refresh, regardless of their number.
+
+        Args:
+            identifiers: The ids of the words.
+            session: The database session, only used if a refresh is needed.
+
+        Returns:
+            The word record of each id, or None if the word does not exist, in
+            the order of the ids.
+        """
+        identifiers = list(identifiers)
+        await self._refresh_if_stale(session)
+        missing = [
+            identifier for identifier in identifiers if identifier not in self._records
+        ]
+        if missing and self._seconds_since_refresh() > _MISS_REFRESH_INTERVAL:
+            await concurrency.run_in_threadpool(self.load, session, missing)
+        return {identifier: self._records.get(identifier) for identifier in identifiers}
+
+    async def sample(
+        self,
+        count: int,
+        session: orm.Session,
+        exclude: abc.Collection[int] = frozenset(),
+    ) -> list[WordRecord]:
+        """Returns random words, sampled without replacement.
+
+        Random positions of the id list are drawn until enough words that are
+        not excluded were found, so sampling takes time proportional to the
+        count and the exclusions rather than to the size of the word bank.
+        Only if most of the bank would be rejected are the remaining ids
+        listed and sampled from instead.
+
+        Args:
+            count: The number of words.
+            session: The database session, only used if a refresh is needed.
+            exclude: The ids of words that must not be returned.
+
+        Returns:
+            The word records, fewer than the count if the bank has fewer words
+            that are not excluded.
+        """
+        await self._refresh_if_stale(session)
+        exclude = set(exclude)
+        # Ids are only ever appended, so the first size ids remain valid while
+        # words are added concurrently, without copying the list.
+        ids = self._ids
+        size = len(ids)
+        excluded = sum(1 for identifier in exclude if identifier in self._records)
+        count = min(count, size - excluded)
+        if count <= 0:
+            return []
+
+        if (count + excluded) * 2 > size:
+            candidates = [
+                identifier for identifier in ids[:size] if identifier not in exclude
+            ]
+            chosen = random.sample(candidates, count)
+        else:
+            # At least half of the draws are accepted, so this takes about
+            # 2 * count draws.
+            chosen_ids: dict[int, None] = {}
+            while len(chosen_ids) < count:
+                identifier = ids[random.randrange(size)]  # noqa: S311
+                if identifier not in exclude:
+                    chosen_ids[identifier] = None
+            chosen = list(chosen_ids)
+        return [self._records[identifier] for identifier in chosen]
+
+    async def get_ids(self, session: orm.Session) -> list[int]:
+        """Returns the ids of all words.
+
+        Args:
+            session: The database session, only used if a refresh is needed.
+
+        Returns:
+            The ids of all words.
+        """
+        await self._refresh_if_stale(session)
+        return list(self._ids)
+
+    async def _refresh_if_stale(self, session: orm.Session) -> None:
+        """Refreshes the catalog if it was not loaded or is out of date.
+
+        Args:
+            session: The database session.
+        """
+        if self._seconds_since_refresh() > self.refresh_interval:
+            await concurrency.run_in_threadpool(self.load, session)
+
+    def _seconds_since_refresh(self) -> float:
+        """Returns the seconds since the last refresh, infinite if never."""
+        if self._last_refresh is None:
+            return float("inf")
+        return time.monotonic() - self._last_refresh
+
+    def _add(self, record: WordRecord) -> None:
+        """Adds or replaces a record; the lock must be held."""
+        if record.id not in self._records:
+            self._ids.append(record.id)
+        self._records[record.id] = record
+        if self._max_id is None or record.id > self._max_id:
+            self._max_id = record.id
+        if record.time_updated is not None and (
+            self._last_updated is None or record.time_updated > self._last_updated
+        ):
+            self._last_updated = record.time_updated
+
+
+@functools.lru_cache
+def get_word_catalog() -> WordCatalog:
+    """Returns the process-wide word catalog.
+
+    Used for dependency injection in FastAPI.
+
+    Returns:
+        The word catalog.
+    """
+    return WordCatalog()
@@ -1,6 +1,8 @@
 """Settings for the API."""
+import enum
 import functools
 import logging
+import os
 from typing import NotRequired, TypedDict
 
 import pydantic
@@ -9,6 +11,35 @@ import pydantic_settings
 from linguaweb_api.microservices import openai_constants
 
 
+class AudioDownloadModes(str, enum.Enum):
+    """Ways in which word audio is delivered to clients."""
+
+    STREAM = "stream"
+    REDIRECT = "redirect"
+
+
+class TextTaskModes(str, enum.Enum):
+    """Ways in which the text tasks of a word are generated."""
+
+    STRUCTURED = "structured"
+    PER_FIELD = "per_field"
+
+
+class AudioProfiles(str, enum.Enum):
+    """Ways in which audio is preprocessed before transcription."""
+
+    DEFAULT = "default"
+    SPEECH = "speech"
+    SPEECH_TRIMMED = "speech_trimmed"
+
+
+class ModelRateLimit(pydantic.BaseModel):
+    """The rate limit budget of an OpenAI model."""
+
+    requests_per_minute: int
+    tokens_per_minute: int | None = None
+
+
 class Settings(pydantic_settings.BaseSettings):  # type: ignore[valid-type, misc]
     """Settings for the API."""
 
@@ -48,6 +79,76 @@ class Settings(pydantic_settings.BaseSettings):  # type: ignore[valid-type, misc
         "whisper-1",
         json_schema_extra={"env": "OPENAI_STT_MODEL"},
     )
+    OPENAI_TEXT_TASK_MODE: TextTaskModes = pydantic.Field(
+        TextTaskModes.STRUCTURED,
+        description="Whether text tasks are generated in one JSON call or per field.",
+        json_schema_extra={"env": "OPENAI_TEXT_TASK_MODE"},
+    )
+    OPENAI_TIMEOUT: float = pydantic.Field(
+        60.0,
+        description="Timeout in seconds for a single OpenAI request.",
+        json_schema_extra={"env": "OPENAI_TIMEOUT"},
+    )
+    OPENAI_HEDGE_PERCENTILE: float | None = pydantic.Field(
+        None,
+        description=(
+            "Latency percentile after which hedged models send a duplicate "
+            "request, None disables hedging."
+        ),
+        json_schema_extra={"env": "OPENAI_HEDGE_PERCENTILE"},
+    )
+    OPENAI_HEDGE_MIN_SAMPLES: int = pydantic.Field(
+        20,
+        description="Number of latencies of a model observed before hedging it.",
+        json_schema_extra={"env": "OPENAI_HEDGE_MIN_SAMPLES"},
+    )
+    OPENAI_MAX_CONNECTIONS: int = pydantic.Field(
+        100,
+        json_schema_extra={"env": "OPENAI_MAX_CONNECTIONS"},
+    )
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = pydantic.Field(
+        20,
+        json_schema_extra={"env": "OPENAI_MAX_KEEPALIVE_CONNECTIONS"},
+    )
+    OPENAI_KEEPALIVE_EXPIRY: float = pydantic.Field(
+        30.0,
+        description="Seconds an idle keep-alive connection is kept open.",
+        json_schema_extra={"env": "OPENAI_KEEPALIVE_EXPIRY"},
+    )
+    OPENAI_REQUESTS_PER_MINUTE: int = pydantic.Field(
+        500,
+        description="Requests per minute of models not in OPENAI_RATE_LIMITS.",
+        json_schema_extra={"env": "OPENAI_REQUESTS_PER_MINUTE"},
+    )
+    OPENAI_RATE_LIMITS: dict[str, ModelRateLimit] = pydantic.Field(
+        {
+            "gpt-4-1106-preview": ModelRateLimit(
+                requests_per_minute=500,
+                tokens_per_minute=300_000,
+            ),
+            "gpt-4": ModelRateLimit(requests_per_minute=500, tokens_per_minute=10_000),
+            "tts-1": ModelRateLimit(requests_per_minute=500),
+            "whisper-1": ModelRateLimit(requests_per_minute=500),
+        },
+        description="Rate limit budgets of this process per model, as JSON.",
+        json_schema_extra={"env": "OPENAI_RATE_LIMITS"},
+    )
+    OPENAI_MAX_CONCURRENCY: int = pydantic.Field(
+        32,
+        description="Maximum number of concurrent requests per model.",
+        json_schema_extra={"env": "OPENAI_MAX_CONCURRENCY"},
+    )
+    OPENAI_RATE_LIMIT_RETRIES: int = pydantic.Field(
+        5,
+        description="Number of times a rate limited request is retried.",
+        json_schema_extra={"env": "OPENAI_RATE_LIMIT_RETRIES"},
+    )
+
+    REQUEST_TIMEOUT: float | None = pydantic.Field(
+        120.0,
+        description="Seconds after which calls made for a request are abandoned.",
+        json_schema_extra={"env": "REQUEST_TIMEOUT"},
+    )
 
     S3_ENDPOINT_URL: str | None = pydantic.Field(
         None,
@@ -69,6 +170,191 @@ class Settings(pydantic_settings.BaseSettings):  # type: ignore[valid-type, misc
         "us-east-1",
         json_schema_extra={"env": "S3_REGION"},
     )
+    S3_MAX_POOL_CONNECTIONS: int = pydantic.Field(
+        50,
+        json_schema_extra={"env": "S3_MAX_POOL_CONNECTIONS"},
+    )
+    S3_CHUNK_SIZE: int = pydantic.Field(
+        64 * 1024,
+        description="Size in bytes of the chunks in which objects are streamed.",
+        json_schema_extra={"env": "S3_CHUNK_SIZE"},
+    )
+    S3_PRESIGNED_URL_EXPIRY: int = pydantic.Field(
+        900,
+        description="Seconds for which presigned URLs are valid.",
+        json_schema_extra={"env": "S3_PRESIGNED_URL_EXPIRY"},
+    )
+    S3_PRESIGNED_URL_MARGIN: int = pydantic.Field(
+        60,
+        description="Seconds before expiry at which cached presigned URLs are renewed.",
+        json_schema_extra={"env": "S3_PRESIGNED_URL_MARGIN"},
+    )
+
+    AUDIO_DOWNLOAD_MODE: AudioDownloadModes = pydantic.Field(
+        AudioDownloadModes.STREAM,
+        description="Whether audio is streamed by the API or redirected to S3.",
+        json_schema_extra={"env": "AUDIO_DOWNLOAD_MODE"},
+    )
+    AUDIO_CACHE_CONTROL_MAX_AGE: int = pydantic.Field(
+        24 * 60 * 60,
+        description="Seconds for which clients may cache word audio.",
+        json_schema_extra={"env": "AUDIO_CACHE_CONTROL_MAX_AGE"},
+    )
+
+    AUDIO_CACHE_MEMORY_SIZE: int = pydantic.Field(
+        64 * 1024 * 1024,
+        description="Bytes of word audio cached in memory, 0 disables the tier.",
+        json_schema_extra={"env": "AUDIO_CACHE_MEMORY_SIZE"},
+    )
+    AUDIO_CACHE_DIRECTORY: str | None = pydantic.Field(
+        None,
+        description="Directory for word audio cached on disk, None disables the tier.",
+        json_schema_extra={"env": "AUDIO_CACHE_DIRECTORY"},
+    )
+    AUDIO_CACHE_DISK_SIZE: int = pydantic.Field(
+        1024 * 1024 * 1024,
+        description="Bytes of word audio cached on disk.",
+        json_schema_extra={"env": "AUDIO_CACHE_DISK_SIZE"},
+    )
+
+    SPEECH_MAX_FILE_SIZE: int = pydantic.Field(
+        1024 * 1024,
+        description="Maximum size in bytes of uploaded speech audio.",
+        json_schema_extra={"env": "SPEECH_MAX_FILE_SIZE"},
+    )
+    SPEECH_BATCH_MAX_FILES: int = pydantic.Field(
+        50,
+        description="Maximum number of audio files in a batch transcription.",
+        json_schema_extra={"env": "SPEECH_BATCH_MAX_FILES"},
+    )
+    SPEECH_BATCH_CONCURRENCY: int = pydantic.Field(
+        8,
+        description=(
+            "Files of a batch transcribed concurrently, keep it below "
+            "TRANSCODER_QUEUE_SIZE to not have the batch rejected by the transcoder."
+        ),
+        json_schema_extra={"env": "SPEECH_BATCH_CONCURRENCY"},
+    )
+    SPEECH_STREAM_VAD_THRESHOLD: float = pydantic.Field(
+        500.0,
+        description="RMS energy, out of 32768, above which streamed audio is speech.",
+        json_schema_extra={"env": "SPEECH_STREAM_VAD_THRESHOLD"},
+    )
+    SPEECH_STREAM_SILENCE: float = pydantic.Field(
+        0.6,
+        description="Seconds of silence that end a segment of streamed speech.",
+        json_schema_extra={"env": "SPEECH_STREAM_SILENCE"},
+    )
+    SPEECH_STREAM_MAX_SECONDS: float = pydantic.Field(
+        60.0,
+        description="Maximum seconds of audio in a streaming transcription.",
+        json_schema_extra={"env": "SPEECH_STREAM_MAX_SECONDS"},
+    )
+    SPEECH_STREAM_IDLE_TIMEOUT: float = pydantic.Field(
+        10.0,
+        description="Seconds without a message after which a stream is closed.",
+        json_schema_extra={"env": "SPEECH_STREAM_IDLE_TIMEOUT"},
+    )
+    AUDIO_PREPROCESSING_PROFILE: AudioProfiles = pydantic.Field(
+        AudioProfiles.SPEECH,
+        description=(
+            "How audio is converted before transcription: ffmpeg defaults, mono "
+            "16 kHz at a speech bitrate, or the latter with silence trimmed."
+        ),
+        json_schema_extra={"env": "AUDIO_PREPROCESSING_PROFILE"},
+    )
+    TRANSCRIPTION_CACHE_SIZE: int = pydantic.Field(
+        1024,
+        description="Number of transcriptions cached in memory, 0 disables the cache.",
+        json_schema_extra={"env": "TRANSCRIPTION_CACHE_SIZE"},
+    )
+    TRANSCRIPTION_CACHE_TTL: float = pydantic.Field(
+        600.0,
+        description="Seconds for which a cached transcription is reused.",
+        json_schema_extra={"env": "TRANSCRIPTION_CACHE_TTL"},
+    )
+    TRANSCODER_WORKERS: int = pydantic.Field(
+        default_factory=lambda: os.cpu_count() or 1,
+        description="Maximum number of concurrent ffmpeg conversions.",
+        json_schema_extra={"env": "TRANSCODER_WORKERS"},
+    )
+    TRANSCODER_QUEUE_SIZE: int = pydantic.Field(
+        32,
+        description="Conversions waiting for a worker before new ones get a 503.",
+        json_schema_extra={"env": "TRANSCODER_QUEUE_SIZE"},
+    )
+    TRANSCODER_TIMEOUT: float = pydantic.Field(
+        30.0,
+        description="Seconds after which an ffmpeg conversion is abandoned.",
+        json_schema_extra={"env": "TRANSCODER_TIMEOUT"},
+    )
+
+    INGESTION_CONCURRENCY: int = pydantic.Field(
+        8,
+        description="Maximum number of words generated concurrently in bulk.",
+        json_schema_extra={"env": "INGESTION_CONCURRENCY"},
+    )
+    INGESTION_BATCH_SIZE: int = pydantic.Field(
+        100,
+        description="Number of words inserted per transaction in bulk.",
+        json_schema_extra={"env": "INGESTION_BATCH_SIZE"},
+    )
+
+    JOB_WORKERS: int = pydantic.Field(
+        4,
+        description=(
+            "Number of words processed concurrently by the in-process job worker, "
+            "0 disables it in favour of a separate worker process."
+        ),
+        json_schema_extra={"env": "JOB_WORKERS"},
+    )
+    JOB_POLL_INTERVAL: float = pydantic.Field(
+        2.0,
+        description="Seconds between polls for new jobs by an idle worker.",
+        json_schema_extra={"env": "JOB_POLL_INTERVAL"},
+    )
+    JOB_MAX_ATTEMPTS: int = pydantic.Field(
+        3,
+        description="Number of times a word is attempted before it fails.",
+        json_schema_extra={"env": "JOB_MAX_ATTEMPTS"},
+    )
+    JOB_RETRY_BACKOFF: float = pydantic.Field(
+        2.0,
+        description="Seconds before the first retry, doubled on each retry.",
+        json_schema_extra={"env": "JOB_RETRY_BACKOFF"},
+    )
+    JOB_LEASE_TIMEOUT: float = pydantic.Field(
+        600.0,
+        description="Seconds after which a claimed word is considered abandoned.",
+        json_schema_extra={"env": "JOB_LEASE_TIMEOUT"},
+    )
+
+    GENERATION_CACHE_FILE: str | None = pydantic.Field(
+        None,
+        description="SQLite file caching OpenAI generations, None disables the cache.",
+        json_schema_extra={"env": "GENERATION_CACHE_FILE"},
+    )
+    GENERATION_CACHE_SIZE: int = pydantic.Field(
+        1024 * 1024 * 1024,
+        description="Bytes of OpenAI generations cached in the SQLite file.",
+        json_schema_extra={"env": "GENERATION_CACHE_SIZE"},
+    )
+    GENERATION_CACHE_S3_PREFIX: str | None = pydantic.Field(
+        None,
+        description="S3 key prefix of shared cached generations, None disables S3.",
+        json_schema_extra={"env": "GENERATION_CACHE_S3_PREFIX"},
+    )
+
+    WORD_CATALOG_REFRESH_INTERVAL: float = pydantic.Field(
+        60.0,
+        description="Seconds after which the in-memory word catalog is refreshed.",
+        json_schema_extra={"env": "WORD_CATALOG_REFRESH_INTERVAL"},
+    )
+    WORDS_BATCH_MAX_IDS: int = pydantic.Field(
+        100,
+        description="Maximum number of words fetched in a single batch request.",
+        json_schema_extra={"env": "WORDS_BATCH_MAX_IDS"},
+    )
 
     POSTGRES_URL: str = pydantic.Field(
         "localhost:5432",
@@ -88,6 +374,29 @@ class Settings(pydantic_settings.BaseSettings):  # type: ignore[valid-type, misc
         json_schema_extra={"env": "SQLITE_FILE"},
     )
 
+    SQL_POOL_SIZE: int = pydantic.Field(
+        10,
+        json_schema_extra={"env": "SQL_POOL_SIZE"},
+    )
+    SQL_MAX_OVERFLOW: int = pydantic.Field(
+        20,
+        json_schema_extra={"env": "SQL_MAX_OVERFLOW"},
+    )
+    SQL_POOL_RECYCLE: int = pydantic.Field(
+        1800,
+        description="Seconds after which a pooled connection is replaced.",
+        json_schema_extra={"env": "SQL_POOL_RECYCLE"},
+    )
+    SQL_POOL_PRE_PING: bool = pydantic.Field(
+        True,  # noqa: FBT003
+        json_schema_extra={"env": "SQL_POOL_PRE_PING"},
+    )
+    SQL_STATEMENT_TIMEOUT: int | None = pydantic.Field(
+        30000,
+        description="Statement timeout in milliseconds, only applied to PostgreSQL.",
+        json_schema_extra={"env": "SQL_STATEMENT_TIMEOUT"},
+    )
+
 
 @functools.lru_cache
 def get_settings() -> Settings:
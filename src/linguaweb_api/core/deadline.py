@@ -0,0 +1,68 @@
+"""Deadlines that propagate from incoming requests to outgoing calls.
+
+The deadline of the current request is stored in a context variable, so it is
+inherited by every task and worker thread started while handling the request.
+Outgoing calls bound their timeouts by the time that remains.
+"""
+import asyncio
+import contextlib
+import contextvars
+import time
+from collections import abc
+
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar(
+    "deadline",
+    default=None,
+)
+
+
+def remaining() -> float | None:
+    """Returns the seconds until the current deadline.
+
+    Returns:
+        The seconds until the deadline, negative once it passed, or None if
+        there is no deadline.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+@contextlib.contextmanager
+def scope(seconds: float | None) -> abc.Generator[None, None, None]:
+    """Sets a deadline for the enclosed code.
+
+    A deadline can only be shortened; an enclosing deadline that is earlier
+    remains in effect.
+
+    Args:
+        seconds: The seconds until the deadline, or None to keep the current
+            deadline.
+    """
+    if seconds is None:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def timeout(seconds: float | None = None) -> asyncio.Timeout:
+    """Returns an asyncio timeout bounded by the current deadline.
+
+    Args:
+        seconds: The timeout of the call, or None to only apply the deadline.
+
+    Returns:
+        A context manager that raises TimeoutError when the earlier of the
+        timeout and the deadline passes.
+    """
+    limits = [limit for limit in (seconds, remaining()) if limit is not None]
+    return asyncio.timeout(min(limits) if limits else None)
@@ -0,0 +1,294 @@
+"""Persistent cache of OpenAI generations.
+
+Generations are keyed by a hash of everything that determines them, i.e. the
+model, voice, prompts and input, such that identical requests are only sent to
+OpenAI once. The cache is stored in a local SQLite file and, optionally, in S3
+to share it between environments.
+"""
+import functools
+import hashlib
+import json
+import logging
+import pathlib
+import sqlite3
+import threading
+import time
+
+from botocore import errorfactory
+from fastapi import concurrency
+
+from linguaweb_api.core import config
+from linguaweb_api.microservices import s3
+
+settings = config.get_settings()
+LOGGER_NAME = settings.LOGGER_NAME
+GENERATION_CACHE_FILE = settings.GENERATION_CACHE_FILE
+GENERATION_CACHE_SIZE = settings.GENERATION_CACHE_SIZE
+GENERATION_CACHE_S3_PREFIX = settings.GENERATION_CACHE_S3_PREFIX
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+def generation_key(**inputs: str) -> str:
+    """Returns the cache key of a generation.
+
+    Args:
+        **inputs: Everything that determines the generation, e.g. the model,
+            voice, system prompt and input text.
+
+    Returns:
+        The SHA-256 hex digest of the inputs.
+    """
+    serialized = json.dumps(inputs, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(serialized.encode()).hexdigest()
+
+
+class SQLiteStore:
+    """A thread-safe key-value store in SQLite with a budget in bytes.
+
+    The least recently read values are evicted once the budget is exceeded.
+    The file may be shared by several processes.
+
+    Attributes:
+        path: The path to the SQLite file.
+        max_size: The maximum total size of the stored values in bytes.
+    """
+
+    def __init__(self, path: pathlib.Path | str, max_size: int) -> None:
+        """Initializes a new instance of the SQLiteStore class.
+
+        Args:
+            path: The path to the SQLite file, created if it does not exist.
+            max_size: The maximum total size of the stored values in bytes.
+        """
+        self.path = pathlib.Path(path)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS generations ("
+                "key TEXT PRIMARY KEY, "
+                "value BLOB NOT NULL, "
+                "size INTEGER NOT NULL, "
+                "last_access REAL NOT NULL)",
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS generations_last_access "
+                "ON generations (last_access)",
+            )
+
+    @property
+    def size(self) -> int:
+        """The current total size of the stored values in bytes."""
+        with self._lock:
+            return self._size()
+
+    def __len__(self) -> int:
+        """Returns the number of stored values."""
+        with self._lock:
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM generations",
+            ).fetchone()
+        return count
+
+    def get(self, key: str) -> bytes | None:
+        """Returns a stored value and marks it as recently used.
+
+        Args:
+            key: The key of the value.
+
+        Returns:
+            The value, or None if it is not stored.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM generations WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE generations SET last_access = ? WHERE key = ?",
+                (time.time(), key),
+            )
+        return row[0]
+
+    def put(self, key: str, value: bytes) -> None:
+        """Stores a value, evicting the least recently used values if needed.
+
+        Values larger than the budget are not stored.
+
+        Args:
+            key: The key of the value.
+            value: The value to store.
+        """
+        if len(value) > self.max_size:
+            return
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO generations VALUES (?, ?, ?, ?)",
+                (key, value, len(value), time.time()),
+            )
+            self._evict()
+
+    def close(self) -> None:
+        """Closes the connection to the SQLite file."""
+        with self._lock:
+            self._connection.close()
+
+    def _size(self) -> int:
+        """Returns the total size of the stored values; the lock must be held."""
+        (size,) = self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM generations",
+        ).fetchone()
+        return size
+
+    def _evict(self) -> None:
+        """Evicts the least recently used values; the lock must be held."""
+        excess = self._size() - self.max_size
+        if excess <= 0:
+            return
+        rows = self._connection.execute(
+            "SELECT key, size FROM generations ORDER BY last_access",
+        )
+        keys = []
+        for key, size in rows:
+            keys.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._connection.executemany("DELETE FROM generations WHERE key = ?", keys)
+        logger.debug("Evicted %d generations from the cache.", len(keys))
+
+
+class GenerationCache:
+    """A cache of generations with a local tier and an optional shared S3 tier.
+
+    Attributes:
+        store: The local store.
+        s3_client: The S3 client of the shared tier, or None if disabled.
+        s3_prefix: The key prefix of the generations in S3.
+        hits: The number of lookups answered by the local store.
+        shared_hits: The number of lookups answered by S3.
+        misses: The number of lookups that were not cached.
+    """
+
+    def __init__(
+        self,
+        store: SQLiteStore,
+        s3_client: s3.S3 | None = None,
+        s3_prefix: str = "",
+    ) -> None:
+        """Initializes a new instance of the GenerationCache class.
+
+        Args:
+            store: The local store.
+            s3_client: The S3 client of the shared tier, or None to disable it.
+            s3_prefix: The key prefix of the generations in S3.
+        """
+        self.store = store
+        self.s3_client = s3_client
+        self.s3_prefix = s3_prefix
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> bytes | None:
+        """Returns a cached generation.
+
+        Generations found in S3 are copied into the local store.
+
+        Args:
+            key: The key of the generation.
+
+        Returns:
+            The generation, or None if it is not cached.
+        """
+        value = await concurrency.run_in_threadpool(self.store.get, key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        if self.s3_client:
+            value = await concurrency.run_in_threadpool(self._read_shared, key)
+            if value is not None:
+                self.shared_hits += 1
+                await concurrency.run_in_threadpool(self.store.put, key, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, value: bytes) -> None:
+        """Caches a generation in all tiers.
+
+        Args:
+            key: The key of the generation.
+            value: The generation.
+        """
+        await concurrency.run_in_threadpool(self.store.put, key, value)
+        if self.s3_client:
+            await concurrency.run_in_threadpool(self._write_shared, key, value)
+
+    def _read_shared(self, key: str) -> bytes | None:
+        """Reads a generation from S3.
+
+        Args:
+            key: The key of the generation.
+
+        Returns:
+            The generation, or None if it is not in S3 or S3 failed.
+        """
+        if self.s3_client is None:
+            return None
+        try:
+            return self.s3_client.read(self.s3_prefix + key)
+        except errorfactory.ClientError as exception_info:
+            if exception_info.response["Error"]["Code"] not in ("NoSuchKey", "404"):
+                logger.warning("Failed to read generation from S3: %s", exception_info)
+            return None
+
+    def _write_shared(self, key: str, value: bytes) -> None:
+        """Writes a generation to S3, logging failures.
+
+        Args:
+            key: The key of the generation.
+            value: The generation.
+        """
+        if self.s3_client is None:
+            return
+        try:
+            self.s3_client.create(self.s3_prefix + key, value)
+        except errorfactory.ClientError as exception_info:
+            logger.warning("Failed to write generation to S3: %s", exception_info)
+
+
+@functools.lru_cache
+def get_generation_cache() -> GenerationCache | None:
+    """Returns the process-wide generation cache.
+
+    Returns:
+        The generation cache, or None if it is disabled.
+    """
+    if not GENERATION_CACHE_FILE:
+        return None
+    logger.debug("Opening generation cache at: %s", GENERATION_CACHE_FILE)
+    store = SQLiteStore(GENERATION_CACHE_FILE, GENERATION_CACHE_SIZE)
+    if GENERATION_CACHE_S3_PREFIX is None:
+        return GenerationCache(store)
+    return GenerationCache(store, s3.get_s3_client(), GENERATION_CACHE_S3_PREFIX)
+
+
+def close_generation_cache() -> None:
+    """Closes the process-wide generation cache, if one was opened."""
+    if get_generation_cache.cache_info().currsize:
+        cache_instance = get_generation_cache()
+        if cache_instance:
+            cache_instance.store.close()
+    get_generation_cache.cache_clear()
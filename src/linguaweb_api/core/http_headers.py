@@ -0,0 +1,155 @@
+"""Helpers for HTTP range and conditional requests."""
+import datetime
+import re
+from email import utils
+from typing import NamedTuple
+
+import fastapi
+from fastapi import status
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class ByteRange(NamedTuple):
+    """An inclusive range of bytes."""
+
+    start: int
+    end: int
+
+    @property
+    def length(self) -> int:
+        """The number of bytes in the range."""
+        return self.end - self.start + 1
+
+    def content_range(self, size: int) -> str:
+        """Returns the Content-Range header value of the range.
+
+        Args:
+            size: The size of the complete content in bytes.
+
+        Returns:
+            The header value.
+        """
+        return f"bytes {self.start}-{self.end}/{size}"
+
+
+def is_single_range(header: str | None) -> bool:
+    """Checks whether a Range header requests a single, well-formed byte range.
+
+    Other Range headers, including multiple ranges, are ignored and answered
+    with the full content, as permitted by RFC 9110.
+
+    Args:
+        header: The Range header value.
+
+    Returns:
+        Whether the header requests a single byte range.
+    """
+    if header is None:
+        return False
+    match = _RANGE_PATTERN.match(header.strip())
+    return bool(match and (match.group(1) or match.group(2)))
+
+
+def resolve_range(header: str | None, size: int) -> ByteRange | None:
+    """Resolves a Range header against content of a known size.
+
+    Args:
+        header: The Range header value.
+        size: The size of the content in bytes.
+
+    Returns:
+        The requested range, or None if the full content should be sent.
+
+    Raises:
+        fastapi.HTTPException: 416 If the range cannot be satisfied.
+    """
+    match = _RANGE_PATTERN.match(header.strip()) if header else None
+    if not match or not is_single_range(header):
+        return None
+    start, end = match.groups()
+
+    if start and end and int(end) < int(start):
+        return None
+    if start:
+        byte_range = ByteRange(int(start), min(int(end or size - 1), size - 1))
+    else:
+        byte_range = ByteRange(max(size - int(end), 0), size - 1)
+
+    if byte_range.start >= size or byte_range.length <= 0:
+        raise fastapi.HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Requested range not satisfiable.",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return byte_range
+
+
+def format_etag(digest: str) -> str:
+    """Formats a content digest as a strong entity tag.
+
+    Args:
+        digest: The content digest, optionally already quoted.
+
+    Returns:
+        The entity tag.
+    """
+    return '"' + digest.strip('"') + '"'
+
+
+def format_http_date(timestamp: datetime.datetime) -> str:
+    """Formats a timestamp as an HTTP date.
+
+    Args:
+        timestamp: The timestamp, assumed to be UTC if it has no timezone.
+
+    Returns:
+        The HTTP date.
+    """
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=datetime.UTC)
+    return utils.format_datetime(timestamp.astimezone(datetime.UTC), usegmt=True)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Checks an If-None-Match header against an entity tag.
+
+    Uses the weak comparison required for If-None-Match.
+
+    Args:
+        if_none_match: The If-None-Match header value.
+        etag: The current entity tag.
+
+    Returns:
+        Whether the header matches the entity tag.
+    """
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag.removeprefix("W/") in candidates
+
+
+def is_modified_since(
+    if_modified_since: str,
+    last_modified: datetime.datetime,
+) -> bool:
+    """Checks an If-Modified-Since header against a modification time.
+
+    Args:
+        if_modified_since: The If-Modified-Since header value.
+        last_modified: The modification time, assumed to be UTC if it has no
+            timezone.
+
+    Returns:
+        Whether the content was modified since the given date. Unparseable
+        dates are treated as modified.
+    """
+    try:
+        since = utils.parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return True
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=datetime.UTC)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=datetime.UTC)
+    return last_modified.replace(microsecond=0) > since
@@ -1,16 +1,21 @@
 """Middleware for the FastAPI application."""
+import contextlib
 import logging
 import uuid
 from collections import abc
 from typing import Any
 
 import fastapi
+from fastapi import responses, status
 
-from linguaweb_api.core import config
+from linguaweb_api.core import config, deadline
 
 settings = config.get_settings()
+REQUEST_TIMEOUT = settings.REQUEST_TIMEOUT
 logger = logging.getLogger(settings.LOGGER_NAME)
 
+REQUEST_TIMEOUT_HEADER = "X-Request-Timeout"
+
 
 class RequestLoggerMiddleware:  # pylint: disable=too-few-public-methods
     """Middleware that logs incoming requests."""
@@ -54,3 +59,129 @@ class RequestLoggerMiddleware:  # pylint: disable=too-few-public-methods
         await self.app(scope, receive, send)
 
         logger.info("Finished request: %s.", request_id)
+
+
+class DeadlineMiddleware:  # pylint: disable=too-few-public-methods
+    """Middleware that sets the deadline of incoming requests.
+
+    The deadline is REQUEST_TIMEOUT seconds after the request arrives. Clients
+    may shorten it with the X-Request-Timeout header, in seconds, such that
+    calls to external services are not continued after the client gave up.
+    Long-running routes can be exempted from REQUEST_TIMEOUT; they only get
+    a deadline if the client sets one.
+    """
+
+    def __init__(self, app: fastapi.FastAPI, exempt: abc.Iterable[str] = ()) -> None:
+        """Initializes a new instance of the DeadlineMiddleware class.
+
+        Args:
+            app: The FastAPI instance to apply middleware to.
+            exempt: The path prefixes to which REQUEST_TIMEOUT does not apply.
+        """
+        self.app = app
+        self.exempt = tuple(exempt)
+
+    async def __call__(
+        self,
+        scope: dict[str, Any],
+        receive: abc.Callable[[], abc.Awaitable[dict[str, Any]]],
+        send: abc.Callable[[abc.MutableMapping[str, Any]], abc.Awaitable[None]],
+    ) -> None:
+        """Middleware method that handles incoming HTTP requests.
+
+        Args:
+            scope: The ASGI scope of the incoming request.
+            receive: A coroutine that receives incoming messages.
+            send: A coroutine that sends outgoing messages.
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = fastapi.Request(scope)
+        exempt = scope["path"].startswith(self.exempt) if self.exempt else False
+        timeouts = [None if exempt else REQUEST_TIMEOUT]
+        with contextlib.suppress(KeyError, ValueError):
+            timeouts.append(float(request.headers[REQUEST_TIMEOUT_HEADER]))
+
+        limits = [timeout for timeout in timeouts if timeout is not None]
+        with deadline.scope(min(limits) if limits else None):
+            await self.app(scope, receive, send)
+
+
+class BodySizeLimitMiddleware:  # pylint: disable=too-few-public-methods
+    """Middleware that rejects request bodies over a size limit per route.
+
+    Requests that declare a larger Content-Length are rejected before their
+    body is read. The bytes of other requests, such as chunked uploads, are
+    counted as they are received and the request is rejected as soon as the
+    limit is crossed, before the rest of the body is parsed or spooled.
+    """
+
+    def __init__(self, app: fastapi.FastAPI, limits: dict[str, int]) -> None:
+        """Initializes a new instance of the BodySizeLimitMiddleware class.
+
+        Args:
+            app: The FastAPI instance to apply middleware to.
+            limits: The maximum body size in bytes by path prefix. The longest
+                matching prefix applies; other paths are not limited.
+        """
+        self.app = app
+        self.limits = dict(
+            sorted(limits.items(), key=lambda item: len(item[0]), reverse=True),
+        )
+
+    async def __call__(
+        self,
+        scope: dict[str, Any],
+        receive: abc.Callable[[], abc.Awaitable[dict[str, Any]]],
+        send: abc.Callable[[abc.MutableMapping[str, Any]], abc.Awaitable[None]],
+    ) -> None:
+        """Middleware method that handles incoming HTTP requests.
+
+        Args:
+            scope: The ASGI scope of the incoming request.
+            receive: A coroutine that receives incoming messages.
+            send: A coroutine that sends outgoing messages.
+        """
+        limit = self._limit(scope)
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"Request body exceeds maximum allowed size of {limit} bytes."
+        content_length = fastapi.Request(scope).headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > limit:
+            logger.warning("Rejected request by its Content-Length.")
+            response = responses.JSONResponse(
+                {"detail": detail},
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> dict[str, Any]:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    logger.warning("Rejected request body while receiving it.")
+                    raise fastapi.HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=detail,
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    def _limit(self, scope: dict[str, Any]) -> int | None:
+        """Returns the body size limit of a request, or None if unlimited."""
+        if scope["type"] != "http":
+            return None
+        for prefix, limit in self.limits.items():
+            if scope["path"].startswith(prefix):
+                return limit
+        return None
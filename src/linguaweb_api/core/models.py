@@ -1,5 +1,6 @@
 """Basic settings for all SQL tables."""
 import datetime
+import enum
 from typing import Any
 
 import sqlalchemy
@@ -76,3 +77,72 @@ class Word(BaseTable):
     antonyms: orm.Mapped[str] = orm.mapped_column(CommaSeparatedList)
     jeopardy: orm.Mapped[str] = orm.mapped_column(sqlalchemy.String(1024))
     s3_key: orm.Mapped[str] = orm.mapped_column(sqlalchemy.String(1024), unique=True)
+
+
+class JobStatus(str, enum.Enum):
+    """Statuses of an ingestion job."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+
+
+class JobWordStatus(str, enum.Enum):
+    """Statuses of a word within an ingestion job."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    ADDED = "added"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+
+
+class IngestionJob(BaseTable):
+    """Table for jobs that add words in the background."""
+
+    __tablename__ = "ingestion_jobs"
+
+    status: orm.Mapped[JobStatus] = orm.mapped_column(
+        sqlalchemy.Enum(JobStatus, native_enum=False, length=16),
+        default=JobStatus.PENDING,
+    )
+    time_started: orm.Mapped[datetime.datetime | None] = orm.mapped_column(
+        sqlalchemy.DateTime(timezone=True),
+    )
+    time_finished: orm.Mapped[datetime.datetime | None] = orm.mapped_column(
+        sqlalchemy.DateTime(timezone=True),
+    )
+    words: orm.Mapped[list["IngestionJobWord"]] = orm.relationship(
+        back_populates="job",
+        order_by="IngestionJobWord.id",
+    )
+
+
+class IngestionJobWord(BaseTable):
+    """Table for the words of an ingestion job and their progress."""
+
+    __tablename__ = "ingestion_job_words"
+
+    job_id: orm.Mapped[int] = orm.mapped_column(
+        sqlalchemy.ForeignKey("ingestion_jobs.id"),
+        index=True,
+    )
+    word: orm.Mapped[str] = orm.mapped_column(sqlalchemy.String(64))
+    status: orm.Mapped[JobWordStatus] = orm.mapped_column(
+        sqlalchemy.Enum(JobWordStatus, native_enum=False, length=16),
+        default=JobWordStatus.PENDING,
+        index=True,
+    )
+    attempts: orm.Mapped[int] = orm.mapped_column(default=0)
+    detail: orm.Mapped[str | None] = orm.mapped_column(sqlalchemy.String(1024))
+    word_id: orm.Mapped[int | None] = orm.mapped_column(
+        sqlalchemy.ForeignKey("words.id"),
+    )
+    time_claimed: orm.Mapped[datetime.datetime | None] = orm.mapped_column(
+        sqlalchemy.DateTime(timezone=True),
+    )
+    time_finished: orm.Mapped[datetime.datetime | None] = orm.mapped_column(
+        sqlalchemy.DateTime(timezone=True),
+    )
+
+    job: orm.Mapped[IngestionJob] = orm.relationship(back_populates="words")
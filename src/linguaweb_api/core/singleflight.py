@@ -0,0 +1,51 @@
+"""Coalescing of concurrent identical operations."""
+import asyncio
+from collections import abc
+from typing import Any, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """Runs at most one operation per key at a time within this process.
+
+    Callers that request a key while its operation is in flight await the same
+    operation instead of starting their own. The operation runs in its own task,
+    so it is not cancelled if the caller that started it is cancelled.
+    """
+
+    def __init__(self) -> None:
+        """Initializes a new instance of the SingleFlight class."""
+        self._flights: dict[str, asyncio.Task[T]] = {}
+
+    def __contains__(self, key: str) -> bool:
+        """Returns whether an operation is in flight for a key."""
+        return key in self._flights
+
+    async def do(
+        self,
+        key: str,
+        function: abc.Callable[[], abc.Coroutine[Any, Any, T]],
+    ) -> T:
+        """Runs an operation, or joins the one in flight for the same key.
+
+        Args:
+            key: The key identifying the operation.
+            function: Returns the coroutine of the operation, only called if no
+                operation is in flight for the key.
+
+        Returns:
+            The result of the operation.
+        """
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.create_task(function())
+            self._flights[key] = task
+            task.add_done_callback(lambda _: self._land(key))
+        return await asyncio.shield(task)
+
+    def _land(self, key: str) -> None:
+        """Removes a finished operation, retrieving its exception if unawaited."""
+        task = self._flights.pop(key)
+        if not task.cancelled():
+            task.exception()
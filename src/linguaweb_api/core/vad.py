@@ -0,0 +1,160 @@
+"""Voice activity detection for segmenting streamed speech.
+
+Audio is expected as 16-bit little-endian mono PCM. A frame of audio is
+considered voiced if its RMS energy exceeds a threshold, which is robust
+enough to find the pauses between utterances of a single speaker.
+"""
+import array
+import collections
+import io
+import math
+import operator
+import sys
+import wave
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+
+
+class VoiceActivitySegmenter:
+    """Splits a stream of PCM audio into segments of speech.
+
+    A segment starts at the first voiced frame, preceded by a short pre-roll
+    so that soft onsets are not cut off. It ends after a period of silence or
+    once it reaches the maximum duration. Segments with too little voiced
+    audio, such as clicks, are dropped.
+
+    Attributes:
+        threshold: The RMS energy above which a frame is voiced.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        threshold: float,
+        min_silence: float,
+        sample_rate: int = SAMPLE_RATE,
+        frame_duration: float = 0.03,
+        min_speech: float = 0.2,
+        max_segment: float = 15.0,
+        pre_roll: float = 0.2,
+    ) -> None:
+        """Initializes a new instance of the VoiceActivitySegmenter class.
+
+        Args:
+            threshold: The RMS energy, out of 32768, above which a frame is
+                voiced.
+            min_silence: Seconds of silence that end a segment.
+            sample_rate: The sample rate of the audio.
+            frame_duration: Seconds of audio per analysed frame.
+            min_speech: Seconds of voiced audio below which a segment is
+                dropped.
+            max_segment: Seconds after which a segment is ended regardless.
+            pre_roll: Seconds of audio kept before the first voiced frame.
+        """
+        self.threshold = threshold
+        frame_samples = int(sample_rate * frame_duration)
+        self._frame_size = frame_samples * SAMPLE_WIDTH
+        self._silence_frames = math.ceil(min_silence / frame_duration)
+        self._speech_frames = math.ceil(min_speech / frame_duration)
+        self._max_segment_size = int(sample_rate * max_segment) * SAMPLE_WIDTH
+        self._pre_roll: collections.deque[bytes] = collections.deque(
+            maxlen=max(1, round(pre_roll / frame_duration)),
+        )
+        self._buffer = bytearray()
+        self._segment = bytearray()
+        self._voiced = 0
+        self._silent = 0
+
+    def feed(self, pcm: bytes) -> list[bytes]:
+        """Adds audio and returns the segments it completed.
+
+        Args:
+            pcm: The audio, in chunks of any size.
+
+        Returns:
+            The PCM audio of each completed segment.
+        """
+        self._buffer.extend(pcm)
+        segments = []
+        while len(self._buffer) >= self._frame_size:
+            frame = bytes(self._buffer[: self._frame_size])
+            del self._buffer[: self._frame_size]
+            segment = self._process(frame)
+            if segment is not None:
+                segments.append(segment)
+        return segments
+
+    def flush(self) -> bytes | None:
+        """Ends the current segment at the end of the stream.
+
+        Returns:
+            The PCM audio of the last segment, or None if there is none.
+        """
+        if self._segment:
+            self._segment.extend(self._buffer)
+        self._buffer.clear()
+        self._pre_roll.clear()
+        return self._end()
+
+    def _process(self, frame: bytes) -> bytes | None:
+        """Processes a frame and returns the segment it completed, if any."""
+        voiced = _rms(frame) > self.threshold
+        if not self._segment:
+            if not voiced:
+                self._pre_roll.append(frame)
+                return None
+            self._segment.extend(b"".join(self._pre_roll))
+            self._pre_roll.clear()
+
+        self._segment.extend(frame)
+        if voiced:
+            self._voiced += 1
+            self._silent = 0
+        else:
+            self._silent += 1
+        if (
+            self._silent >= self._silence_frames
+            or len(self._segment) >= self._max_segment_size
+        ):
+            return self._end()
+        return None
+
+    def _end(self) -> bytes | None:
+        """Ends the current segment, dropping it if it has too little speech."""
+        segment = bytes(self._segment)
+        voiced = self._voiced
+        self._segment.clear()
+        self._voiced = 0
+        self._silent = 0
+        if voiced < self._speech_frames:
+            return None
+        return segment
+
+
+def to_wav(pcm: bytes, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """Wraps PCM audio in a WAV container.
+
+    Args:
+        pcm: The 16-bit mono PCM audio.
+        sample_rate: The sample rate of the audio.
+
+    Returns:
+        The WAV file.
+    """
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(SAMPLE_WIDTH)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def _rms(frame: bytes) -> float:
+    """Returns the RMS energy of a frame of 16-bit little-endian PCM."""
+    samples = array.array("h", frame)
+    if sys.byteorder == "big":
+        samples.byteswap()
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(map(operator.mul, samples, samples)) / len(samples))
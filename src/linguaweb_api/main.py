@@ -1,23 +1,60 @@
 """Entrypoint for the API."""
+import contextlib
 import logging
+from collections import abc
 
 import fastapi
 from fastapi.middleware import cors
 
-from linguaweb_api.core import config, middleware
-from linguaweb_api.microservices import sql
+from linguaweb_api.core import catalog, config, generation_cache, middleware
+from linguaweb_api.microservices import openai, s3, sql, transcoder
+from linguaweb_api.routers.admin import jobs
 from linguaweb_api.routers.admin import views as admin_views
 from linguaweb_api.routers.health import views as health_views
+from linguaweb_api.routers.speech import controller as speech_controller
 from linguaweb_api.routers.speech import views as speech_views
 from linguaweb_api.routers.words import views as words_views
 
 settings = config.get_settings()
 LOGGER_NAME = settings.LOGGER_NAME
+JOB_WORKERS = settings.JOB_WORKERS
 
 config.initialize_logger()
 logger = logging.getLogger(LOGGER_NAME)
 
 
+@contextlib.asynccontextmanager
+async def lifespan(_app: fastapi.FastAPI) -> abc.AsyncGenerator[None, None]:
+    """Initializes the microservices on startup and releases them on shutdown.
+
+    Args:
+        _app: The FastAPI application.
+    """
+    logger.info("Initializing microservices.")
+    logger.debug("Initializing SQL microservice.")
+    sql.get_database().create_database()
+    logger.debug("Loading word catalog.")
+    with sql.get_database().session_factory() as session:
+        catalog.get_word_catalog().load(session)
+    logger.debug("Initializing S3 microservice.")
+    s3.get_s3_client()
+    if JOB_WORKERS > 0:
+        logger.debug("Starting job worker.")
+        jobs.get_job_worker().start()
+
+    yield
+
+    logger.info("Shutting down microservices.")
+    await jobs.get_job_worker().stop()
+    jobs.get_job_worker.cache_clear()
+    sql.dispose_database()
+    await openai.close_client()
+    s3.get_s3_client.cache_clear()
+    catalog.get_word_catalog.cache_clear()
+    generation_cache.close_generation_cache()
+    transcoder.get_transcoder.cache_clear()
+
+
 logger.info("Starting API.")
 app = fastapi.FastAPI(
     title="LinguaWeb API",
@@ -29,6 +66,7 @@ app = fastapi.FastAPI(
     },
     swagger_ui_parameters={"operationsSorter": "method"},
     openapi_tags=config.open_api_specification(),  # type: ignore[arg-type] # Our class is more specific.
+    lifespan=lifespan,
 )
 
 logger.info("Initializing API routes.")
@@ -39,12 +77,18 @@ base_router.include_router(speech_views.router)
 base_router.include_router(words_views.router)
 app.include_router(base_router)
 
-logger.info("Initializing microservices.")
-logger.debug("Initializing SQL microservice.")
-database = sql.Database()
-database.create_database()
-
 logger.info("Adding middleware.")
+# Middleware added later wraps middleware added earlier. The body size limit is
+# added before CORS, such that its responses carry CORS headers.
+logger.debug("Adding body size limit middleware.")
+speech_prefix = base_router.prefix + speech_views.router.prefix
+app.add_middleware(
+    middleware.BodySizeLimitMiddleware,
+    limits={
+        speech_prefix: speech_controller.MAX_BODY_SIZE,
+        f"{speech_prefix}/transcribe/batch": speech_controller.MAX_BATCH_BODY_SIZE,
+    },
+)
 logger.debug("Adding CORS middleware.")
 app.add_middleware(
     cors.CORSMiddleware,
@@ -53,5 +97,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+logger.debug("Adding deadline middleware.")
+app.add_middleware(
+    middleware.DeadlineMiddleware,
+    exempt=[f"{base_router.prefix}{admin_views.router.prefix}/add_preset_words"],
+)
 logger.debug("Adding request logger middleware.")
 app.add_middleware(middleware.RequestLoggerMiddleware)
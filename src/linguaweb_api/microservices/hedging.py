@@ -0,0 +1,128 @@
+"""Hedging of requests to external services with a long latency tail."""
+import asyncio
+import collections
+import logging
+import math
+import time
+from collections import abc
+from typing import Any, TypeVar
+
+from linguaweb_api.core import config
+
+settings = config.get_settings()
+LOGGER_NAME = settings.LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+T = TypeVar("T")
+
+
+class HedgingPolicy:
+    """Sends a duplicate request when a request is slower than usual.
+
+    Once a request has been in flight for longer than the given percentile of
+    recent latencies, a second identical request is sent and the first
+    response is used; the other request is cancelled. Requests are not hedged
+    until enough latencies have been observed.
+
+    Attributes:
+        percentile: The percentile of latencies, between 0 and 1, after which
+            a request is hedged.
+        min_samples: The number of latencies observed before hedging.
+        requests: The number of requests.
+        hedges: The number of hedged requests.
+        hedge_wins: The number of hedged requests answered by the hedge.
+    """
+
+    def __init__(
+        self,
+        percentile: float,
+        min_samples: int = 20,
+        window: int = 1000,
+    ) -> None:
+        """Initializes a new instance of the HedgingPolicy class.
+
+        Args:
+            percentile: The percentile of latencies, between 0 and 1, after
+                which a request is hedged.
+            min_samples: The number of latencies observed before hedging.
+            window: The number of recent latencies the percentile is taken of.
+        """
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._latencies: collections.deque[float] = collections.deque(maxlen=window)
+
+    def delay(self) -> float | None:
+        """Returns the seconds after which a request is hedged.
+
+        Returns:
+            The delay, or None if too few latencies have been observed.
+        """
+        if len(self._latencies) < max(1, self.min_samples):
+            return None
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, math.floor(self.percentile * len(ordered)))
+        return ordered[index]
+
+    async def run(
+        self,
+        function: abc.Callable[[], abc.Awaitable[T]],
+        admit: abc.Callable[[], bool] | None = None,
+    ) -> T:
+        """Runs a request, hedging it if it is slow.
+
+        Args:
+            function: Sends the request; called a second time to hedge.
+            admit: Called before the request is hedged; the request is not
+                hedged if it returns False. Defaults to always hedging.
+
+        Returns:
+            The first successful response.
+
+        Raises:
+            Exception: The exception of the original request if all requests
+                failed.
+        """
+        self.requests += 1
+        primary = asyncio.ensure_future(self._timed(function))
+        tasks = [primary]
+        delay = self.delay()
+        try:
+            await asyncio.wait(tasks, timeout=delay)
+            if not primary.done() and (admit is None or admit()):
+                logger.debug("Hedging request after %.2fs.", delay)
+                self.hedges += 1
+                tasks.append(asyncio.ensure_future(self._timed(function)))
+
+            pending: set[asyncio.Future[Any]] = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+            return primary.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _timed(self, function: abc.Callable[[], abc.Awaitable[T]]) -> T:
+        """Runs a request and records its latency if it succeeds.
+
+        Args:
+            function: Sends the request.
+
+        Returns:
+            The response.
+        """
+        start = time.monotonic()
+        result = await function()
+        self._latencies.append(time.monotonic() - start)
+        return result
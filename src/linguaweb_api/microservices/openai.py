@@ -1,14 +1,18 @@
 """This module contains interactions with OpenAI models."""
 import abc
+import asyncio
+import functools
 import logging
-import pathlib
-from typing import Any, Literal, TypedDict
+from collections import abc as collections_abc
+from typing import Any, Literal, TypedDict, TypeVar
 
 import fastapi
+import httpx
 import openai
 from fastapi import status
 
-from linguaweb_api.core import config
+from linguaweb_api.core import config, deadline, generation_cache
+from linguaweb_api.microservices import hedging, rate_limit
 
 settings = config.get_settings()
 OPENAI_API_KEY = settings.OPENAI_API_KEY
@@ -16,10 +20,26 @@ OPENAI_GPT_MODEL = settings.OPENAI_GPT_MODEL
 OPENAI_TTS_MODEL = settings.OPENAI_TTS_MODEL
 OPENAI_STT_MODEL = settings.OPENAI_STT_MODEL
 OPENAI_VOICE = settings.OPENAI_VOICE
+OPENAI_TIMEOUT = settings.OPENAI_TIMEOUT
+OPENAI_MAX_CONNECTIONS = settings.OPENAI_MAX_CONNECTIONS
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS
+OPENAI_KEEPALIVE_EXPIRY = settings.OPENAI_KEEPALIVE_EXPIRY
+OPENAI_REQUESTS_PER_MINUTE = settings.OPENAI_REQUESTS_PER_MINUTE
+OPENAI_RATE_LIMITS = settings.OPENAI_RATE_LIMITS
+OPENAI_MAX_CONCURRENCY = settings.OPENAI_MAX_CONCURRENCY
+OPENAI_RATE_LIMIT_RETRIES = settings.OPENAI_RATE_LIMIT_RETRIES
+OPENAI_HEDGE_PERCENTILE = settings.OPENAI_HEDGE_PERCENTILE
+OPENAI_HEDGE_MIN_SAMPLES = settings.OPENAI_HEDGE_MIN_SAMPLES
 LOGGER_NAME = settings.LOGGER_NAME
 
 logger = logging.getLogger(LOGGER_NAME)
 
+T = TypeVar("T")
+
+# Completion tokens reserved for a GPT request until its usage is known.
+_COMPLETION_TOKEN_ESTIMATE = 256
+_CHARACTERS_PER_TOKEN = 4
+
 
 class Message(TypedDict):
     """A message object."""
@@ -28,18 +48,171 @@ class Message(TypedDict):
     content: str
 
 
+@functools.lru_cache
+def get_client() -> openai.AsyncOpenAI:
+    """Returns the process-wide asynchronous OpenAI client.
+
+    The client keeps a pool of keep-alive connections to the OpenAI API that is
+    shared by all model classes. Retries are left to the rate limiters, such
+    that they can adapt to rejected requests.
+
+    Returns:
+        The OpenAI client.
+    """
+    logger.debug("Initializing OpenAI client.")
+    http_client = httpx.AsyncClient(
+        timeout=OPENAI_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+        ),
+    )
+    return openai.AsyncOpenAI(
+        api_key=OPENAI_API_KEY.get_secret_value(),
+        http_client=http_client,
+        max_retries=0,
+    )
+
+
+async def close_client() -> None:
+    """Closes the process-wide OpenAI client, if one was created."""
+    if get_client.cache_info().currsize:
+        await get_client().close()
+    get_client.cache_clear()
+
+
+@functools.lru_cache
+def get_rate_limiter(model: str) -> rate_limit.RateLimiter:
+    """Returns the process-wide rate limiter of an OpenAI model.
+
+    Args:
+        model: The name of the model.
+
+    Returns:
+        The rate limiter, with the budget of the model in OPENAI_RATE_LIMITS.
+    """
+    budget = OPENAI_RATE_LIMITS.get(
+        model,
+        config.ModelRateLimit(requests_per_minute=OPENAI_REQUESTS_PER_MINUTE),
+    )
+    logger.debug("Initializing rate limiter for %s: %s", model, budget)
+    return rate_limit.RateLimiter(
+        requests_per_minute=budget.requests_per_minute,
+        tokens_per_minute=budget.tokens_per_minute,
+        max_concurrency=OPENAI_MAX_CONCURRENCY,
+        max_retries=OPENAI_RATE_LIMIT_RETRIES,
+    )
+
+
+@functools.lru_cache
+def get_hedging_policy(model: str) -> hedging.HedgingPolicy | None:
+    """Returns the process-wide hedging policy of an OpenAI model.
+
+    Args:
+        model: The name of the model.
+
+    Returns:
+        The hedging policy, or None if hedging is disabled.
+    """
+    if OPENAI_HEDGE_PERCENTILE is None:
+        return None
+    logger.debug("Initializing hedging policy for %s.", model)
+    return hedging.HedgingPolicy(
+        percentile=OPENAI_HEDGE_PERCENTILE,
+        min_samples=OPENAI_HEDGE_MIN_SAMPLES,
+    )
+
+
 class OpenAIBaseClass(abc.ABC):
     """An abstract base class for OpenAI models.
 
-    This class initializes the OpenAI client.
+    This class fetches the shared OpenAI client, the rate limiter of the model
+    and the generation cache. Subclasses opt in to hedging of slow requests by
+    setting `hedged`.
 
     Attributes:
+        model: The name of the model.
+        hedged: Whether slow requests to the model are hedged.
+        timeout: Seconds after which a single request is abandoned.
         client: The OpenAI client used to interact with the model.
+        rate_limiter: The rate limiter of the model.
+        hedging_policy: The hedging policy of the model, or None if the model
+            is not hedged.
+        generation_cache: The cache of generations, or None if disabled.
     """
 
+    model: str
+    hedged: bool = False
+    timeout: float = OPENAI_TIMEOUT
+
     def __init__(self) -> None:
         """Initializes a new instance of the OpenAIBaseClass class."""
-        self.client = openai.OpenAI(api_key=OPENAI_API_KEY.get_secret_value())
+        self.client = get_client()
+        self.rate_limiter = get_rate_limiter(self.model)
+        self.hedging_policy = get_hedging_policy(self.model) if self.hedged else None
+        self.generation_cache = generation_cache.get_generation_cache()
+
+    async def _request(
+        self,
+        function: collections_abc.Callable[[], collections_abc.Awaitable[T]],
+        tokens: float = 0,
+    ) -> T:
+        """Sends a request through the rate limiter of the model.
+
+        Each attempt is bounded by the timeout of the model, and the request
+        as a whole, including retries and hedges, by the current deadline.
+        Attempts are hedged within their rate limiter slot, such that time
+        spent waiting for the rate limiter neither triggers nor skews hedges.
+        A hedge takes its own request and tokens from the rate limiter, and is
+        not sent if they are not available.
+
+        Args:
+            function: Sends the request.
+            tokens: The estimated number of tokens used by the request.
+
+        Returns:
+            The response.
+
+        Raises:
+            fastapi.HTTPException: 504 If the request timed out or the deadline
+                passed.
+        """
+
+        async def attempt() -> T:
+            try:
+                async with asyncio.timeout(self.timeout):
+                    return await function()
+            except openai.APITimeoutError as exception_info:
+                raise TimeoutError from exception_info
+            except openai.RateLimitError as exception_info:
+                if exception_info.code == "insufficient_quota":
+                    raise
+                retry_after = _retry_after(exception_info.response.headers)
+                raise rate_limit.Overloaded(retry_after) from exception_info
+            except openai.InternalServerError as exception_info:
+                retry_after = _retry_after(exception_info.response.headers)
+                raise rate_limit.Overloaded(retry_after) from exception_info
+            except openai.APIConnectionError as exception_info:
+                raise rate_limit.Overloaded from exception_info
+
+        async def hedged_attempt() -> T:
+            if self.hedging_policy:
+                return await self.hedging_policy.run(
+                    attempt,
+                    admit=lambda: self.rate_limiter.try_acquire(tokens),
+                )
+            return await attempt()
+
+        try:
+            async with deadline.timeout():
+                return await self.rate_limiter.run(hedged_attempt, tokens)
+        except TimeoutError as exception_info:
+            logger.warning("Request to %s timed out.", self.model)
+            raise fastapi.HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="OpenAI did not respond in time.",
+            ) from exception_info
 
     @abc.abstractmethod
     def run(self, *_args: Any, **_kwargs: Any) -> Any:  # noqa: ANN401
@@ -50,43 +223,81 @@ class OpenAIBaseClass(abc.ABC):
 class GPT(OpenAIBaseClass):
     """A class for running the GPT models."""
 
+    model = OPENAI_GPT_MODEL.value
+    hedged = True
+
     async def run(
         self,
         *,
         prompt: str,
         system_prompt: str,
+        json_mode: bool = False,
     ) -> str:
         """Runs the GPT model.
 
         Args:
             prompt: The prompt to run the model on.
             system_prompt: The system prompt to run the model on.
-            model: The name of the GPT model to use.
+            json_mode: Whether to constrain the response to a JSON object. The
+                system prompt must then ask for JSON.
 
         Returns:
             The model's response.
         """
+        cache_key = generation_cache.generation_key(
+            model=OPENAI_GPT_MODEL.value,
+            system_prompt=system_prompt,
+            prompt=prompt,
+            response_format="json_object" if json_mode else "text",
+        )
+        if self.generation_cache:
+            cached = await self.generation_cache.get(cache_key)
+            if cached is not None:
+                return cached.decode()
+
         messages = [
             Message(role="system", content=system_prompt),
             Message(role="user", content=prompt),
         ]
 
-        response = self.client.chat.completions.create(
-            model=OPENAI_GPT_MODEL,
-            messages=messages,  # type: ignore[arg-type]
+        arguments: dict[str, Any] = {}
+        if json_mode:
+            arguments["response_format"] = {"type": "json_object"}
+
+        estimated_tokens = (
+            len(system_prompt + prompt) // _CHARACTERS_PER_TOKEN
+            + _COMPLETION_TOKEN_ESTIMATE
         )
+        response = await self._request(
+            lambda: self.client.chat.completions.create(
+                model=OPENAI_GPT_MODEL,
+                messages=messages,  # type: ignore[arg-type]
+                **arguments,
+            ),
+            tokens=estimated_tokens,
+        )
+        if response.usage:
+            self.rate_limiter.settle_tokens(
+                estimated_tokens,
+                response.usage.total_tokens,
+            )
 
-        if not response.choices[0].message.content:
+        content = response.choices[0].message.content
+        if not content:
             raise fastapi.HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Faulty response from OpenAI.",
             )
-        return response.choices[0].message.content
+        if self.generation_cache:
+            await self.generation_cache.put(cache_key, content.encode())
+        return content
 
 
 class TextToSpeech(OpenAIBaseClass):
     """A class for running the Text-To-Speech models."""
 
+    model = OPENAI_TTS_MODEL.value
+
     async def run(self, text: str) -> bytes:
         """Runs the Text-To-Speech model.
 
@@ -97,31 +308,70 @@ class TextToSpeech(OpenAIBaseClass):
         Returns:
             The model's response.
         """
-        response = self.client.audio.speech.create(
+        cache_key = generation_cache.generation_key(
             model=OPENAI_TTS_MODEL.value,
             voice=OPENAI_VOICE.value,
             input=text,
         )
+        if self.generation_cache:
+            cached = await self.generation_cache.get(cache_key)
+            if cached is not None:
+                return cached
 
-        return b"".join(response.iter_bytes())
+        response = await self._request(
+            lambda: self.client.audio.speech.create(
+                model=OPENAI_TTS_MODEL.value,
+                voice=OPENAI_VOICE.value,
+                input=text,
+            ),
+        )
+
+        if self.generation_cache:
+            await self.generation_cache.put(cache_key, response.content)
+        return response.content
 
 
 class SpeechToText(OpenAIBaseClass):
     """A class for running the Speech-To-Text models."""
 
-    async def run(self, audio_file: pathlib.Path | str) -> str:
+    model = OPENAI_STT_MODEL.value
+    hedged = True
+
+    async def run(self, audio: bytes, filename: str = "audio.mp3") -> str:
         """Runs the Speech-To-Text model.
 
         Args:
-            audio_file: The audio to convert to text.
-            model: The name of the Speech-To-Text model to use.
+            audio: The audio to convert to text.
+            filename: The filename sent with the audio, its extension tells
+                OpenAI the format of the audio.
 
         Returns:
             The model's response.
         """
-        with pathlib.Path(audio_file).open("rb") as audio:
-            return self.client.audio.transcriptions.create(
+        return await self._request(
+            lambda: self.client.audio.transcriptions.create(
                 model=OPENAI_STT_MODEL.value,
-                file=audio,
+                file=(filename, audio),
                 response_format="text",
-            )  # type: ignore[return-value] # response_format overrides output type.
+            ),
+        )
+
+
+def _retry_after(headers: httpx.Headers) -> float | None:
+    """Returns the seconds to wait that OpenAI specified in a response.
+
+    Args:
+        headers: The headers of the response.
+
+    Returns:
+        The seconds to wait, or None if not specified.
+    """
+    for name, seconds_per_unit in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return float(value) * seconds_per_unit
+        except ValueError:
+            continue
+    return None
@@ -39,6 +39,12 @@ class GPTModels(str, enum.Enum):
     GPT35_turbo = "gpt3-5-turbo"
 
 
+# Models that accept response_format={"type": "json_object"}.
+JSON_MODE_MODELS = frozenset(
+    {GPTModels.GPT4_1106_Preview, GPTModels.GPT35_turbo_1106},
+)
+
+
 class Prompts(str, enum.Enum):
     """A class representing the prompts for the GPT model."""
 
@@ -58,3 +64,11 @@ class Prompts(str, enum.Enum):
         "Return a very brief Jeopardy!-style description related to the following word "
         "without using the word (or number, if relevant) at all"
     )
+    WORD_TEXT_TASKS = (
+        "For the word provided by the user, return a JSON object with the keys "
+        '"description", "synonyms", "antonyms" and "jeopardy". "description" is a '
+        'brief definition of the word. "synonyms" and "antonyms" are lists of '
+        'single words or short phrases. "jeopardy" is a very brief Jeopardy!-style '
+        "description related to the word. None of the values may use the word (or "
+        "number, if relevant) at all."
+    )
@@ -0,0 +1,326 @@
+"""Rate limiting of requests to external services."""
+import asyncio
+import collections
+import logging
+import math
+import time
+from collections import abc
+from typing import TypeVar
+
+import fastapi
+from fastapi import status
+
+from linguaweb_api.core import config
+
+settings = config.get_settings()
+LOGGER_NAME = settings.LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+T = TypeVar("T")
+
+
+class Overloaded(Exception):  # noqa: N818
+    """Raised by a request that was rejected by an overloaded service.
+
+    This includes exceeding a rate limit (429) and server overload (5xx).
+
+    Attributes:
+        retry_after: Seconds the service asked to wait, if it specified any.
+    """
+
+    def __init__(self, retry_after: float | None = None) -> None:
+        """Initializes a new instance of the Overloaded class.
+
+        Args:
+            retry_after: Seconds the service asked to wait, if it specified any.
+        """
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """An asynchronous token bucket rate limiter.
+
+    Callers reserve tokens immediately and sleep until their reservation is
+    covered, so waiting callers are served in the order in which they arrived.
+    Reservations are made without awaiting, which makes the bucket safe to
+    share between tasks without a lock.
+
+    Attributes:
+        rate: The number of tokens added per second.
+        capacity: The maximum number of tokens, i.e. the allowed burst.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        """Initializes a new instance of the TokenBucket class.
+
+        Args:
+            rate: The number of tokens added per second.
+            capacity: The maximum number of tokens, i.e. the allowed burst.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last_refill = time.monotonic()
+
+    async def acquire(self, tokens: float = 1) -> None:
+        """Waits until the given number of tokens is available and takes them.
+
+        Args:
+            tokens: The number of tokens to take.
+        """
+        self._refill()
+        self._tokens -= tokens
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Takes the given number of tokens if they are available now.
+
+        Args:
+            tokens: The number of tokens to take.
+
+        Returns:
+            Whether the tokens were taken.
+        """
+        self._refill()
+        if self._tokens < tokens:
+            return False
+        self._tokens -= tokens
+        return True
+
+    def refund(self, tokens: float) -> None:
+        """Returns tokens that were taken but not used.
+
+        Negative refunds take additional tokens, e.g. when a request used more
+        tokens than estimated.
+
+        Args:
+            tokens: The number of tokens to return.
+        """
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens + tokens)
+
+    def _refill(self) -> None:
+        """Adds the tokens accrued since the last refill."""
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity,
+            self._tokens + (now - self._last_refill) * self.rate,
+        )
+        self._last_refill = now
+
+
+class AdaptiveConcurrency:
+    """A concurrency limit with additive increase, multiplicative decrease.
+
+    Every successful request raises the limit by 1/limit, i.e. by about one per
+    window of requests, and every overload multiplies it by the decrease factor.
+    Waiting callers are served in the order in which they arrived.
+
+    Attributes:
+        limit: The current concurrency limit.
+        minimum: The lowest concurrency limit.
+        maximum: The highest concurrency limit.
+        decrease_factor: The factor applied to the limit on overload.
+        in_flight: The number of callers holding a slot.
+    """
+
+    def __init__(
+        self,
+        maximum: int,
+        minimum: int = 1,
+        decrease_factor: float = 0.5,
+    ) -> None:
+        """Initializes a new instance of the AdaptiveConcurrency class.
+
+        Args:
+            maximum: The highest, and initial, concurrency limit.
+            minimum: The lowest concurrency limit.
+            decrease_factor: The factor applied to the limit on overload.
+        """
+        self.limit = float(maximum)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self._waiters: collections.deque[asyncio.Future[None]] = collections.deque()
+
+    async def acquire(self) -> None:
+        """Waits for a free slot and takes it."""
+        if not self._waiters and self.in_flight < self._slots():
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self) -> None:
+        """Releases a slot."""
+        self.in_flight -= 1
+        self._wake()
+
+    def on_success(self) -> None:
+        """Increases the limit additively after a successful request."""
+        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        self._wake()
+
+    def on_overload(self) -> None:
+        """Decreases the limit multiplicatively after an overload."""
+        self.limit = max(self.minimum, self.limit * self.decrease_factor)
+        logger.debug("Decreased concurrency limit to %.1f.", self.limit)
+
+    def _slots(self) -> int:
+        """Returns the number of slots allowed by the current limit."""
+        return max(self.minimum, math.floor(self.limit))
+
+    def _wake(self) -> None:
+        """Hands free slots to waiting callers."""
+        while self._waiters and self.in_flight < self._slots():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+
+class RateLimiter:
+    """Limits requests to a service by rate, token usage and concurrency.
+
+    Requests that are rejected with Overloaded are retried. Each rejection
+    halves the concurrency limit and pauses all requests for the time the
+    service asked for, or for an exponential backoff if it did not say.
+
+    Attributes:
+        requests: The bucket of requests.
+        tokens: The bucket of tokens, or None if tokens are not limited.
+        concurrency: The adaptive concurrency limit.
+        max_retries: The number of times a rejected request is retried.
+        backoff: Seconds to pause after the first rejection without a
+            retry-after, doubled on each retry.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float | None = None,
+        max_concurrency: int = 32,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+    ) -> None:
+        """Initializes a new instance of the RateLimiter class.
+
+        Args:
+            requests_per_minute: The maximum number of requests per minute.
+            tokens_per_minute: The maximum number of tokens per minute, or None
+                if tokens are not limited.
+            max_concurrency: The highest number of concurrent requests.
+            max_retries: The number of times a rejected request is retried.
+            backoff: Seconds to pause after the first rejection without a
+                retry-after, doubled on each retry.
+        """
+        self.requests = TokenBucket(requests_per_minute / 60, requests_per_minute)
+        self.tokens = (
+            TokenBucket(tokens_per_minute / 60, tokens_per_minute)
+            if tokens_per_minute
+            else None
+        )
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._paused_until = 0.0
+
+    async def run(
+        self,
+        function: abc.Callable[[], abc.Awaitable[T]],
+        tokens: float = 0,
+    ) -> T:
+        """Runs a request within the limits, retrying if it is rejected.
+
+        Args:
+            function: Sends the request; raises Overloaded if it was rejected.
+            tokens: The estimated number of tokens used by the request.
+
+        Returns:
+            The result of the request.
+
+        Raises:
+            fastapi.HTTPException: 503 If the request is still rejected after
+                all retries.
+        """
+        delay = self.backoff
+        for attempt in range(self.max_retries + 1):
+            await self._wait()
+            await self.requests.acquire()
+            if self.tokens and tokens:
+                await self.tokens.acquire(tokens)
+            await self.concurrency.acquire()
+            try:
+                result = await function()
+            except Overloaded as exception_info:
+                self.concurrency.on_overload()
+                delay = (
+                    exception_info.retry_after
+                    if exception_info.retry_after is not None
+                    else self.backoff * 2**attempt
+                )
+                self._paused_until = max(
+                    self._paused_until,
+                    time.monotonic() + delay,
+                )
+                logger.warning("Overloaded, pausing requests for %.2fs.", delay)
+                continue
+            finally:
+                self.concurrency.release()
+            self.concurrency.on_success()
+            return result
+
+        raise fastapi.HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Rate limit of an external service exceeded.",
+            headers={"Retry-After": str(math.ceil(delay))},
+        )
+
+    def try_acquire(self, tokens: float = 0) -> bool:
+        """Takes a request, and its tokens, if they are available now.
+
+        Used for optional requests, such as hedges, that are skipped rather than
+        delayed when the limits are reached.
+
+        Args:
+            tokens: The estimated number of tokens used by the request.
+
+        Returns:
+            Whether the request may be sent.
+        """
+        if time.monotonic() < self._paused_until:
+            return False
+        if not self.requests.try_acquire():
+            return False
+        if self.tokens and tokens and not self.tokens.try_acquire(tokens):
+            self.requests.refund(1)
+            return False
+        return True
+
+    def settle_tokens(self, estimated: float, actual: float) -> None:
+        """Corrects the token bucket once the actual token usage is known.
+
+        Args:
+            estimated: The number of tokens reserved for the request.
+            actual: The number of tokens used by the request.
+        """
+        if self.tokens:
+            self.tokens.refund(estimated - actual)
+
+    async def _wait(self) -> None:
+        """Waits while requests are paused after a rejection."""
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
@@ -1,7 +1,13 @@
 """Interactions with an S3/MinIO bucket."""
+import functools
 import logging
+import threading
+import time
+from collections import abc
+from typing import Any, NamedTuple
 
 import boto3
+from botocore import config as botocore_config
 from botocore import errorfactory
 
 from linguaweb_api.core import config
@@ -12,38 +18,66 @@ S3_ENDPOINT_URL = settings.S3_ENDPOINT_URL
 S3_ACCESS_KEY = settings.S3_ACCESS_KEY
 S3_SECRET_KEY = settings.S3_SECRET_KEY
 S3_REGION = settings.S3_REGION
+S3_MAX_POOL_CONNECTIONS = settings.S3_MAX_POOL_CONNECTIONS
+S3_CHUNK_SIZE = settings.S3_CHUNK_SIZE
+S3_PRESIGNED_URL_EXPIRY = settings.S3_PRESIGNED_URL_EXPIRY
+S3_PRESIGNED_URL_MARGIN = settings.S3_PRESIGNED_URL_MARGIN
 LOGGER_NAME = settings.LOGGER_NAME
 
 logger = logging.getLogger(LOGGER_NAME)
 
 
+class StreamedObject(NamedTuple):
+    """An object streamed from S3.
+
+    Attributes:
+        chunks: An iterator over the chunks of the object.
+        etag: The entity tag of the object.
+        content_length: The number of bytes in the chunks.
+        content_range: The Content-Range of the chunks, if a range was requested.
+    """
+
+    chunks: abc.Iterator[bytes]
+    etag: str
+    content_length: int
+    content_range: str | None
+
+
 class S3:
     """Client for interacting with an S3/MinIO bucket.
 
+    Uses a low-level boto3 client rather than a resource, as clients are safe to
+    share between threads.
+
     Attributes:
-        s3: The S3 resource.
-        bucket: The bucket.
+        client: The S3 client.
+        bucket_name: The name of the bucket.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, bucket_name: str = S3_BUCKET_NAME) -> None:
         """Initializes a new instance of the S3 class.
 
         Args:
-            bucket_name: The name of the bucket.
+            bucket_name: The name of the bucket, created if it does not exist.
         """
         logger.debug("Connecting to S3 at: %s", S3_ENDPOINT_URL)
-        self.s3 = boto3.resource(
+        self.client = boto3.client(
             "s3",
             region_name=S3_REGION,
             endpoint_url=S3_ENDPOINT_URL,
             aws_access_key_id=S3_ACCESS_KEY.get_secret_value(),
             aws_secret_access_key=S3_SECRET_KEY.get_secret_value(),
+            config=botocore_config.Config(
+                max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+            ),
         )
+        self.bucket_name = bucket_name
+        self._presigned_urls: dict[str, tuple[str, float]] = {}
+        self._presigned_urls_lock = threading.Lock()
 
-        if self._is_existing_bucket(S3_BUCKET_NAME):
-            self.bucket = self.s3.Bucket(S3_BUCKET_NAME)
-        else:
-            self.bucket = self.s3.create_bucket(Bucket=S3_BUCKET_NAME)
+        if not self._is_existing_bucket(bucket_name):
+            logger.debug("Creating bucket: %s", bucket_name)
+            self.client.create_bucket(Bucket=bucket_name)
 
     def create(self, key: str, data: bytes) -> None:
         """Creates an object in the bucket.
@@ -52,7 +86,7 @@ class S3:
             key: The key of the object.
             data: The data to store in the object.
         """
-        self.bucket.put_object(Key=key, Body=data)
+        self.client.put_object(Bucket=self.bucket_name, Key=key, Body=data)
 
     def read(self, key: str) -> bytes:
         """Reads an object from the bucket.
@@ -60,13 +94,118 @@ class S3:
         Args:
             key: The key of the object.
         """
-        return self.bucket.Object(key).get()["Body"].read()
+        response = self.client.get_object(Bucket=self.bucket_name, Key=key)
+        return response["Body"].read()
+
+    def delete(self, key: str) -> None:
+        """Deletes an object from the bucket, if present.
+
+        Args:
+            key: The key of the object.
+        """
+        self.client.delete_object(Bucket=self.bucket_name, Key=key)
+        with self._presigned_urls_lock:
+            self._presigned_urls.pop(key, None)
+
+    def stream(
+        self,
+        key: str,
+        *,
+        byte_range: str | None = None,
+        if_none_match: str | None = None,
+        chunk_size: int = S3_CHUNK_SIZE,
+    ) -> "StreamedObject":
+        """Streams an object from the bucket in chunks.
+
+        The object is requested immediately, such that missing keys, unmatched
+        conditions and invalid ranges raise here, but the body is only read as
+        the returned chunks are consumed.
+
+        Args:
+            key: The key of the object.
+            byte_range: An HTTP Range header to request part of the object.
+            if_none_match: An HTTP If-None-Match header; S3 responds with
+                a 304 error if it matches.
+            chunk_size: The maximum size of each chunk in bytes.
+
+        Returns:
+            The streamed object.
+        """
+        arguments = {"Bucket": self.bucket_name, "Key": key}
+        if byte_range:
+            arguments["Range"] = byte_range
+        if if_none_match:
+            arguments["IfNoneMatch"] = if_none_match
+        response = self.client.get_object(**arguments)
+        return StreamedObject(
+            chunks=_iterate_body(response["Body"], chunk_size),
+            etag=response["ETag"],
+            content_length=response["ContentLength"],
+            content_range=response.get("ContentRange"),
+        )
+
+    def presigned_url(self, key: str) -> str:
+        """Returns a presigned URL to download an object.
+
+        URLs are signed locally, without a request to S3, and are cached per
+        key until shortly before they expire.
+
+        Args:
+            key: The key of the object.
+
+        Returns:
+            The presigned URL.
+        """
+        now = time.monotonic()
+        with self._presigned_urls_lock:
+            cached = self._presigned_urls.get(key)
+            if cached and cached[1] > now:
+                return cached[0]
+
+        url = self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket_name, "Key": key},
+            ExpiresIn=S3_PRESIGNED_URL_EXPIRY,
+        )
+        renew_at = now + S3_PRESIGNED_URL_EXPIRY - S3_PRESIGNED_URL_MARGIN
+        with self._presigned_urls_lock:
+            self._presigned_urls[key] = (url, renew_at)
+        return url
 
     def _is_existing_bucket(self, bucket_name: str) -> bool:
-        """Ensure that the bucket exists, and if not, create it."""
+        """Checks whether the bucket exists."""
         try:
-            self.s3.meta.client.head_bucket(Bucket=bucket_name)
+            self.client.head_bucket(Bucket=bucket_name)
         except errorfactory.ClientError:
             return False
         else:
             return True
+
+
+def _iterate_body(body: Any, chunk_size: int) -> abc.Iterator[bytes]:  # noqa: ANN401
+    """Iterates over a botocore streaming body, closing it when done.
+
+    Args:
+        body: The botocore streaming body.
+        chunk_size: The maximum size of each chunk in bytes.
+
+    Returns:
+        An iterator over the chunks of the body.
+    """
+    try:
+        yield from body.iter_chunks(chunk_size)
+    finally:
+        body.close()
+
+
+@functools.lru_cache
+def get_s3_client() -> S3:
+    """Returns the process-wide S3 client.
+
+    The bucket is looked up, and created if needed, only when the client is
+    first constructed. Used for dependency injection in FastAPI.
+
+    Returns:
+        The S3 client.
+    """
+    return S3()
@@ -1,4 +1,5 @@
 """A module for interacting with the SQL database."""
+import functools
 import logging
 from collections import abc
 from typing import Any
@@ -15,6 +16,11 @@ POSTGRES_USER = settings.POSTGRES_USER
 POSTGRES_PASSWORD = settings.POSTGRES_PASSWORD
 SQLITE_FILE = settings.SQLITE_FILE
 ENVIRONMENT = settings.ENVIRONMENT
+SQL_POOL_SIZE = settings.SQL_POOL_SIZE
+SQL_MAX_OVERFLOW = settings.SQL_MAX_OVERFLOW
+SQL_POOL_RECYCLE = settings.SQL_POOL_RECYCLE
+SQL_POOL_PRE_PING = settings.SQL_POOL_PRE_PING
+SQL_STATEMENT_TIMEOUT = settings.SQL_STATEMENT_TIMEOUT
 
 logger = logging.getLogger(LOGGER_NAME)
 
@@ -28,7 +34,8 @@ class Database:
         """Initializes a new instance of the Database class.
 
         The Database class provides a high-level interface for interacting with a
-        PostgreSQL database.
+        PostgreSQL database. Each instance owns an engine and its connection
+        pool, so it should be created once per process; see `get_database`.
         """
         logger.debug("Initializing database.")
         db_url = self.get_db_url()
@@ -36,16 +43,28 @@ class Database:
         if ENVIRONMENT == "development":
             engine_args["connect_args"] = {"check_same_thread": False}
             engine_args["poolclass"] = pool.StaticPool
+        else:
+            engine_args["pool_size"] = SQL_POOL_SIZE
+            engine_args["max_overflow"] = SQL_MAX_OVERFLOW
+            engine_args["pool_recycle"] = SQL_POOL_RECYCLE
+            engine_args["pool_pre_ping"] = SQL_POOL_PRE_PING
+            if db_url.startswith("postgresql") and SQL_STATEMENT_TIMEOUT is not None:
+                engine_args["connect_args"] = {
+                    "options": f"-c statement_timeout={SQL_STATEMENT_TIMEOUT}",
+                }
 
         self.engine = sqlalchemy.create_engine(db_url, **engine_args)
-        self.session_factory = orm.scoped_session(
-            orm.sessionmaker(
-                autocommit=False,
-                autoflush=False,
-                bind=self.engine,
-            ),
+        self.session_factory = orm.sessionmaker(
+            autocommit=False,
+            autoflush=False,
+            bind=self.engine,
         )
 
+    def dispose(self) -> None:
+        """Closes all connections in the connection pool."""
+        logger.debug("Disposing database engine.")
+        self.engine.dispose()
+
     def create_database(self) -> None:
         """Creates the database schema."""
         logger.debug("Creating database schema.")
@@ -68,15 +87,35 @@ class Database:
         )
 
 
+@functools.lru_cache
+def get_database() -> Database:
+    """Returns the process-wide database instance.
+
+    The instance, and therefore its engine and connection pool, is created on
+    first use and shared by all subsequent requests.
+
+    Returns:
+        The database instance.
+    """
+    return Database()
+
+
+def dispose_database() -> None:
+    """Disposes of the process-wide database instance, if one was created."""
+    if get_database.cache_info().currsize:
+        get_database().dispose()
+    get_database.cache_clear()
+
+
 def get_session() -> abc.Generator[orm.Session, None, None]:
-    """Returns a database instance.
+    """Returns a database session from the shared connection pool.
 
     Used for dependency injection in FastAPI.
 
     Returns:
         orm.Session: A database session.
     """
-    session = Database().session_factory()
+    session = get_database().session_factory()
     try:
         yield session
     finally:
@@ -0,0 +1,452 @@
+"""Audio transcoding in ffmpeg subprocesses.
+
+Audio is piped through ffmpeg's stdin and stdout, so no temporary files are
+written and the event loop is not blocked while ffmpeg runs. The number of
+concurrent ffmpeg processes is bounded by the process-wide Transcoder.
+"""
+import asyncio
+import contextlib
+import functools
+import logging
+import math
+import pathlib
+import time
+from collections import abc
+
+import fastapi
+import ffmpeg
+from fastapi import status
+
+from linguaweb_api.core import config
+
+settings = config.get_settings()
+LOGGER_NAME = settings.LOGGER_NAME
+TRANSCODER_WORKERS = settings.TRANSCODER_WORKERS
+TRANSCODER_QUEUE_SIZE = settings.TRANSCODER_QUEUE_SIZE
+TRANSCODER_TIMEOUT = settings.TRANSCODER_TIMEOUT
+AUDIO_PREPROCESSING_PROFILE = settings.AUDIO_PREPROCESSING_PROFILE
+
+logger = logging.getLogger(LOGGER_NAME)
+
+TARGET_FORMAT = "mp3"
+
+# Whisper resamples to 16 kHz mono, so higher rates only add upload time.
+_SPEECH_OUTPUT_OPTIONS = {"ac": 1, "ar": 16000, "audio_bitrate": "32k"}
+_SILENCE_THRESHOLD = "-50dB"
+_SILENCE_KEPT = 0.1
+# Streams are decoded as soon as their first bytes arrive, rather than after
+# ffmpeg buffered seconds of input to analyse it.
+_STREAM_INPUT_OPTIONS = {"probesize": 4096, "analyzeduration": 0}
+_STREAM_READ_SIZE = 4096
+
+
+class Transcoder:
+    """Runs a bounded number of ffmpeg conversions at a time.
+
+    Conversions wait in a queue for a free worker. Once the queue is full, new
+    conversions are rejected immediately rather than adding to the backlog.
+
+    Attributes:
+        workers: The maximum number of concurrent conversions.
+        queue_size: The maximum number of conversions waiting for a worker.
+        timeout: Seconds after which a running conversion is abandoned.
+        running: The number of running conversions.
+        waiting: The number of conversions waiting for a worker.
+        completed: The number of successful conversions.
+        failed: The number of conversions that failed or timed out.
+        rejected: The number of conversions rejected because the queue was
+            full.
+        queue_seconds: The total seconds conversions waited for a worker.
+        conversion_seconds: The total seconds conversions ran.
+    """
+
+    def __init__(
+        self,
+        workers: int = TRANSCODER_WORKERS,
+        queue_size: int = TRANSCODER_QUEUE_SIZE,
+        timeout: float = TRANSCODER_TIMEOUT,
+    ) -> None:
+        """Initializes a new instance of the Transcoder class.
+
+        Args:
+            workers: The maximum number of concurrent conversions.
+            queue_size: The maximum number of conversions waiting for a worker.
+            timeout: Seconds after which a running conversion is abandoned.
+        """
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.running = 0
+        self.waiting = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.queue_seconds = 0.0
+        self.conversion_seconds = 0.0
+        self._slots = asyncio.Semaphore(workers)
+
+    async def transcode(
+        self,
+        chunks: abc.AsyncIterable[bytes],
+        profile: config.AudioProfiles = AUDIO_PREPROCESSING_PROFILE,
+    ) -> bytes:
+        """Transcodes audio to MP3 once a worker is free.
+
+        Args:
+            chunks: The chunks of the audio in any format that ffmpeg can
+                decode.
+            profile: The preprocessing applied to the audio.
+
+        Returns:
+            The audio as MP3.
+
+        Raises:
+            fastapi.HTTPException: 503 If the queue is full or the conversion
+                timed out.
+        """
+        return await self._convert(lambda: transcode(chunks, profile))
+
+    async def transcode_file(
+        self,
+        path: pathlib.Path,
+        profile: config.AudioProfiles = AUDIO_PREPROCESSING_PROFILE,
+    ) -> bytes:
+        """Transcodes an audio file to MP3 once a worker is free.
+
+        Args:
+            path: The path to the audio in any format that ffmpeg can decode.
+            profile: The preprocessing applied to the audio.
+
+        Returns:
+            The audio as MP3.
+
+        Raises:
+            fastapi.HTTPException: 503 If the queue is full or the conversion
+                timed out.
+        """
+        return await self._convert(lambda: transcode_file(path, profile))
+
+    async def _convert(
+        self,
+        conversion: abc.Callable[[], abc.Awaitable[bytes]],
+    ) -> bytes:
+        """Runs a conversion on a worker, abandoning it after the timeout.
+
+        Args:
+            conversion: Starts the conversion.
+
+        Returns:
+            The output of the conversion.
+
+        Raises:
+            fastapi.HTTPException: 503 If the queue is full or the conversion
+                timed out.
+        """
+        async with self._worker():
+            try:
+                async with asyncio.timeout(self.timeout):
+                    return await conversion()
+            except TimeoutError as exception_info:
+                logger.warning("Audio conversion timed out.")
+                raise fastapi.HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Audio conversion timed out.",
+                ) from exception_info
+
+    async def decode(
+        self,
+        chunks: abc.AsyncIterable[bytes],
+        sample_rate: int,
+    ) -> abc.AsyncGenerator[bytes, None]:
+        """Decodes streamed audio to PCM once a worker is free.
+
+        The worker is held for as long as the stream lasts. Streams are not
+        bounded by the conversion timeout, as they last as long as the client
+        speaks; their input must be bounded by the caller instead.
+
+        Args:
+            chunks: The chunks of the audio in any format that ffmpeg can
+                decode from a stream.
+            sample_rate: The sample rate of the output.
+
+        Yields:
+            Chunks of 16-bit little-endian mono PCM audio.
+
+        Raises:
+            fastapi.HTTPException: 503 If the queue is full.
+        """
+        async with self._worker(), contextlib.aclosing(
+            decode(chunks, sample_rate),
+        ) as decoded:
+            async for pcm in decoded:
+                yield pcm
+
+    @contextlib.asynccontextmanager
+    async def _worker(self) -> abc.AsyncGenerator[None, None]:
+        """Holds a worker for a conversion, counting and timing it.
+
+        Raises:
+            fastapi.HTTPException: 503 If the queue is full.
+        """
+        if self._slots.locked() and self.waiting >= self.queue_size:
+            self.rejected += 1
+            logger.warning("Transcoder queue is full, rejecting conversion.")
+            raise fastapi.HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many audio files are being converted.",
+                headers={"Retry-After": str(math.ceil(self.timeout))},
+            )
+
+        queued = time.monotonic()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        started = time.monotonic()
+        self.queue_seconds += started - queued
+        self.running += 1
+        try:
+            yield
+        except BaseException:
+            self.failed += 1
+            raise
+        finally:
+            self.running -= 1
+            self.conversion_seconds += time.monotonic() - started
+            self._slots.release()
+        self.completed += 1
+
+
+@functools.lru_cache
+def get_transcoder() -> Transcoder:
+    """Returns the process-wide transcoder.
+
+    Returns:
+        The transcoder.
+    """
+    return Transcoder()
+
+
+async def transcode(
+    chunks: abc.AsyncIterable[bytes],
+    profile: config.AudioProfiles = AUDIO_PREPROCESSING_PROFILE,
+) -> bytes:
+    """Transcodes audio to MP3, without a limit on concurrent conversions.
+
+    The input is written to ffmpeg while it is being received. Formats that
+    can only be decoded from a seekable file, such as MP4 with its index at
+    the end, must be converted with transcode_file instead.
+
+    Args:
+        chunks: The chunks of the audio in any format that ffmpeg can decode.
+        profile: The preprocessing applied to the audio.
+
+    Returns:
+        The audio as MP3.
+
+    Raises:
+        fastapi.HTTPException: 400 If ffmpeg could not convert the audio.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *ffmpeg_arguments(profile),
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    if process.stdin is None or process.stdout is None or process.stderr is None:
+        msg = "ffmpeg was started without pipes."
+        raise RuntimeError(msg)
+
+    try:
+        _, output, errors = await asyncio.gather(
+            _feed(process.stdin, chunks),
+            process.stdout.read(),
+            process.stderr.read(),
+        )
+    except BaseException:
+        with contextlib.suppress(ProcessLookupError):
+            process.kill()
+        raise
+    finally:
+        await process.wait()
+
+    _check_conversion(process, errors)
+    return output
+
+
+async def transcode_file(
+    path: pathlib.Path,
+    profile: config.AudioProfiles = AUDIO_PREPROCESSING_PROFILE,
+) -> bytes:
+    """Transcodes an audio file to MP3, without a limit on concurrent conversions.
+
+    ffmpeg reads the file itself, so it can seek in formats that require it.
+
+    Args:
+        path: The path to the audio in any format that ffmpeg can decode.
+        profile: The preprocessing applied to the audio.
+
+    Returns:
+        The audio as MP3.
+
+    Raises:
+        fastapi.HTTPException: 400 If ffmpeg could not convert the audio.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *_build_arguments(profile, str(path)),
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        output, errors = await process.communicate()
+    except BaseException:
+        with contextlib.suppress(ProcessLookupError):
+            process.kill()
+        await process.wait()
+        raise
+
+    _check_conversion(process, errors)
+    return output
+
+
+async def decode(
+    chunks: abc.AsyncIterable[bytes],
+    sample_rate: int,
+) -> abc.AsyncGenerator[bytes, None]:
+    """Decodes streamed audio to PCM while it is being received.
+
+    Args:
+        chunks: The chunks of the audio in any format that ffmpeg can decode
+            from a stream.
+        sample_rate: The sample rate of the output.
+
+    Yields:
+        Chunks of 16-bit little-endian mono PCM audio, as soon as ffmpeg
+        decoded them.
+
+    Raises:
+        fastapi.HTTPException: 400 If ffmpeg could not decode the audio.
+    """
+    arguments = (
+        ffmpeg.input("pipe:", **_STREAM_INPUT_OPTIONS)
+        .output("pipe:", format="s16le", ac=1, ar=sample_rate, flush_packets=1)
+        .global_args("-loglevel", "error")
+        .compile()
+    )
+    process = await asyncio.create_subprocess_exec(
+        *arguments,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    if process.stdin is None or process.stdout is None or process.stderr is None:
+        msg = "ffmpeg was started without pipes."
+        raise RuntimeError(msg)
+
+    feeder = asyncio.ensure_future(_feed(process.stdin, chunks))
+    errors = asyncio.ensure_future(process.stderr.read())
+    try:
+        while output := await process.stdout.read(_STREAM_READ_SIZE):
+            yield output
+        await process.wait()
+        if feeder.done():
+            # Raises errors of the input, such as a disconnected client.
+            await feeder
+    finally:
+        feeder.cancel()
+        if process.returncode is None:
+            with contextlib.suppress(ProcessLookupError):
+                process.kill()
+            await process.wait()
+
+    if process.returncode != 0:
+        logger.error("ffmpeg failed to decode audio: %s", (await errors).decode())
+        raise fastapi.HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The audio stream could not be decoded.",
+        )
+
+
+@functools.cache
+def ffmpeg_arguments(profile: config.AudioProfiles) -> tuple[str, ...]:
+    """Returns the ffmpeg command that converts piped audio with a profile.
+
+    The speech profiles downmix to mono, resample to 16 kHz and encode at a
+    speech bitrate. The trimmed profile also removes leading and trailing
+    silence, by removing leading silence from the audio and from its reverse,
+    and pads the result to a minimal length so silent audio remains valid.
+
+    Args:
+        profile: The preprocessing applied to the audio.
+
+    Returns:
+        The ffmpeg command.
+    """
+    return _build_arguments(profile, "pipe:")
+
+
+def _build_arguments(profile: config.AudioProfiles, source: str) -> tuple[str, ...]:
+    """Returns the ffmpeg command that converts audio with a profile.
+
+    Args:
+        profile: The preprocessing applied to the audio.
+        source: The input of ffmpeg, a path or "pipe:" for stdin.
+
+    Returns:
+        The ffmpeg command.
+    """
+    stream = ffmpeg.input(source)
+    if profile == config.AudioProfiles.SPEECH_TRIMMED:
+        for _ in range(2):
+            stream = stream.filter(
+                "silenceremove",
+                start_periods=1,
+                start_threshold=_SILENCE_THRESHOLD,
+                start_silence=_SILENCE_KEPT,
+            ).filter("areverse")
+        stream = stream.filter("apad", whole_dur=_SILENCE_KEPT)
+
+    options = {} if profile == config.AudioProfiles.DEFAULT else _SPEECH_OUTPUT_OPTIONS
+    return tuple(
+        stream.output("pipe:", format=TARGET_FORMAT, **options)
+        .global_args("-loglevel", "error")
+        .compile(),
+    )
+
+
+async def _feed(stdin: asyncio.StreamWriter, chunks: abc.AsyncIterable[bytes]) -> None:
+    """Writes the input to ffmpeg and closes its stdin once all is written.
+
+    Args:
+        stdin: The stdin of ffmpeg.
+        chunks: The chunks of the input.
+    """
+    try:
+        async for chunk in chunks:
+            stdin.write(chunk)
+            await stdin.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        logger.debug("ffmpeg stopped reading its input.")
+    finally:
+        stdin.close()
+
+
+def _check_conversion(process: asyncio.subprocess.Process, errors: bytes) -> None:
+    """Checks that ffmpeg converted the audio.
+
+    Args:
+        process: The finished ffmpeg process.
+        errors: The stderr of ffmpeg.
+
+    Raises:
+        fastapi.HTTPException: 400 If ffmpeg exited with an error.
+    """
+    if process.returncode != 0:
+        logger.error("ffmpeg failed to convert audio: %s", errors.decode().strip())
+        raise fastapi.HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The audio file could not be converted.",
+        )
@@ -1,52 +1,476 @@
 """Controller for the listening router."""
 import asyncio
+import datetime
 import logging
-from typing import NamedTuple
+from typing import Any
 
 import fastapi
-from fastapi import status
+import pydantic
+import sqlalchemy
+from fastapi import concurrency, status
 from sqlalchemy import orm
+from sqlalchemy.dialects import postgresql, sqlite
 
-from linguaweb_api.core import config, dictionary, models
-from linguaweb_api.microservices import openai, openai_constants, s3
+from linguaweb_api.core import (
+    cache,
+    catalog,
+    config,
+    dictionary,
+    generation_cache,
+    models,
+    singleflight,
+)
+from linguaweb_api.microservices import (
+    openai,
+    openai_constants,
+    s3,
+    sql,
+    transcoder,
+)
+from linguaweb_api.routers.admin import schemas
 
 settings = config.get_settings()
 LOGGER_NAME = settings.LOGGER_NAME
 OPENAI_VOICE = settings.OPENAI_VOICE
+OPENAI_TEXT_TASK_MODE = settings.OPENAI_TEXT_TASK_MODE
+OPENAI_GPT_MODEL = settings.OPENAI_GPT_MODEL
+INGESTION_CONCURRENCY = settings.INGESTION_CONCURRENCY
+INGESTION_BATCH_SIZE = settings.INGESTION_BATCH_SIZE
 logger = logging.getLogger(LOGGER_NAME)
 
+_add_word_flights: singleflight.SingleFlight[schemas.Word] = singleflight.SingleFlight()
 
-async def add_word(word: str, session: orm.Session, s3_client: s3.S3) -> models.Word:
+
+async def add_word(word: str, s3_client: s3.S3) -> schemas.Word:
     """Adds a word to the database.
 
+    Concurrent calls for the same normalized word share a single generation,
+    and all receive the added word.
+
     Args:
         word: The word to add.
-        session: The database session.
         s3_client: The S3 client to use.
 
     Returns:
-        The word model.
+        The added word.
+
+    Raises:
+        fastapi.HTTPException: 409 If the word already exists.
+    """
+    word = normalize_word(word)
+    if word in _add_word_flights:
+        logger.debug("Joining in-flight generation of word.")
+    return await _add_word_flights.do(word, lambda: _add_word(word, s3_client))
+
+
+def normalize_word(word: str) -> str:
+    """Returns the form in which a word is stored.
+
+    Args:
+        word: The word as provided by the user.
+
+    Returns:
+        The word without surrounding whitespace, in lowercase.
+    """
+    return word.strip().lower()
+
+
+async def _add_word(word: str, s3_client: s3.S3) -> schemas.Word:
+    """Generates and inserts a word unless it already exists.
+
+    Uses its own short sessions, as the operation may outlive the request that
+    started it, and no connection is held while the word is generated.
+
+    Args:
+        word: The normalized word to add.
+        s3_client: The S3 client to use.
+
+    Returns:
+        The added word.
+
+    Raises:
+        fastapi.HTTPException: 409 If the word already exists.
     """
     logger.debug("Adding word.")
-    word_model = session.query(models.Word).filter_by(word=word).first()
-    if word_model:
+    with sql.get_database().session_factory() as session:
+        missing = await concurrency.run_in_threadpool(
+            find_missing_words,
+            [word],
+            session,
+        )
+    if not missing:
         raise fastapi.HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Word already exists in database.",
         )
 
     logger.debug("Word does not exist in database.")
-    text_tasks_promise = _get_text_tasks(word)
-    listening_bytes_promise = _get_listening_task(word)
-    s3_key = f"{word}_{OPENAI_VOICE.value}.mp3"
+    new_word = await generate_word(word, s3_client)
+    with sql.get_database().session_factory() as session:
+        inserted = await concurrency.run_in_threadpool(
+            insert_word_if_absent,
+            new_word,
+            session,
+        )
+        if inserted is None:
+            await concurrency.run_in_threadpool(
+                _delete_unused_audio,
+                new_word.s3_key,
+                s3_client,
+                session,
+            )
+            raise fastapi.HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Word already exists in database.",
+            )
+        logger.debug("Added word.")
+        return inserted
+
+
+def _delete_unused_audio(s3_key: str, s3_client: s3.S3, session: orm.Session) -> None:
+    """Deletes uploaded audio unless a stored word refers to it.
+
+    Args:
+        s3_key: The S3 key of the audio.
+        s3_client: The S3 client to use.
+        session: The database session.
+    """
+    in_use = session.scalars(
+        sqlalchemy.select(models.Word.id).where(models.Word.s3_key == s3_key),
+    ).first()
+    if in_use is not None:
+        return
+    logger.debug("Deleting unused audio: %s", s3_key)
+    s3_client.delete(s3_key)
+    cache.get_audio_cache().invalidate(s3_key)
+
+
+def insert_word_if_absent(
+    new_word: models.Word,
+    session: orm.Session,
+) -> schemas.Word | None:
+    """Inserts a word unless it conflicts with an existing word.
+
+    The conflict check and the insert are a single INSERT ... ON CONFLICT DO
+    NOTHING statement, so concurrent inserts of the same word cannot fail on
+    the unique constraints.
+
+    Args:
+        new_word: The word model to insert, not added to a session.
+        session: The database session.
+
+    Returns:
+        The inserted word, or None if it already existed.
+    """
+    values = _word_fields(new_word)
+    statement: sqlalchemy.Insert
+    if session.get_bind().dialect.name == "postgresql":
+        statement = postgresql.insert(models.Word).values(**values)
+        statement = statement.on_conflict_do_nothing()
+    else:
+        statement = sqlite.insert(models.Word).values(**values)
+        statement = statement.on_conflict_do_nothing()
+    inserted = session.scalars(statement.returning(models.Word)).first()
+    session.commit()
+    if inserted is None:
+        return None
+    catalog.get_word_catalog().upsert(inserted)
+    return schemas.Word.model_validate(inserted)
+
+
+async def add_preset_words(
+    session: orm.Session,
+    s3_client: s3.S3,
+) -> schemas.IngestionReport:
+    """Adds the preset words that are missing from the database.
+
+    Words are generated with at most INGESTION_CONCURRENCY words in flight and
+    inserted in batches of INGESTION_BATCH_SIZE as they complete. A word that
+    fails is reported rather than aborting the other words.
+
+    Args:
+        session: The database session.
+        s3_client: The S3 client to use.
+
+    Returns:
+        The added words and the words that failed.
+
+    Raises:
+        fastapi.HTTPException: 409 If all preset words already exist.
+    """
+    logger.debug("Adding preset words.")
+    preset_words = list(
+        dict.fromkeys(normalize_word(word) for word in dictionary.read_words()),
+    )
+    missing_words = find_missing_words(preset_words, session)
+    if not missing_words:
+        raise fastapi.HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="All preset words already exist in database.",
+        )
+
+    logger.debug("Generating %d missing preset words.", len(missing_words))
+    semaphore = asyncio.Semaphore(INGESTION_CONCURRENCY)
+    tasks = [
+        asyncio.create_task(_generate_word_bounded(word, s3_client, semaphore))
+        for word in missing_words
+    ]
+    added: list[schemas.Word] = []
+    failed: list[schemas.FailedWord] = []
+    batch: list[models.Word] = []
+    try:
+        for task in asyncio.as_completed(tasks):
+            result = await task
+            if isinstance(result, schemas.FailedWord):
+                failed.append(result)
+                continue
+            batch.append(result)
+            if len(batch) >= INGESTION_BATCH_SIZE:
+                await _insert_batch_into(batch, session, added, failed)
+                batch = []
+        if batch:
+            await _insert_batch_into(batch, session, added, failed)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    order = {word: index for index, word in enumerate(preset_words)}
+    added.sort(key=lambda word: order[word.word])
+    failed.sort(key=lambda word: order[word.word])
+    logger.debug("Added %d preset words, %d failed.", len(added), len(failed))
+    return schemas.IngestionReport(added=added, failed=failed)
+
+
+def create_job(words: list[str] | None, session: orm.Session) -> schemas.Job:
+    """Stores a job that adds the missing words in the background.
+
+    Args:
+        words: The words to add, defaults to the preset words.
+        session: The database session.
+
+    Returns:
+        The job.
+
+    Raises:
+        fastapi.HTTPException: 409 If all words already exist.
+    """
+    logger.debug("Creating ingestion job.")
+    requested_words = list(
+        dict.fromkeys(
+            normalize_word(word) for word in words or dictionary.read_words()
+        ),
+    )
+    missing_words = find_missing_words(requested_words, session)
+    if not missing_words:
+        raise fastapi.HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="All words already exist in database.",
+        )
+
+    job = models.IngestionJob(
+        status=models.JobStatus.PENDING,
+        words=[
+            models.IngestionJobWord(
+                word=word,
+                status=models.JobWordStatus.PENDING,
+                attempts=0,
+            )
+            for word in missing_words
+        ],
+    )
+    session.add(job)
+    session.commit()
+    logger.debug("Created ingestion job %d.", job.id)
+    return schemas.Job(id=job.id, status=job.status, total=len(missing_words))
+
+
+def get_job_progress(job_id: int, session: orm.Session) -> schemas.JobProgress:
+    """Returns the progress of an ingestion job.
+
+    Args:
+        job_id: The id of the job.
+        session: The database session.
+
+    Returns:
+        The progress of the job, including every word.
+
+    Raises:
+        fastapi.HTTPException: 404 If the job does not exist.
+    """
+    job = session.get(models.IngestionJob, job_id)
+    if job is None:
+        raise fastapi.HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found.",
+        )
+
+    counts = {word_status: 0 for word_status in models.JobWordStatus}
+    for job_word in job.words:
+        counts[job_word.status] += 1
+    finished = sum(
+        counts[word_status]
+        for word_status in (
+            models.JobWordStatus.ADDED,
+            models.JobWordStatus.SKIPPED,
+            models.JobWordStatus.FAILED,
+        )
+    )
+    unfinished = (
+        counts[models.JobWordStatus.PENDING] + counts[models.JobWordStatus.RUNNING]
+    )
+
+    words_per_minute = None
+    estimated_seconds_remaining = None
+    if job.time_started is not None:
+        end = _as_utc(job.time_finished) if job.time_finished else _utc_now()
+        elapsed = (end - _as_utc(job.time_started)).total_seconds()
+        if elapsed > 0 and finished:
+            words_per_minute = finished / elapsed * 60
+            estimated_seconds_remaining = unfinished / words_per_minute * 60
 
+    return schemas.JobProgress(
+        id=job.id,
+        status=job.status,
+        time_created=job.time_created,
+        time_started=job.time_started,
+        time_finished=job.time_finished,
+        total=len(job.words),
+        pending=counts[models.JobWordStatus.PENDING],
+        running=counts[models.JobWordStatus.RUNNING],
+        added=counts[models.JobWordStatus.ADDED],
+        skipped=counts[models.JobWordStatus.SKIPPED],
+        failed=counts[models.JobWordStatus.FAILED],
+        words_per_minute=words_per_minute,
+        estimated_seconds_remaining=estimated_seconds_remaining,
+        words=[schemas.JobWord.model_validate(job_word) for job_word in job.words],
+    )
+
+
+async def get_generation_cache_stats() -> schemas.GenerationCacheStats:
+    """Returns the usage of the generation cache by this process.
+
+    Returns:
+        The size and hit counters of the cache.
+    """
+    cache_instance = generation_cache.get_generation_cache()
+    if cache_instance is None:
+        return schemas.GenerationCacheStats(enabled=False)
+    store = cache_instance.store
+    entries, size = await concurrency.run_in_threadpool(
+        lambda: (len(store), store.size),
+    )
+    return schemas.GenerationCacheStats(
+        enabled=True,
+        entries=entries,
+        size=size,
+        max_size=store.max_size,
+        hits=cache_instance.hits,
+        shared_hits=cache_instance.shared_hits,
+        misses=cache_instance.misses,
+    )
+
+
+def get_hedging_stats() -> list[schemas.HedgingStats]:
+    """Returns the hedging of requests to OpenAI by this process.
+
+    Returns:
+        The hedging counters of each model that opted in to hedging.
+    """
+    stats = []
+    for model_class in openai.OpenAIBaseClass.__subclasses__():
+        if not model_class.hedged:
+            continue
+        policy = openai.get_hedging_policy(model_class.model)
+        if policy is None:
+            stats.append(
+                schemas.HedgingStats(model=model_class.model, enabled=False),
+            )
+            continue
+        stats.append(
+            schemas.HedgingStats(
+                model=model_class.model,
+                enabled=True,
+                requests=policy.requests,
+                hedges=policy.hedges,
+                hedge_wins=policy.hedge_wins,
+                delay=policy.delay(),
+            ),
+        )
+    return stats
+
+
+def get_transcoder_stats() -> schemas.TranscoderStats:
+    """Returns the usage of the audio transcoder by this process.
+
+    Returns:
+        The queue, counters and mean timings of the transcoder.
+    """
+    instance = transcoder.get_transcoder()
+    started = instance.completed + instance.failed + instance.running
+    finished = instance.completed + instance.failed
+    return schemas.TranscoderStats(
+        workers=instance.workers,
+        queue_size=instance.queue_size,
+        running=instance.running,
+        waiting=instance.waiting,
+        completed=instance.completed,
+        failed=instance.failed,
+        rejected=instance.rejected,
+        mean_queue_seconds=instance.queue_seconds / started if started else None,
+        mean_conversion_seconds=(
+            instance.conversion_seconds / finished if finished else None
+        ),
+    )
+
+
+def find_missing_words(words: list[str], session: orm.Session) -> list[str]:
+    """Returns the words that are not in the database, with a single query.
+
+    Words are compared case-insensitively, as words stored before they were
+    normalized on insert may contain uppercase letters.
+
+    Args:
+        words: The words to look up.
+        session: The database session.
+
+    Returns:
+        The missing words, in their original order.
+    """
+    stored_word = sqlalchemy.func.lower(models.Word.word)
+    existing = set(
+        session.scalars(
+            sqlalchemy.select(stored_word).where(
+                stored_word.in_({word.lower() for word in words}),
+            ),
+        ),
+    )
+    return [word for word in words if word.lower() not in existing]
+
+
+async def generate_word(word: str, s3_client: s3.S3) -> models.Word:
+    """Generates the tasks of a word and uploads its audio.
+
+    Args:
+        word: The word to generate.
+        s3_client: The S3 client to use.
+
+    Returns:
+        The word model, not yet added to a session.
+    """
     text_tasks, listening_bytes = await asyncio.gather(
-        text_tasks_promise,
-        listening_bytes_promise,
+        _get_text_tasks(word),
+        _get_listening_task(word),
+    )
+    s3_key = f"{word}_{OPENAI_VOICE.value}.mp3"
+    await concurrency.run_in_threadpool(
+        s3_client.create,
+        key=s3_key,
+        data=listening_bytes,
     )
+    cache.get_audio_cache().invalidate(s3_key)
 
     logger.debug("Creating new word.")
-    new_word = models.Word(
+    return models.Word(
         word=word,
         description=text_tasks.description,
         synonyms=text_tasks.synonyms,
@@ -54,63 +478,187 @@ async def add_word(word: str, session: orm.Session, s3_client: s3.S3) -> models.
         jeopardy=text_tasks.jeopardy,
         s3_key=s3_key,
     )
-    s3_client.create(key=s3_key, data=listening_bytes)
-    session.add(new_word)
-    session.commit()
-    logger.debug("Added word.")
-    return new_word
 
 
-async def add_preset_words(session: orm.Session, s3_client: s3.S3) -> list[models.Word]:
-    """Adds preset words to the database.
+async def _generate_word_bounded(
+    word: str,
+    s3_client: s3.S3,
+    semaphore: asyncio.Semaphore,
+) -> models.Word | schemas.FailedWord:
+    """Generates a word once the semaphore allows it, capturing failures.
 
     Args:
-        session: The database session.
+        word: The word to generate.
         s3_client: The S3 client to use.
+        semaphore: The semaphore bounding the concurrent generations.
 
     Returns:
-        The word models.
+        The word model, or the reason it could not be generated.
     """
-    logger.debug("Adding preset words.")
-    preset_words = dictionary.read_words()
-    preset_models = (
-        session.query(models.Word).filter(models.Word.word.in_(preset_words)).all()
-    )
-    if len(preset_models) == len(preset_words):
-        raise fastapi.HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="All preset words already exist in database.",
-        )
+    async with semaphore:
+        try:
+            return await generate_word(word, s3_client)
+        except Exception as exception_info:  # noqa: BLE001
+            logger.warning("Failed to generate word %s: %r", word, exception_info)
+            return schemas.FailedWord(
+                word=word,
+                detail=describe_exception(exception_info),
+            )
 
-    logger.debug("Added preset words.")
-    return await asyncio.gather(
-        *[
-            add_word(word, session, s3_client)
-            for word in preset_words
-            if not session.query(models.Word).filter_by(word=word).first()
-        ],
+
+async def _insert_batch_into(
+    batch: list[models.Word],
+    session: orm.Session,
+    added: list[schemas.Word],
+    failed: list[schemas.FailedWord],
+) -> None:
+    """Inserts a batch of words off the event loop and records the outcome.
+
+    Args:
+        batch: The word models to insert.
+        session: The database session.
+        added: The list to append the inserted words to.
+        failed: The list to append the words that could not be inserted to.
+    """
+    batch_added, batch_failed = await concurrency.run_in_threadpool(
+        _insert_batch,
+        batch,
+        session,
     )
+    added.extend(batch_added)
+    failed.extend(batch_failed)
+
 
+def _insert_batch(
+    batch: list[models.Word],
+    session: orm.Session,
+) -> tuple[list[schemas.Word], list[schemas.FailedWord]]:
+    """Inserts a batch of words in a single transaction.
 
-class _TextTasks(NamedTuple):
-    """Named tuple for the text tasks."""
+    If the transaction fails, for example because another request added one of
+    the words in the meantime, the words are inserted one at a time such that
+    only the conflicting words fail.
 
-    description: str
-    synonyms: str
-    antonyms: str
-    jeopardy: str
+    Args:
+        batch: The word models to insert.
+        session: The database session.
 
+    Returns:
+        The inserted words and the words that could not be inserted.
+    """
+    fields = [_word_fields(word) for word in batch]
+    try:
+        session.add_all(batch)
+        session.flush()
+        ids = [word.id for word in batch]
+        session.commit()
+    except sqlalchemy.exc.SQLAlchemyError as exception_info:
+        session.rollback()
+        if len(batch) == 1:
+            logger.warning("Failed to insert word %s.", fields[0]["word"])
+            return [], [
+                schemas.FailedWord(
+                    word=fields[0]["word"],
+                    detail=describe_exception(exception_info),
+                ),
+            ]
+        added: list[schemas.Word] = []
+        failed: list[schemas.FailedWord] = []
+        for word_fields in fields:
+            word_added, word_failed = _insert_batch(
+                [models.Word(**word_fields)],
+                session,
+            )
+            added.extend(word_added)
+            failed.extend(word_failed)
+        return added, failed
 
-async def _get_text_tasks(word: str) -> _TextTasks:
+    word_catalog = catalog.get_word_catalog()
+    rows = session.query(models.Word).filter(models.Word.id.in_(ids)).all()
+    for row in rows:
+        word_catalog.upsert(row)
+    return [schemas.Word.model_validate(row) for row in rows], []
+
+
+def _word_fields(word: models.Word) -> dict[str, Any]:
+    """Returns the column values of a word model that is not yet inserted."""
+    return {
+        "word": word.word,
+        "description": word.description,
+        "synonyms": word.synonyms,
+        "antonyms": word.antonyms,
+        "jeopardy": word.jeopardy,
+        "s3_key": word.s3_key,
+    }
+
+
+def describe_exception(exception: Exception) -> str:
+    """Returns a short, client-facing description of an exception."""
+    if isinstance(exception, fastapi.HTTPException):
+        return str(exception.detail)
+    if isinstance(exception, sqlalchemy.exc.IntegrityError):
+        return "Word already exists in database."
+    return type(exception).__name__
+
+
+async def _get_text_tasks(word: str) -> schemas.TextTasks:
     """Runs GPT to get text tasks.
 
+    In structured mode, all tasks are requested in a single JSON call if the
+    GPT model supports JSON mode. If that response does not match the schema,
+    or the model does not support JSON mode, the tasks are requested per field.
+
+    Args:
+        word: The word to get text tasks for.
+
+    Returns:
+        The text tasks.
+    """
+    if (
+        OPENAI_TEXT_TASK_MODE == config.TextTaskModes.STRUCTURED
+        and OPENAI_GPT_MODEL in openai_constants.JSON_MODE_MODELS
+    ):
+        try:
+            return await _get_structured_text_tasks(word)
+        except pydantic.ValidationError:
+            logger.warning("Invalid structured text tasks, falling back to per field.")
+    return await _get_per_field_text_tasks(word)
+
+
+async def _get_structured_text_tasks(word: str) -> schemas.TextTasks:
+    """Runs GPT once to get all text tasks as a JSON object.
+
     Args:
         word: The word to get text tasks for.
 
     Returns:
         The text tasks.
+
+    Raises:
+        pydantic.ValidationError: If the response does not match the schema.
     """
-    logger.debug("Running GPT.")
+    logger.debug("Running GPT in JSON mode.")
+    response = await openai.GPT().run(
+        prompt=word,
+        system_prompt=openai_constants.Prompts.WORD_TEXT_TASKS,
+        json_mode=True,
+    )
+    return schemas.TextTasks.model_validate_json(response)
+
+
+async def _get_per_field_text_tasks(word: str) -> schemas.TextTasks:
+    """Runs GPT once per text task.
+
+    Args:
+        word: The word to get text tasks for.
+
+    Returns:
+        The text tasks.
+
+    Raises:
+        fastapi.HTTPException: 500 If the responses are empty.
+    """
+    logger.debug("Running GPT per field.")
     gpt = openai.GPT()
     gpt_calls = [
         gpt.run(prompt=word, system_prompt=openai_constants.Prompts.WORD_DESCRIPTION),
@@ -119,8 +667,19 @@ async def _get_text_tasks(word: str) -> _TextTasks:
         gpt.run(prompt=word, system_prompt=openai_constants.Prompts.WORD_JEOPARDY),
     ]
 
-    results = await asyncio.gather(*gpt_calls)
-    return _TextTasks(*results)
+    description, synonyms, antonyms, jeopardy = await asyncio.gather(*gpt_calls)
+    try:
+        return schemas.TextTasks(
+            description=description,
+            synonyms=synonyms,  # type: ignore[arg-type] # Split by the validator.
+            antonyms=antonyms,  # type: ignore[arg-type]
+            jeopardy=jeopardy,
+        )
+    except pydantic.ValidationError as exception_info:
+        raise fastapi.HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Faulty response from OpenAI.",
+        ) from exception_info
 
 
 async def _get_listening_task(word: str) -> bytes:
@@ -134,3 +693,15 @@ async def _get_listening_task(word: str) -> bytes:
     """
     tts = openai.TextToSpeech()
     return await tts.run(word)
+
+
+def _as_utc(timestamp: datetime.datetime) -> datetime.datetime:
+    """Returns a timestamp as UTC, assuming UTC if it has no timezone."""
+    if timestamp.tzinfo is None:
+        return timestamp.replace(tzinfo=datetime.UTC)
+    return timestamp.astimezone(datetime.UTC)
+
+
+def _utc_now() -> datetime.datetime:
+    """Returns the current time in UTC."""
+    return datetime.datetime.now(datetime.UTC)
@@ -0,0 +1,395 @@
+"""Background worker for ingestion jobs.
+
+Jobs and the progress of each of their words are stored in the database, so
+jobs survive restarts and can be processed by the API processes, by separate
+worker processes (see `linguaweb_api.worker`), or both.
+"""
+import asyncio
+import contextlib
+import datetime
+import functools
+import logging
+from collections import abc
+
+import sqlalchemy
+from fastapi import concurrency
+from sqlalchemy import orm
+
+from linguaweb_api.core import catalog, config, models
+from linguaweb_api.microservices import s3, sql
+from linguaweb_api.routers.admin import controller
+
+settings = config.get_settings()
+LOGGER_NAME = settings.LOGGER_NAME
+JOB_WORKERS = settings.JOB_WORKERS
+JOB_POLL_INTERVAL = settings.JOB_POLL_INTERVAL
+JOB_MAX_ATTEMPTS = settings.JOB_MAX_ATTEMPTS
+JOB_RETRY_BACKOFF = settings.JOB_RETRY_BACKOFF
+JOB_LEASE_TIMEOUT = settings.JOB_LEASE_TIMEOUT
+
+logger = logging.getLogger(LOGGER_NAME)
+
+_CLAIM_CANDIDATES = 10
+_UNFINISHED_STATUSES = (models.JobWordStatus.PENDING, models.JobWordStatus.RUNNING)
+
+
+class JobWorker:
+    """Processes the words of ingestion jobs stored in the database.
+
+    Words are claimed with a conditional update, so any number of workers can
+    share the queue. The claim is renewed while the word is processed; a word
+    whose claim is not renewed within the lease timeout, for example because
+    its worker crashed, is claimed again and keeps its count of attempts.
+
+    Attributes:
+        concurrency: The number of words processed concurrently.
+        poll_interval: Seconds between polls for new words when idle.
+        max_attempts: The number of times a word is attempted before it fails.
+        retry_backoff: Seconds before the first retry, doubled on each retry.
+        lease_timeout: Seconds after which a claimed word is claimed again.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        concurrency: int = JOB_WORKERS,
+        poll_interval: float = JOB_POLL_INTERVAL,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        retry_backoff: float = JOB_RETRY_BACKOFF,
+        lease_timeout: float = JOB_LEASE_TIMEOUT,
+    ) -> None:
+        """Initializes a new instance of the JobWorker class.
+
+        Args:
+            concurrency: The number of words processed concurrently.
+            poll_interval: Seconds between polls for new words when idle.
+            max_attempts: The number of times a word is attempted before it
+                fails.
+            retry_backoff: Seconds before the first retry, doubled on each
+                retry.
+            lease_timeout: Seconds after which a claimed word is claimed again.
+        """
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.lease_timeout = lease_timeout
+        self._wake = asyncio.Event()
+        self._tasks: list[asyncio.Task[None]] = []
+
+    def start(self) -> None:
+        """Starts processing words in the background."""
+        logger.debug("Starting %d job worker tasks.", self.concurrency)
+        self._tasks = [
+            asyncio.create_task(self._run()) for _ in range(self.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        """Stops processing words.
+
+        Words that are being processed are abandoned and claimed again once
+        their lease expires.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wakes idle workers, for example after a job was created."""
+        self._wake.set()
+
+    async def run_once(self) -> bool:
+        """Claims and processes a single word.
+
+        Returns:
+            Whether a word was processed.
+        """
+        claimed = await concurrency.run_in_threadpool(self._claim)
+        if claimed is None:
+            return False
+        job_word_id, word, attempts = claimed
+        async with self._lease(job_word_id):
+            await self._process(job_word_id, word, attempts)
+        return True
+
+    async def _run(self) -> None:
+        """Processes words until cancelled."""
+        while True:
+            self._wake.clear()
+            try:
+                if await self.run_once():
+                    continue
+            except Exception:
+                logger.exception("Failed to process ingestion jobs.")
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+
+    @contextlib.asynccontextmanager
+    async def _lease(self, job_word_id: int) -> abc.AsyncGenerator[None, None]:
+        """Renews the claim of a job word until the context exits.
+
+        Args:
+            job_word_id: The id of the claimed job word.
+        """
+
+        async def renew() -> None:
+            while True:
+                await asyncio.sleep(self.lease_timeout / 3)
+                try:
+                    await concurrency.run_in_threadpool(
+                        self._update,
+                        job_word_id,
+                        time_claimed=_utc_now(),
+                    )
+                except Exception:
+                    logger.exception("Failed to renew the claim of a job word.")
+
+        task = asyncio.create_task(renew())
+        try:
+            yield
+        finally:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    async def _process(self, job_word_id: int, word: str, attempts: int = 0) -> None:
+        """Generates and inserts a word, retrying with exponential backoff.
+
+        Args:
+            job_word_id: The id of the claimed job word.
+            word: The word to add.
+            attempts: The number of attempts made by earlier claims of the word.
+        """
+        if attempts >= self.max_attempts:
+            await concurrency.run_in_threadpool(
+                self._finish,
+                job_word_id,
+                models.JobWordStatus.FAILED,
+                "Word was abandoned after its last attempt.",
+            )
+            return
+        for attempt in range(attempts + 1, self.max_attempts + 1):
+            await concurrency.run_in_threadpool(
+                self._update,
+                job_word_id,
+                attempts=attempt,
+            )
+            try:
+                await self._add(job_word_id, word)
+            except Exception as exception_info:  # noqa: BLE001
+                logger.warning(
+                    "Attempt %d to add word %s failed: %r",
+                    attempt,
+                    word,
+                    exception_info,
+                )
+                detail = controller.describe_exception(exception_info)
+                if attempt == self.max_attempts:
+                    await concurrency.run_in_threadpool(
+                        self._finish,
+                        job_word_id,
+                        models.JobWordStatus.FAILED,
+                        detail,
+                    )
+                    return
+                await concurrency.run_in_threadpool(
+                    self._update,
+                    job_word_id,
+                    detail=detail,
+                )
+                await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
+            else:
+                return
+
+    async def _add(self, job_word_id: int, word: str) -> None:
+        """Generates a word and inserts it, unless it already exists.
+
+        Args:
+            job_word_id: The id of the claimed job word.
+            word: The word to add.
+        """
+        with sql.get_database().session_factory() as session:
+            missing = await concurrency.run_in_threadpool(
+                controller.find_missing_words,
+                [word],
+                session,
+            )
+        if not missing:
+            await concurrency.run_in_threadpool(
+                self._finish,
+                job_word_id,
+                models.JobWordStatus.SKIPPED,
+                "Word already exists in database.",
+            )
+            return
+
+        new_word = await controller.generate_word(word, s3.get_s3_client())
+        await concurrency.run_in_threadpool(self._insert, job_word_id, new_word)
+
+    def _claim(self) -> tuple[int, str, int] | None:
+        """Claims the oldest unclaimed or abandoned word.
+
+        Returns:
+            The id of the job word, the word and the number of attempts made so
+            far, or None if there is no work.
+        """
+        now = _utc_now()
+        claimable = sqlalchemy.or_(
+            models.IngestionJobWord.status == models.JobWordStatus.PENDING,
+            sqlalchemy.and_(
+                models.IngestionJobWord.status == models.JobWordStatus.RUNNING,
+                models.IngestionJobWord.time_claimed
+                < now - datetime.timedelta(seconds=self.lease_timeout),
+            ),
+        )
+        with sql.get_database().session_factory() as session:
+            candidates = session.execute(
+                sqlalchemy.select(
+                    models.IngestionJobWord.id,
+                    models.IngestionJobWord.job_id,
+                    models.IngestionJobWord.word,
+                    models.IngestionJobWord.attempts,
+                )
+                .where(claimable)
+                .order_by(models.IngestionJobWord.id)
+                .limit(_CLAIM_CANDIDATES),
+            ).all()
+            for job_word_id, job_id, word, attempts in candidates:
+                result = session.execute(
+                    sqlalchemy.update(models.IngestionJobWord)
+                    .where(models.IngestionJobWord.id == job_word_id, claimable)
+                    .values(status=models.JobWordStatus.RUNNING, time_claimed=now),
+                )
+                if result.rowcount != 1:  # type: ignore[attr-defined]
+                    continue
+                session.execute(
+                    sqlalchemy.update(models.IngestionJob)
+                    .where(
+                        models.IngestionJob.id == job_id,
+                        models.IngestionJob.time_started.is_(None),
+                    )
+                    .values(status=models.JobStatus.RUNNING, time_started=now),
+                )
+                session.commit()
+                return job_word_id, word, attempts
+        return None
+
+    @staticmethod
+    def _update(job_word_id: int, **values: object) -> None:
+        """Updates the columns of a job word.
+
+        Args:
+            job_word_id: The id of the job word.
+            **values: The new column values.
+        """
+        with sql.get_database().session_factory() as session:
+            session.execute(
+                sqlalchemy.update(models.IngestionJobWord)
+                .where(models.IngestionJobWord.id == job_word_id)
+                .values(**values),
+            )
+            session.commit()
+
+    @classmethod
+    def _insert(cls, job_word_id: int, new_word: models.Word) -> None:
+        """Inserts a generated word and marks its job word as added.
+
+        Args:
+            job_word_id: The id of the job word.
+            new_word: The generated word model.
+        """
+        with sql.get_database().session_factory() as session:
+            try:
+                session.add(new_word)
+                session.flush()
+                _finish_in(
+                    session,
+                    job_word_id,
+                    models.JobWordStatus.ADDED,
+                    word_id=new_word.id,
+                )
+                session.commit()
+            except sqlalchemy.exc.IntegrityError:
+                session.rollback()
+                cls._finish(
+                    job_word_id,
+                    models.JobWordStatus.SKIPPED,
+                    "Word already exists in database.",
+                )
+                return
+            catalog.get_word_catalog().upsert(new_word)
+
+    @staticmethod
+    def _finish(
+        job_word_id: int,
+        status: models.JobWordStatus,
+        detail: str | None = None,
+    ) -> None:
+        """Marks a job word as finished.
+
+        Args:
+            job_word_id: The id of the job word.
+            status: The final status of the job word.
+            detail: The reason for the status, if any.
+        """
+        with sql.get_database().session_factory() as session:
+            _finish_in(session, job_word_id, status, detail=detail)
+            session.commit()
+
+
+def _finish_in(
+    session: orm.Session,
+    job_word_id: int,
+    status: models.JobWordStatus,
+    *,
+    detail: str | None = None,
+    word_id: int | None = None,
+) -> None:
+    """Marks a job word as finished, and its job once all words are finished.
+
+    Args:
+        session: The database session, committed by the caller.
+        job_word_id: The id of the job word.
+        status: The final status of the job word.
+        detail: The reason for the status, if any.
+        word_id: The id of the added word, if any.
+    """
+    now = _utc_now()
+    job_word = session.get(models.IngestionJobWord, job_word_id)
+    if job_word is None:
+        return
+    job_word.status = status
+    job_word.detail = detail
+    job_word.word_id = word_id
+    job_word.time_finished = now
+    session.flush()
+
+    unfinished = session.scalar(
+        sqlalchemy.select(sqlalchemy.func.count())
+        .select_from(models.IngestionJobWord)
+        .where(
+            models.IngestionJobWord.job_id == job_word.job_id,
+            models.IngestionJobWord.status.in_(_UNFINISHED_STATUSES),
+        ),
+    )
+    if not unfinished:
+        session.execute(
+            sqlalchemy.update(models.IngestionJob)
+            .where(models.IngestionJob.id == job_word.job_id)
+            .values(status=models.JobStatus.COMPLETED, time_finished=now),
+        )
+
+
+def _utc_now() -> datetime.datetime:
+    """Returns the current time in UTC."""
+    return datetime.datetime.now(datetime.UTC)
+
+
+@functools.lru_cache
+def get_job_worker() -> JobWorker:
+    """Returns the process-wide job worker.
+
+    Returns:
+        The job worker.
+    """
+    return JobWorker()
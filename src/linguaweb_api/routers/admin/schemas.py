@@ -1,6 +1,10 @@
 """Schemas for the admin API."""
+import datetime
+
 import pydantic
 
+from linguaweb_api.core import models
+
 
 class Word(pydantic.BaseModel):
     """Word data, with the word itself."""
@@ -14,3 +18,137 @@ class Word(pydantic.BaseModel):
     antonyms: list[str]
     jeopardy: str
     s3_key: str
+
+
+class FailedWord(pydantic.BaseModel):
+    """A word that could not be added."""
+
+    word: str
+    detail: str
+
+
+class IngestionReport(pydantic.BaseModel):
+    """The outcome of adding words in bulk."""
+
+    added: list[Word]
+    failed: list[FailedWord]
+
+
+class JobRequest(pydantic.BaseModel):
+    """A request to add words in the background."""
+
+    words: list[str] | None = pydantic.Field(
+        None,
+        description="The words to add, defaults to the preset words.",
+    )
+
+
+class Job(pydantic.BaseModel):
+    """An accepted ingestion job."""
+
+    id: int
+    status: models.JobStatus
+    total: int
+
+
+class JobWord(pydantic.BaseModel):
+    """The progress of a word within an ingestion job."""
+
+    model_config = pydantic.ConfigDict(from_attributes=True)
+
+    word: str
+    status: models.JobWordStatus
+    attempts: int
+    detail: str | None
+    word_id: int | None
+
+
+class JobProgress(pydantic.BaseModel):
+    """The progress and throughput of an ingestion job."""
+
+    id: int
+    status: models.JobStatus
+    time_created: datetime.datetime
+    time_started: datetime.datetime | None
+    time_finished: datetime.datetime | None
+    total: int
+    pending: int
+    running: int
+    added: int
+    skipped: int
+    failed: int
+    words_per_minute: float | None
+    estimated_seconds_remaining: float | None
+    words: list[JobWord]
+
+
+class GenerationCacheStats(pydantic.BaseModel):
+    """Usage of the generation cache by this process."""
+
+    enabled: bool
+    entries: int = 0
+    size: int = 0
+    max_size: int = 0
+    hits: int = 0
+    shared_hits: int = 0
+    misses: int = 0
+
+
+class HedgingStats(pydantic.BaseModel):
+    """Hedging of the requests to an OpenAI model by this process."""
+
+    model: str
+    enabled: bool
+    requests: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+    delay: float | None = None
+
+
+class TranscoderStats(pydantic.BaseModel):
+    """Usage of the audio transcoder by this process."""
+
+    workers: int
+    queue_size: int
+    running: int
+    waiting: int
+    completed: int
+    failed: int
+    rejected: int
+    mean_queue_seconds: float | None
+    mean_conversion_seconds: float | None
+
+
+class TextTasks(pydantic.BaseModel):
+    """The generated text tasks of a word."""
+
+    model_config = pydantic.ConfigDict(str_strip_whitespace=True)
+
+    description: str = pydantic.Field(..., min_length=1)
+    synonyms: list[str]
+    antonyms: list[str]
+    jeopardy: str = pydantic.Field(..., min_length=1)
+
+    @pydantic.field_validator("synonyms", "antonyms", mode="before")
+    @classmethod
+    def _split_list(cls, value: str | list[str] | None) -> list[str]:
+        """Normalizes comma separated text or lists into a list of items.
+
+        Items may not contain commas, as lists are stored comma separated.
+
+        Raises:
+            ValueError: If the value is neither text, a list nor None.
+        """
+        if value is None:
+            return []
+        if isinstance(value, str):
+            value = [value]
+        if not isinstance(value, list):
+            msg = "Expected comma separated text or a list."
+            raise ValueError(msg)  # noqa: TRY004
+        return [
+            item.strip()
+            for text in value
+            for item in str(text).split(",")
+            if item.strip()
+        ]
@@ -7,7 +7,7 @@ from sqlalchemy import orm
 
 from linguaweb_api.core import config
 from linguaweb_api.microservices import s3, sql
-from linguaweb_api.routers.admin import controller, schemas
+from linguaweb_api.routers.admin import controller, jobs, schemas
 
 settings = config.get_settings()
 LOGGER_NAME = settings.LOGGER_NAME
@@ -23,7 +23,8 @@ router = fastapi.APIRouter(prefix="/admin", tags=["admin"])
     status_code=status.HTTP_201_CREATED,
     summary="Adds a word to the database.",
     description="""Adds a word to the database. This will also perform all the OpenAI
-    calls to create the word's tasks.""",
+    calls to create the word's tasks. Concurrent requests for the same word share
+    these calls.""",
     responses={
         status.HTTP_409_CONFLICT: {
             "description": "Word already exists in database.",
@@ -32,28 +33,28 @@ router = fastapi.APIRouter(prefix="/admin", tags=["admin"])
 )
 async def add_word(
     word: str = fastapi.Form(..., title="The word to add."),
-    session: orm.Session = fastapi.Depends(sql.get_session),
-    s3_client: s3.S3 = fastapi.Depends(s3.S3),
+    s3_client: s3.S3 = fastapi.Depends(s3.get_s3_client),
 ) -> schemas.Word:
     """Adds a word to the database.
 
     Args:
         word: The word to add.
-        session: The database session.
         s3_client: The S3 client to use.
     """
     logger.debug("Adding word.")
-    word_model = await controller.add_word(word, session, s3_client)
+    added_word = await controller.add_word(word, s3_client)
     logger.debug("Added word.")
-    return word_model
+    return added_word
 
 
 @router.post(
     "/add_preset_words",
-    response_model=list[schemas.Word],
+    response_model=schemas.IngestionReport,
     status_code=status.HTTP_201_CREATED,
     summary="Adds preset words to the database.",
-    description="Wrapper around the add_words function that adds all preset words.",
+    description="""Adds all preset words that are not yet in the database. Words
+    are generated concurrently and inserted in batches. Words that fail are
+    listed in the response instead of failing the request.""",
     responses={
         status.HTTP_409_CONFLICT: {
             "description": "All preset words already exist in database.",
@@ -62,8 +63,8 @@ async def add_word(
 )
 async def add_preset_words(
     session: orm.Session = fastapi.Depends(sql.get_session),
-    s3_client: s3.S3 = fastapi.Depends(s3.S3),
-) -> list[schemas.Word]:
+    s3_client: s3.S3 = fastapi.Depends(s3.get_s3_client),
+) -> schemas.IngestionReport:
     """Adds preset words to the database.
 
     Args:
@@ -71,6 +72,111 @@ async def add_preset_words(
         s3_client: The S3 client to use.
     """
     logger.debug("Adding preset words.")
-    word_models = await controller.add_preset_words(session, s3_client)
+    report = await controller.add_preset_words(session, s3_client)
     logger.debug("Added preset words.")
-    return word_models  # type: ignore[return-value] # FastAPI magic casts to the type hint.
+    return report
+
+
+@router.post(
+    "/jobs",
+    response_model=schemas.Job,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Adds words to the database in the background.",
+    description="""Stores a job that adds the given words, or all preset words, that
+    are not yet in the database. The words are processed by the job workers, with
+    retries; use the returned id to follow the progress of the job.""",
+    responses={
+        status.HTTP_409_CONFLICT: {
+            "description": "All words already exist in database.",
+        },
+    },
+)
+async def create_job(
+    job_request: schemas.JobRequest | None = None,
+    session: orm.Session = fastapi.Depends(sql.get_session),
+) -> schemas.Job:
+    """Creates an ingestion job.
+
+    Args:
+        job_request: The words to add, defaults to the preset words.
+        session: The database session.
+    """
+    logger.debug("Creating ingestion job.")
+    words = job_request.words if job_request else None
+    job = controller.create_job(words, session)
+    jobs.get_job_worker().notify()
+    logger.debug("Created ingestion job.")
+    return job
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=schemas.JobProgress,
+    status_code=status.HTTP_200_OK,
+    summary="Returns the progress of an ingestion job.",
+    description="""Returns the status of every word of an ingestion job, together
+    with its throughput and estimated remaining time.""",
+    responses={
+        status.HTTP_404_NOT_FOUND: {
+            "description": "Job not found.",
+        },
+    },
+)
+async def get_job(
+    job_id: int = fastapi.Path(..., title="The id of the job."),
+    session: orm.Session = fastapi.Depends(sql.get_session),
+) -> schemas.JobProgress:
+    """Returns the progress of an ingestion job.
+
+    Args:
+        job_id: The id of the job.
+        session: The database session.
+    """
+    logger.debug("Fetching job progress.")
+    progress = controller.get_job_progress(job_id, session)
+    logger.debug("Fetched job progress.")
+    return progress
+
+
+@router.get(
+    "/generation_cache",
+    response_model=schemas.GenerationCacheStats,
+    status_code=status.HTTP_200_OK,
+    summary="Returns the usage of the generation cache.",
+    description="""Returns the size of the cache of OpenAI generations and the number
+    of cache hits and misses of this process since it started.""",
+)
+async def get_generation_cache_stats() -> schemas.GenerationCacheStats:
+    """Returns the usage of the generation cache."""
+    logger.debug("Fetching generation cache statistics.")
+    return await controller.get_generation_cache_stats()
+
+
+@router.get(
+    "/hedging",
+    response_model=list[schemas.HedgingStats],
+    status_code=status.HTTP_200_OK,
+    summary="Returns how often slow OpenAI requests were hedged.",
+    description="""Returns, per hedged OpenAI model, the number of requests, how many
+    of them were hedged with a duplicate request and how often the duplicate answered
+    first, since this process started.""",
+)
+async def get_hedging_stats() -> list[schemas.HedgingStats]:
+    """Returns the hedging of requests to OpenAI."""
+    logger.debug("Fetching hedging statistics.")
+    return controller.get_hedging_stats()
+
+
+@router.get(
+    "/transcoder",
+    response_model=schemas.TranscoderStats,
+    status_code=status.HTTP_200_OK,
+    summary="Returns the usage of the audio transcoder.",
+    description="""Returns the number of ffmpeg workers, the conversions running and
+    queued, the number of completed, failed and rejected conversions, and the mean time
+    conversions waited in the queue and ran, since this process started.""",
+)
+async def get_transcoder_stats() -> schemas.TranscoderStats:
+    """Returns the usage of the audio transcoder."""
+    logger.debug("Fetching transcoder statistics.")
+    return controller.get_transcoder_stats()
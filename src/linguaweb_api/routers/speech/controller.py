@@ -1,93 +1,517 @@
 """Speech router controller."""
+import asyncio
+import contextlib
+import hashlib
 import logging
 import pathlib
 import tempfile
+from collections import abc
 
 import fastapi
-import ffmpeg
-from fastapi import status
+from fastapi import concurrency, responses, status
+from sqlalchemy import orm
 
-from linguaweb_api.core import config
-from linguaweb_api.microservices import openai
+from linguaweb_api.core import cache, catalog, config, singleflight, vad
+from linguaweb_api.microservices import openai, transcoder
+from linguaweb_api.routers.speech import schemas
+from linguaweb_api.routers.words import controller as words_controller
 
 settings = config.get_settings()
 LOGGER_NAME = settings.LOGGER_NAME
+AUDIO_PREPROCESSING_PROFILE = settings.AUDIO_PREPROCESSING_PROFILE
+OPENAI_STT_MODEL = settings.OPENAI_STT_MODEL
+SPEECH_MAX_FILE_SIZE = settings.SPEECH_MAX_FILE_SIZE
+SPEECH_BATCH_MAX_FILES = settings.SPEECH_BATCH_MAX_FILES
+SPEECH_BATCH_CONCURRENCY = settings.SPEECH_BATCH_CONCURRENCY
+SPEECH_STREAM_VAD_THRESHOLD = settings.SPEECH_STREAM_VAD_THRESHOLD
+SPEECH_STREAM_SILENCE = settings.SPEECH_STREAM_SILENCE
+SPEECH_STREAM_MAX_SECONDS = settings.SPEECH_STREAM_MAX_SECONDS
+SPEECH_STREAM_IDLE_TIMEOUT = settings.SPEECH_STREAM_IDLE_TIMEOUT
 
 logger = logging.getLogger(LOGGER_NAME)
 
-TARGET_FILE_FORMAT = ".mp3"
+TARGET_FILE_FORMAT = f".{transcoder.TARGET_FORMAT}"
+CHUNK_SIZE = 64 * 1024
+# The type of the first box of MP4, M4A and MOV files, which ffmpeg can only
+# decode when it can seek to their index.
+ISO_MEDIA_FILE_TYPE = b"ftyp"
+# Allowance for the boundaries and part headers of a multipart upload.
+MULTIPART_OVERHEAD = 16 * 1024
+MAX_BODY_SIZE = SPEECH_MAX_FILE_SIZE + MULTIPART_OVERHEAD
+MAX_BATCH_BODY_SIZE = SPEECH_BATCH_MAX_FILES * MAX_BODY_SIZE
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+END_OF_STREAM = "end"
+MAX_STREAM_SAMPLES = round(SPEECH_STREAM_MAX_SECONDS * vad.SAMPLE_RATE)
+MAX_STREAM_PCM_SIZE = MAX_STREAM_SAMPLES * vad.SAMPLE_WIDTH
+# Close codes of streams that failed with an HTTP status code.
+STREAM_CLOSE_CODES = {
+    status.HTTP_408_REQUEST_TIMEOUT: status.WS_1008_POLICY_VIOLATION,
+    status.HTTP_413_REQUEST_ENTITY_TOO_LARGE: status.WS_1009_MESSAGE_TOO_BIG,
+    status.HTTP_503_SERVICE_UNAVAILABLE: status.WS_1013_TRY_AGAIN_LATER,
+}
+
+_transcription_flights: singleflight.SingleFlight[str] = singleflight.SingleFlight()
 
 
 async def transcribe(audio: fastapi.UploadFile) -> str:
     """Transcribes audio using OpenAI's Whisper.
 
+    The audio is read into memory, which also enforces the maximum file size.
+    Transcriptions are cached by a hash of the audio, which is checked before
+    the audio is converted. Concurrent requests with the same audio share a
+    single transcription of their bytes, so the shared transcription does not
+    depend on the upload of the request that started it.
+
     Args:
         audio: The audio file.
 
     Returns:
         str: The transcription of the audio as a string. The string is
             stripped of newlines and converted to lowercase.
+
+    Raises:
+        fastapi.HTTPException: 400 If the audio file does not have a filename.
     """
     logger.debug("Transcribing audio.")
-    await _check_file_size(audio, max_size=1024 * 1024)
+    if audio.filename is None:
+        raise fastapi.HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The audio file must have a filename.",
+        )
+
+    audio_bytes = b"".join(
+        [chunk async for chunk in _read_chunks(audio, max_size=SPEECH_MAX_FILE_SIZE)],
+    )
+    key = _transcription_key(audio_bytes)
+    transcription_cache = cache.get_transcription_cache()
+    if transcription_cache is not None:
+        cached = transcription_cache.get(key)
+        if cached is not None:
+            logger.debug("Using cached transcription.")
+            return cached
 
-    with tempfile.TemporaryDirectory() as temp_dir:
-        target_path = pathlib.Path(temp_dir) / f"audio{TARGET_FILE_FORMAT}"
-        _convert_audio(audio, temp_dir, target_path)
-        return await openai.SpeechToText().run(target_path)
+    transcription = await _transcription_flights.do(
+        key,
+        lambda: _transcribe(audio_bytes, audio.filename or ""),
+    )
+    if transcription_cache is not None:
+        transcription_cache.put(key, transcription)
+    return transcription
 
 
-async def _check_file_size(audio: fastapi.UploadFile, max_size: int) -> None:
-    """Check if the size of the audio file exceeds the maximum allowed size.
+async def transcribe_batch(
+    audios: list[fastapi.UploadFile],
+) -> responses.StreamingResponse:
+    """Transcribes many audio files, streaming each result as it finishes.
+
+    Files are transcribed concurrently, up to SPEECH_BATCH_CONCURRENCY at a
+    time, and each goes through the transcoder and the OpenAI rate limiter as
+    a single transcription would. Results are streamed as newline-delimited
+    JSON in the order in which they finish; a failed file is reported with its
+    status code and detail without failing the batch, unexpected errors with
+    status code 500.
 
     Args:
-        audio: The audio file to check.
-        max_size: The maximum allowed size in bytes.
+        audios: The audio files.
+
+    Returns:
+        The streaming response of BatchTranscription lines.
 
     Raises:
-        fastapi.HTTPException: 413 If the audio file size exceeds the maximum
-        allowed size or if the audio file is not seekable.
+        fastapi.HTTPException: 413 If there are more than SPEECH_BATCH_MAX_FILES
+            files.
     """
-    fs = await audio.read()
-    if len(fs) > max_size:
-        msg = f"Audio file size exceeds maximum allowed size of {max_size} bytes."
-        logger.error(msg)
+    logger.debug("Transcribing %d audio files.", len(audios))
+    if len(audios) > SPEECH_BATCH_MAX_FILES:
         raise fastapi.HTTPException(
             status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=msg,
+            detail=f"A batch may contain at most {SPEECH_BATCH_MAX_FILES} files.",
+        )
+    return responses.StreamingResponse(
+        _stream_batch(audios),
+        media_type=NDJSON_MEDIA_TYPE,
+    )
+
+
+async def _stream_batch(
+    audios: list[fastapi.UploadFile],
+) -> abc.AsyncGenerator[str, None]:
+    """Transcribes audio files concurrently and yields results as they finish.
+
+    Args:
+        audios: The audio files.
+
+    Yields:
+        A JSON line with the BatchTranscription of each file.
+    """
+    slots = asyncio.Semaphore(SPEECH_BATCH_CONCURRENCY)
+
+    async def transcribe_one(
+        index: int,
+        audio: fastapi.UploadFile,
+    ) -> schemas.BatchTranscription:
+        async with slots:
+            try:
+                transcription = await transcribe(audio)
+            except fastapi.HTTPException as exception_info:
+                return schemas.BatchTranscription(
+                    index=index,
+                    filename=audio.filename,
+                    status_code=exception_info.status_code,
+                    detail=exception_info.detail,
+                )
+            except Exception:
+                logger.exception("Failed to transcribe file %d of batch.", index)
+                return schemas.BatchTranscription(
+                    index=index,
+                    filename=audio.filename,
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="The audio file could not be transcribed.",
+                )
+        return schemas.BatchTranscription(
+            index=index,
+            filename=audio.filename,
+            status_code=status.HTTP_200_OK,
+            transcription=transcription,
+        )
+
+    tasks = [
+        asyncio.ensure_future(transcribe_one(index, audio))
+        for index, audio in enumerate(audios)
+    ]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            result = await next_result
+            yield result.model_dump_json() + "\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def stream_transcription(websocket: fastapi.WebSocket) -> None:
+    """Transcribes speech while it is being streamed over a WebSocket.
+
+    The client sends the audio as binary messages, in any format that ffmpeg
+    can decode from a stream, and ends the stream with the text message
+    END_OF_STREAM. The audio is decoded as it arrives and split into segments
+    at pauses in the speech. Each segment is transcribed as soon as it ends,
+    while the client is still speaking, and its transcription is sent as a
+    partial message. Once the stream ended and all segments are transcribed,
+    the joined transcription is sent as the final message and the connection
+    is closed.
+
+    The stream holds a worker of the transcoder while it lasts. A segment that
+    fails to transcribe is reported with an error message and left out of the
+    final transcription. If no worker is available, the audio cannot be
+    decoded, is longer than SPEECH_STREAM_MAX_SECONDS, or the client sends
+    nothing for SPEECH_STREAM_IDLE_TIMEOUT seconds, an error message is sent
+    and the connection is closed without a final message.
+
+    Args:
+        websocket: The WebSocket connection.
+    """
+    logger.debug("Streaming transcription.")
+    await websocket.accept()
+    send_lock = asyncio.Lock()
+    tasks: list[asyncio.Task[str | None]] = []
+
+    async def send(message: schemas.StreamTranscription) -> None:
+        async with send_lock:
+            await websocket.send_text(message.model_dump_json(exclude_none=True))
+
+    async def transcribe_segment(index: int, segment: bytes) -> str | None:
+        try:
+            transcription = await openai.SpeechToText().run(
+                vad.to_wav(segment),
+                filename="segment.wav",
+            )
+        except fastapi.HTTPException as exception_info:
+            logger.warning("Failed to transcribe segment %d.", index)
+            await send(
+                schemas.StreamTranscription(
+                    event="error",
+                    segment=index,
+                    detail=exception_info.detail,
+                ),
+            )
+            return None
+        await send(
+            schemas.StreamTranscription(
+                event="partial",
+                segment=index,
+                transcription=transcription,
+            ),
         )
-    await audio.seek(0)
+        return transcription
 
+    try:
+        async with contextlib.aclosing(_stream_segments(websocket)) as segments:
+            async for segment in segments:
+                logger.debug("Transcribing segment %d.", len(tasks))
+                tasks.append(
+                    asyncio.create_task(transcribe_segment(len(tasks), segment)),
+                )
+        transcriptions = await asyncio.gather(*tasks)
+    except fastapi.WebSocketDisconnect:
+        logger.debug("Client disconnected from streaming transcription.")
+        return
+    except fastapi.HTTPException as exception_info:
+        await send(
+            schemas.StreamTranscription(event="error", detail=exception_info.detail),
+        )
+        await websocket.close(
+            code=STREAM_CLOSE_CODES.get(
+                exception_info.status_code,
+                status.WS_1003_UNSUPPORTED_DATA,
+            ),
+        )
+        return
+    finally:
+        for task in tasks:
+            task.cancel()
 
-def _convert_audio(
+    await send(
+        schemas.StreamTranscription(
+            event="final",
+            transcription=" ".join(filter(None, transcriptions)),
+        ),
+    )
+    await websocket.close()
+
+
+async def check_speech(
+    word_id: int,
     audio: fastapi.UploadFile,
-    directory: str,
-    target_path: pathlib.Path,
-) -> None:
-    """Converts the audio to the target format.
+    session: orm.Session,
+    word_catalog: catalog.WordCatalog,
+) -> schemas.SpeechCheck:
+    """Transcribes a spoken guess and checks whether it is correct.
+
+    The word is looked up in the word catalog before the audio is transcribed,
+    so no transcription is started for a word that does not exist.
 
     Args:
-        audio: The audio file.
-        directory: The directory to save the audio file to.
-        target_path: The path to save the audio file to.
+        word_id: The ID of the word to check.
+        audio: The audio file of the guess.
+        session: The database session, only used to refresh the catalog.
+        word_catalog: The word catalog.
+
+    Returns:
+        The transcription and whether it matches the word.
 
     Raises:
-        fastapi.HTTPException: 400 If the audio file does not have a filename.
+        fastapi.HTTPException: 404 If the word was not found in the database.
     """
-    if audio.filename is None:
+    logger.debug("Checking spoken word.")
+    word = await word_catalog.get(word_id, session)
+    if not word:
+        logger.warning("Word ID not found in database.")
         raise fastapi.HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="The audio file must have a filename.",
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Word ID not found.",
         )
+    transcription = await transcribe(audio)
+    return schemas.SpeechCheck(
+        transcription=transcription,
+        is_correct=words_controller.is_correct_guess(transcription, word.word),
+    )
 
-    extension = pathlib.Path(audio.filename).suffix
-    if extension == TARGET_FILE_FORMAT:
+
+async def _transcribe(audio: bytes, filename: str) -> str:
+    """Converts audio and transcribes it.
+
+    The audio is piped through ffmpeg in chunks, which applies the
+    preprocessing profile. MP4 audio, such as the recordings of iOS and
+    Safari, is written to a temporary file instead, as its index may be at the
+    end. Without preprocessing, MP3 audio is passed through as is. The result
+    is sent to OpenAI from memory.
+
+    Args:
+        audio: The audio.
+        filename: The filename of the audio.
+
+    Returns:
+        The transcription of the audio.
+    """
+    if (
+        AUDIO_PREPROCESSING_PROFILE == config.AudioProfiles.DEFAULT
+        and pathlib.Path(filename).suffix == TARGET_FILE_FORMAT
+    ):
         logger.debug("Audio is already in the correct format.")
-        with target_path.open("wb") as target_file:
-            target_file.write(audio.file.read())
+        target = audio
+    elif audio[4:8] == ISO_MEDIA_FILE_TYPE:
+        logger.debug("Converting MP4 audio from a temporary file.")
+        target = await _transcode_from_file(audio, pathlib.Path(filename).suffix)
     else:
         logger.debug("Converting audio to correct format.")
-        audio_path = pathlib.Path(directory) / f"audio{extension}"
-        with audio_path.open("wb") as audio_file:
-            audio_file.write(audio.file.read())
-        ffmpeg.input(str(audio_path)).output(str(target_path)).run()
+        target = await transcoder.get_transcoder().transcode(_iterate_chunks(audio))
+    return await openai.SpeechToText().run(
+        target,
+        filename=f"audio{TARGET_FILE_FORMAT}",
+    )
+
+
+async def _transcode_from_file(audio: bytes, suffix: str) -> bytes:
+    """Converts audio from a temporary file, in which ffmpeg can seek.
+
+    Args:
+        audio: The audio.
+        suffix: The file extension of the audio.
+
+    Returns:
+        The audio as MP3.
+    """
+    with tempfile.NamedTemporaryFile(suffix=suffix) as file:
+        await concurrency.run_in_threadpool(file.write, audio)
+        await concurrency.run_in_threadpool(file.flush)
+        return await transcoder.get_transcoder().transcode_file(
+            pathlib.Path(file.name),
+        )
+
+
+def _transcription_key(audio: bytes) -> str:
+    """Returns the cache key of the transcription of audio.
+
+    Args:
+        audio: The audio.
+
+    Returns:
+        The key, consisting of the model, preprocessing profile and BLAKE2b
+        hash of the audio.
+    """
+    digest = hashlib.blake2b(audio, digest_size=32).hexdigest()
+    profile = AUDIO_PREPROCESSING_PROFILE.value
+    return f"{OPENAI_STT_MODEL.value}:{profile}:{digest}"
+
+
+async def _iterate_chunks(data: bytes) -> abc.AsyncGenerator[bytes, None]:
+    """Yields data in chunks of CHUNK_SIZE bytes.
+
+    Args:
+        data: The data.
+
+    Yields:
+        The chunks of the data.
+    """
+    for start in range(0, len(data), CHUNK_SIZE):
+        yield data[start : start + CHUNK_SIZE]
+
+
+async def _read_chunks(
+    audio: fastapi.UploadFile,
+    max_size: int,
+) -> abc.AsyncGenerator[bytes, None]:
+    """Reads the audio file in chunks, enforcing the maximum allowed size.
+
+    Args:
+        audio: The audio file to read.
+        max_size: The maximum allowed size in bytes.
+
+    Yields:
+        The chunks of the audio file.
+
+    Raises:
+        fastapi.HTTPException: 413 If the audio file size exceeds the maximum
+        allowed size.
+    """
+    msg = f"Audio file size exceeds maximum allowed size of {max_size} bytes."
+    if audio.size is not None and audio.size > max_size:
+        logger.error(msg)
+        raise fastapi.HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=msg,
+        )
+
+    size = 0
+    while chunk := await audio.read(CHUNK_SIZE):
+        size += len(chunk)
+        if size > max_size:
+            logger.error(msg)
+            raise fastapi.HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=msg,
+            )
+        yield chunk
+
+
+async def _stream_segments(
+    websocket: fastapi.WebSocket,
+) -> abc.AsyncGenerator[bytes, None]:
+    """Decodes streamed audio and splits it into segments of speech.
+
+    Args:
+        websocket: The accepted WebSocket connection.
+
+    Yields:
+        The PCM audio of each segment, as soon as it ended.
+
+    Raises:
+        fastapi.HTTPException: 413 If the audio is longer than
+            SPEECH_STREAM_MAX_SECONDS, or the errors of the transcoder and of
+            receiving the audio.
+    """
+    segmenter = vad.VoiceActivitySegmenter(
+        threshold=SPEECH_STREAM_VAD_THRESHOLD,
+        min_silence=SPEECH_STREAM_SILENCE,
+    )
+    size = 0
+    async with contextlib.aclosing(
+        transcoder.get_transcoder().decode(
+            _receive_chunks(websocket),
+            vad.SAMPLE_RATE,
+        ),
+    ) as decoded:
+        async for pcm in decoded:
+            size += len(pcm)
+            if size > MAX_STREAM_PCM_SIZE:
+                msg = (
+                    "Audio exceeds the maximum duration of "
+                    f"{SPEECH_STREAM_MAX_SECONDS} seconds."
+                )
+                logger.error(msg)
+                raise fastapi.HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=msg,
+                )
+            for segment in segmenter.feed(pcm):
+                yield segment
+
+    last_segment = segmenter.flush()
+    if last_segment is not None:
+        yield last_segment
+
+
+async def _receive_chunks(
+    websocket: fastapi.WebSocket,
+) -> abc.AsyncGenerator[bytes, None]:
+    """Receives streamed audio until the client ends the stream.
+
+    Args:
+        websocket: The accepted WebSocket connection.
+
+    Yields:
+        The chunks of the audio.
+
+    Raises:
+        fastapi.HTTPException: 408 If no message was received for
+            SPEECH_STREAM_IDLE_TIMEOUT seconds.
+        fastapi.WebSocketDisconnect: If the client disconnected before ending
+            the stream.
+    """
+    while True:
+        try:
+            async with asyncio.timeout(SPEECH_STREAM_IDLE_TIMEOUT):
+                message = await websocket.receive()
+        except TimeoutError as exception_info:
+            msg = f"No audio received for {SPEECH_STREAM_IDLE_TIMEOUT} seconds."
+            logger.warning(msg)
+            raise fastapi.HTTPException(
+                status_code=status.HTTP_408_REQUEST_TIMEOUT,
+                detail=msg,
+            ) from exception_info
+        if message["type"] == "websocket.disconnect":
+            raise fastapi.WebSocketDisconnect(code=message.get("code", 1000))
+        if message.get("bytes"):
+            yield message["bytes"]
+        elif message.get("text") == END_OF_STREAM:
+            return
@@ -0,0 +1,35 @@
+"""Schemas for the speech router."""
+from typing import Literal
+
+import pydantic
+
+
+class BatchTranscription(pydantic.BaseModel):
+    """The result of transcribing one file of a batch."""
+
+    index: int
+    filename: str | None
+    status_code: int
+    transcription: str | None = None
+    detail: str | None = None
+
+
+class SpeechCheck(pydantic.BaseModel):
+    """The transcription of a spoken guess and whether it is correct."""
+
+    transcription: str
+    is_correct: bool
+
+
+class StreamTranscription(pydantic.BaseModel):
+    """A message sent to the client of a streaming transcription.
+
+    Partial messages carry the transcription of one segment of speech, the
+    final message the transcription of all segments in order, and error
+    messages the detail of a failed segment or stream.
+    """
+
+    event: Literal["partial", "final", "error"]
+    segment: int | None = None
+    transcription: str | None = None
+    detail: str | None = None
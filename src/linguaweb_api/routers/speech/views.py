@@ -2,10 +2,12 @@
 import logging
 
 import fastapi
-from fastapi import status
+from fastapi import responses, status
+from sqlalchemy import orm
 
-from linguaweb_api.core import config
-from linguaweb_api.routers.speech import controller
+from linguaweb_api.core import catalog, config
+from linguaweb_api.microservices import sql
+from linguaweb_api.routers.speech import controller, schemas
 
 settings = config.get_settings()
 LOGGER_NAME = settings.LOGGER_NAME
@@ -22,14 +24,19 @@ router = fastapi.APIRouter(prefix="/speech", tags=["speech"])
     summary="Transcribes an audio file and returns the transcription.",
     description="""Uses OpenAI's Whisper API to transcribe the provided audio. Maximum
         allowed file size is 1 MB, and the audio file must be in a format that ffmpeg
-        can convert to mp3.""",
+        can convert to mp3 while reading it as a stream.""",
     responses={
         status.HTTP_400_BAD_REQUEST: {
-            "description": "The audio file must have a filename.",
+            "description": (
+                "The audio file must have a filename and be convertible to mp3."
+            ),
         },
         status.HTTP_413_REQUEST_ENTITY_TOO_LARGE: {
             "description": "The audio file size exceeds the maximum allowed size.",
         },
+        status.HTTP_503_SERVICE_UNAVAILABLE: {
+            "description": "Too many audio files are being converted.",
+        },
     },
 )
 async def transcribe(audio: fastapi.UploadFile = fastapi.File(...)) -> str:
@@ -45,3 +52,107 @@ async def transcribe(audio: fastapi.UploadFile = fastapi.File(...)) -> str:
     transcription = controller.transcribe(audio)
     logger.debug("Transcribed audio.")
     return await transcription
+
+
+@router.post(
+    "/transcribe/batch",
+    status_code=status.HTTP_200_OK,
+    summary="Transcribes many audio files and streams the transcriptions.",
+    description="""Transcribes each of the provided audio files as /speech/transcribe
+        does, concurrently. Results are streamed as newline-delimited JSON objects in
+        the order in which the files finish, each with the index of the file in the
+        request, its status code and its transcription or error detail. A failed file
+        does not fail the batch.""",
+    response_class=responses.StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {
+            "content": {controller.NDJSON_MEDIA_TYPE: {}},
+            "description": "One BatchTranscription JSON object per line.",
+        },
+        status.HTTP_413_REQUEST_ENTITY_TOO_LARGE: {
+            "description": "The batch contains too many or too large files.",
+        },
+    },
+)
+async def transcribe_batch(
+    audio: list[fastapi.UploadFile] = fastapi.File(...),
+) -> responses.StreamingResponse:
+    """Transcribes many audio files using OpenAI's Whisper API.
+
+    Args:
+        audio: The audio files.
+
+    Returns:
+        The streaming response of the transcriptions.
+    """
+    logger.debug("Transcribing batch of audio.")
+    return await controller.transcribe_batch(audio)
+
+
+@router.websocket("/stream")
+async def stream_transcription(websocket: fastapi.WebSocket) -> None:
+    """Transcribes speech while it is being recorded.
+
+    The client streams the audio as binary messages, in any format that ffmpeg
+    can decode from a stream such as WebM/Opus or raw PCM, and sends the text
+    message "end" once it stopped recording. The speech is split at pauses and
+    every segment is transcribed as soon as it ends. The server sends a
+    StreamTranscription JSON message for each segment, with the event
+    "partial", followed by one with the event "final" that contains the whole
+    transcription, after which it closes the connection. Failures are sent
+    with the event "error".
+
+    Args:
+        websocket: The WebSocket connection.
+    """
+    logger.debug("Streaming transcription.")
+    await controller.stream_transcription(websocket)
+    logger.debug("Streamed transcription.")
+
+
+@router.post(
+    "/check/{word_id}",
+    response_model=schemas.SpeechCheck,
+    status_code=status.HTTP_200_OK,
+    summary="Transcribes a spoken guess and checks whether it is correct.",
+    description="""Transcribes the provided audio as /speech/transcribe does and checks
+        the transcription against the word as /words/check does, in a single request.
+        The audio is only transcribed if the word exists.""",
+    responses={
+        status.HTTP_400_BAD_REQUEST: {
+            "description": (
+                "The audio file must have a filename and be convertible to mp3."
+            ),
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "description": "Word ID not found.",
+        },
+        status.HTTP_413_REQUEST_ENTITY_TOO_LARGE: {
+            "description": "The audio file size exceeds the maximum allowed size.",
+        },
+        status.HTTP_503_SERVICE_UNAVAILABLE: {
+            "description": "Too many audio files are being converted.",
+        },
+    },
+)
+async def check_speech(
+    word_id: int = fastapi.Path(..., title="The ID of the word to check."),
+    audio: fastapi.UploadFile = fastapi.File(...),
+    session: orm.Session = fastapi.Depends(sql.get_session),
+    word_catalog: catalog.WordCatalog = fastapi.Depends(catalog.get_word_catalog),
+) -> schemas.SpeechCheck:
+    """Transcribes a spoken guess and checks whether it is correct.
+
+    Args:
+        word_id: The ID of the word to check.
+        audio: The audio file of the guess.
+        session: The database session.
+        word_catalog: The word catalog.
+
+    Returns:
+        The transcription and whether it is correct.
+    """
+    logger.debug("Checking spoken word.")
+    result = await controller.check_speech(word_id, audio, session, word_catalog)
+    logger.debug("Checked spoken word.")
+    return result
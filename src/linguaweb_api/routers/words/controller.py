@@ -1,41 +1,60 @@
 """Business logic for the text router."""
+import functools
 import logging
+import pathlib
+from collections import abc
 
 import fastapi
 from botocore import errorfactory
-from fastapi import status
+from fastapi import concurrency, responses, status
 from sqlalchemy import orm
+from starlette import background
 
-from linguaweb_api.core import config, models
+from linguaweb_api.core import cache, catalog, config, http_headers
 from linguaweb_api.microservices import s3
+from linguaweb_api.routers.words import schemas
 
 settings = config.get_settings()
 LOGGER_NAME = settings.LOGGER_NAME
+AUDIO_DOWNLOAD_MODE = settings.AUDIO_DOWNLOAD_MODE
+AUDIO_CACHE_CONTROL_MAX_AGE = settings.AUDIO_CACHE_CONTROL_MAX_AGE
+WORDS_BATCH_MAX_IDS = settings.WORDS_BATCH_MAX_IDS
 
 logger = logging.getLogger(LOGGER_NAME)
 
+AUDIO_MEDIA_TYPE = "audio/mp3"
+FILE_CHUNK_SIZE = 64 * 1024
 
-async def get_all_word_ids(session: orm.Session) -> list[int]:
+
+async def get_all_word_ids(
+    session: orm.Session,
+    word_catalog: catalog.WordCatalog,
+) -> list[int]:
     """Returns all word IDs.
 
     Args:
-        session: The database session.
+        session: The database session, only used to refresh the catalog.
+        word_catalog: The word catalog.
 
     Returns:
         The IDs of all words.
 
     """
     logger.debug("Getting all word IDs.")
-    words = session.query(models.Word.id).all()
-    return [word.id for word in words]
+    return await word_catalog.get_ids(session)
 
 
-async def get_word(identifier: int, session: orm.Session) -> models.Word:
+async def get_word(
+    identifier: int,
+    session: orm.Session,
+    word_catalog: catalog.WordCatalog,
+) -> catalog.WordRecord:
     """Returns the description of a random word.
 
     Args:
         identifier: The id of the word.
-        session: The database session.
+        session: The database session, only used to refresh the catalog.
+        word_catalog: The word catalog.
 
     Returns:
         The description of the word.
@@ -45,7 +64,7 @@ async def get_word(identifier: int, session: orm.Session) -> models.Word:
 
     """
     logger.debug("Getting word description.")
-    word = session.query(models.Word).filter_by(id=identifier).first()
+    word = await word_catalog.get(identifier, session)
     if not word:
         logger.warning("Word not found in database.")
         raise fastapi.HTTPException(
@@ -55,17 +74,93 @@ async def get_word(identifier: int, session: orm.Session) -> models.Word:
     return word
 
 
+async def get_words(
+    identifiers: list[int],
+    session: orm.Session,
+    word_catalog: catalog.WordCatalog,
+) -> list[schemas.WordLookup]:
+    """Returns the data of many words at once.
+
+    All words are looked up in the word catalog, which refreshes itself at
+    most once for the whole batch. Duplicate ids are returned once.
+
+    Args:
+        identifiers: The ids of the words.
+        session: The database session, only used to refresh the catalog.
+        word_catalog: The word catalog.
+
+    Returns:
+        The lookup of each id, in the order of the ids, with unknown ids
+        marked as not found.
+
+    Raises:
+        fastapi.HTTPException: 400 If more than WORDS_BATCH_MAX_IDS ids are
+            requested.
+    """
+    logger.debug("Getting %d words.", len(identifiers))
+    unique_identifiers = list(dict.fromkeys(identifiers))
+    if len(unique_identifiers) > WORDS_BATCH_MAX_IDS:
+        raise fastapi.HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {WORDS_BATCH_MAX_IDS} words may be requested at once.",
+        )
+    records = await word_catalog.get_many(unique_identifiers, session)
+    return [
+        schemas.WordLookup(
+            id=identifier,
+            found=record is not None,
+            data=schemas.WordData.model_validate(record, from_attributes=True)
+            if record is not None
+            else None,
+        )
+        for identifier, record in records.items()
+    ]
+
+
+async def get_random_words(
+    count: int,
+    exclude: list[int],
+    session: orm.Session,
+    word_catalog: catalog.WordCatalog,
+) -> list[catalog.WordRecord]:
+    """Returns random words, sampled without replacement.
+
+    Args:
+        count: The number of words.
+        exclude: The ids of words that must not be returned.
+        session: The database session, only used to refresh the catalog.
+        word_catalog: The word catalog.
+
+    Returns:
+        The words, fewer than the count if not enough words remain after the
+        exclusions.
+
+    Raises:
+        fastapi.HTTPException: 400 If more than WORDS_BATCH_MAX_IDS words are
+            requested.
+    """
+    logger.debug("Getting %d random words.", count)
+    if count > WORDS_BATCH_MAX_IDS:
+        raise fastapi.HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {WORDS_BATCH_MAX_IDS} words may be requested at once.",
+        )
+    return await word_catalog.sample(count, session, exclude=exclude)
+
+
 async def check_word(
     word_id: int,
     word: str,
     session: orm.Session,
+    word_catalog: catalog.WordCatalog,
 ) -> bool:
     """Checks whether a word was guessed correctly.
 
     Args:
         word_id: The ID of the word to check.
         word: The word to check.
-        session: The database session.
+        session: The database session, only used to refresh the catalog.
+        word_catalog: The word catalog.
 
     Returns:
         bool: Whether the word was guessed correctly.
@@ -77,42 +172,338 @@ async def check_word(
         Case insensitive.
     """
     logger.debug("Checking word: %s", word)
-    word_model = session.query(models.Word).filter_by(id=word_id).first()
+    word_model = await word_catalog.get(word_id, session)
     if not word_model:
         logger.warning("Word ID not found in database.")
         raise fastapi.HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Word ID not found.",
         )
-    return _sanitize_word(word) == _sanitize_word(word_model.word)
+    return is_correct_guess(word, word_model.word)
 
 
-def download_audio(identifier: int, session: orm.Session, s3_client: s3.S3) -> bytes:
+async def download_audio(  # noqa: PLR0913
+    identifier: int,
+    session: orm.Session,
+    word_catalog: catalog.WordCatalog,
+    s3_client: s3.S3,
+    audio_cache: cache.AudioCache,
+    request_headers: abc.Mapping[str, str],
+) -> fastapi.Response:
     """Downloads the audio of a word.
 
+    In redirect mode, the client is redirected to a presigned S3 URL.
+    Otherwise, audio is served from the memory tier of the cache, then the
+    disk tier, and only then streamed from S3. A hit in one tier warms the
+    other one after the response was sent. The blocking database query and S3
+    request run in the thread pool, such that a slow download does not block
+    the event loop. The word itself is looked up in the word catalog.
+
+    Single byte ranges are answered with 206 Partial Content. Conditional
+    requests are answered with 304 Not Modified based on the ETag, which is
+    the content digest of the audio, and on the last update of the word.
+
     Args:
         identifier: The id of the word.
-        session: The database session.
+        session: The database session, only used to refresh the catalog.
+        word_catalog: The word catalog.
         s3_client: The S3 client to use.
+        audio_cache: The audio cache to use.
+        request_headers: The headers of the request.
 
     Returns:
-        The audio bytes.
+        The response containing the audio.
     """
     logger.debug("Downloading audio.")
-    word = session.query(models.Word).filter_by(id=identifier).first()
+    word = await word_catalog.get(identifier, session)
     if not word or not word.s3_key:
         raise fastapi.HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Audio not found.",
         )
+
+    if AUDIO_DOWNLOAD_MODE == config.AudioDownloadModes.REDIRECT:
+        logger.debug("Redirecting to presigned URL.")
+        return responses.RedirectResponse(
+            s3_client.presigned_url(word.s3_key),
+            status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+        )
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Cache-Control": f"public, max-age={AUDIO_CACHE_CONTROL_MAX_AGE}",
+    }
+    if word.time_updated:
+        headers["Last-Modified"] = http_headers.format_http_date(word.time_updated)
+    if_none_match = request_headers.get("if-none-match")
+    if_modified_since = request_headers.get("if-modified-since")
+    range_header = request_headers.get("range")
+
+    if (
+        if_none_match is None
+        and if_modified_since
+        and word.time_updated
+        and not http_headers.is_modified_since(if_modified_since, word.time_updated)
+    ):
+        return _not_modified(headers)
+
+    if (audio_bytes := audio_cache.get_bytes(word.s3_key)) is not None:
+        return _serve_from_memory(
+            word.s3_key,
+            audio_bytes,
+            audio_cache,
+            headers,
+            range_header=range_header,
+            if_none_match=if_none_match,
+        )
+    if audio_file := await concurrency.run_in_threadpool(
+        audio_cache.get_file,
+        word.s3_key,
+    ):
+        return _serve_from_disk(
+            word.s3_key,
+            audio_file,
+            audio_cache,
+            headers,
+            range_header=range_header,
+            if_none_match=if_none_match,
+        )
+    return await _stream_from_s3(
+        word.s3_key,
+        s3_client,
+        audio_cache,
+        headers,
+        range_header=range_header,
+        if_none_match=if_none_match,
+    )
+
+
+def _serve_from_memory(  # noqa: PLR0913
+    s3_key: str,
+    audio_bytes: bytes,
+    audio_cache: cache.AudioCache,
+    headers: dict[str, str],
+    *,
+    range_header: str | None,
+    if_none_match: str | None,
+) -> fastapi.Response:
+    """Serves audio from the memory tier, warming the disk tier afterwards.
+
+    Args:
+        s3_key: The S3 key of the audio.
+        audio_bytes: The audio.
+        audio_cache: The audio cache to use.
+        headers: The headers of the response.
+        range_header: The Range header of the request.
+        if_none_match: The If-None-Match header of the request.
+
+    Returns:
+        The response containing the audio.
+    """
+    logger.debug("Serving audio from memory.")
+    headers["ETag"] = http_headers.format_etag(cache.content_digest(audio_bytes))
+    if if_none_match and http_headers.etag_matches(if_none_match, headers["ETag"]):
+        return _not_modified(headers)
+
+    warm_disk = background.BackgroundTask(audio_cache.warm_disk, s3_key, audio_bytes)
+    byte_range = http_headers.resolve_range(range_header, len(audio_bytes))
+    if byte_range:
+        headers["Content-Range"] = byte_range.content_range(len(audio_bytes))
+        return fastapi.Response(
+            audio_bytes[byte_range.start : byte_range.end + 1],
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            headers=headers,
+            media_type=AUDIO_MEDIA_TYPE,
+            background=warm_disk,
+        )
+    return fastapi.Response(
+        audio_bytes,
+        headers=headers,
+        media_type=AUDIO_MEDIA_TYPE,
+        background=warm_disk,
+    )
+
+
+def _serve_from_disk(  # noqa: PLR0913
+    s3_key: str,
+    audio_file: cache.DiskEntry,
+    audio_cache: cache.AudioCache,
+    headers: dict[str, str],
+    *,
+    range_header: str | None,
+    if_none_match: str | None,
+) -> fastapi.Response:
+    """Serves audio from the disk tier, warming the memory tier afterwards.
+
+    Args:
+        s3_key: The S3 key of the audio.
+        audio_file: The cached audio file.
+        audio_cache: The audio cache to use.
+        headers: The headers of the response.
+        range_header: The Range header of the request.
+        if_none_match: The If-None-Match header of the request.
+
+    Returns:
+        The response containing the audio.
+    """
+    logger.debug("Serving audio from disk.")
+    headers["ETag"] = http_headers.format_etag(audio_file.digest)
+    if if_none_match and http_headers.etag_matches(if_none_match, headers["ETag"]):
+        return _not_modified(headers)
+
+    byte_range = http_headers.resolve_range(range_header, audio_file.size)
+    if byte_range:
+        headers["Content-Range"] = byte_range.content_range(audio_file.size)
+        headers["Content-Length"] = str(byte_range.length)
+        return responses.StreamingResponse(
+            _iterate_file(audio_file.path, byte_range),
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            headers=headers,
+            media_type=AUDIO_MEDIA_TYPE,
+        )
+    return responses.FileResponse(
+        audio_file.path,
+        headers=headers,
+        media_type=AUDIO_MEDIA_TYPE,
+        background=background.BackgroundTask(
+            audio_cache.warm_memory,
+            s3_key,
+            audio_file.path,
+        ),
+    )
+
+
+async def _stream_from_s3(  # noqa: PLR0913
+    s3_key: str,
+    s3_client: s3.S3,
+    audio_cache: cache.AudioCache,
+    headers: dict[str, str],
+    *,
+    range_header: str | None,
+    if_none_match: str | None,
+) -> fastapi.Response:
+    """Streams audio from S3, caching it if it is requested in full.
+
+    Range and If-None-Match headers are forwarded to S3, such that partial and
+    unmodified content never transfers the full object.
+
+    Args:
+        s3_key: The S3 key of the audio.
+        s3_client: The S3 client to use.
+        audio_cache: The audio cache to use.
+        headers: The headers of the response.
+        range_header: The Range header of the request.
+        if_none_match: The If-None-Match header of the request.
+
+    Returns:
+        The response containing the audio.
+    """
+    if not http_headers.is_single_range(range_header):
+        range_header = None
     try:
-        return s3_client.read(word.s3_key)
+        streamed = await concurrency.run_in_threadpool(
+            functools.partial(
+                s3_client.stream,
+                s3_key,
+                byte_range=range_header,
+                if_none_match=if_none_match,
+            ),
+        )
     except errorfactory.ClientError as exception_info:
+        response = exception_info.response
+        status_code = response["ResponseMetadata"]["HTTPStatusCode"]
+        if status_code == status.HTTP_304_NOT_MODIFIED:
+            etag = response["ResponseMetadata"]["HTTPHeaders"].get("etag")
+            if not etag and if_none_match and "," not in if_none_match:
+                etag = if_none_match.strip().removeprefix("W/")
+            if etag and etag != "*":
+                headers["ETag"] = etag
+            return _not_modified(headers)
+        if status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE:
+            size = response["Error"].get("ActualObjectSize", "*")
+            raise fastapi.HTTPException(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                detail="Requested range not satisfiable.",
+                headers={"Content-Range": f"bytes */{size}"},
+            ) from exception_info
         raise fastapi.HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Audio not found.",
         ) from exception_info
 
+    logger.debug("Serving audio from S3.")
+    headers["ETag"] = http_headers.format_etag(streamed.etag)
+    headers["Content-Length"] = str(streamed.content_length)
+    if streamed.content_range:
+        headers["Content-Range"] = streamed.content_range
+        return responses.StreamingResponse(
+            streamed.chunks,
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            headers=headers,
+            media_type=AUDIO_MEDIA_TYPE,
+        )
+    return responses.StreamingResponse(
+        audio_cache.tee(s3_key, streamed.chunks),
+        headers=headers,
+        media_type=AUDIO_MEDIA_TYPE,
+    )
+
+
+def _not_modified(headers: dict[str, str]) -> fastapi.Response:
+    """Returns a 304 Not Modified response.
+
+    Args:
+        headers: The headers of the response.
+
+    Returns:
+        The response.
+    """
+    return fastapi.Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={
+            key: value
+            for key, value in headers.items()
+            if key in ("Cache-Control", "ETag", "Last-Modified")
+        },
+    )
+
+
+def _iterate_file(
+    path: pathlib.Path,
+    byte_range: http_headers.ByteRange,
+) -> abc.Iterator[bytes]:
+    """Iterates over a range of bytes of a file.
+
+    Args:
+        path: The path to the file.
+        byte_range: The range of bytes to read.
+
+    Returns:
+        An iterator over the chunks of the range.
+    """
+    with path.open("rb") as file:
+        file.seek(byte_range.start)
+        remaining = byte_range.length
+        while remaining > 0:
+            chunk = file.read(min(FILE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def is_correct_guess(guess: str, word: str) -> bool:
+    """Checks whether a guess matches a word, ignoring case and punctuation.
+
+    Args:
+        guess: The guessed word.
+        word: The correct word.
+
+    Returns:
+        Whether the guess is correct.
+    """
+    return _sanitize_word(guess) == _sanitize_word(word)
+
 
 def _sanitize_word(word: str) -> str:
     """Sanitizes a word.
@@ -12,3 +12,11 @@ class WordData(pydantic.BaseModel):
     antonyms: list[str]
     jeopardy: str
     s3_key: str
+
+
+class WordLookup(pydantic.BaseModel):
+    """The result of looking up one word of a batch."""
+
+    id: int
+    found: bool
+    data: WordData | None = None
@@ -2,10 +2,10 @@
 import logging
 
 import fastapi
-from fastapi import status
+from fastapi import responses, status
 from sqlalchemy import orm
 
-from linguaweb_api.core import config
+from linguaweb_api.core import cache, catalog, config
 from linguaweb_api.microservices import s3, sql
 from linguaweb_api.routers.words import controller, schemas
 
@@ -26,18 +26,86 @@ router = fastapi.APIRouter(prefix="/words", tags=["words"])
 )
 async def get_all_word_ids(
     session: orm.Session = fastapi.Depends(sql.get_session),
+    word_catalog: catalog.WordCatalog = fastapi.Depends(catalog.get_word_catalog),
 ) -> list[int]:
     """Returns all word IDs.
 
     Args:
         session: The database session.
+        word_catalog: The word catalog.
     """
     logger.debug("Getting all word IDs.")
-    word_ids = await controller.get_all_word_ids(session)
+    word_ids = await controller.get_all_word_ids(session, word_catalog)
     logger.debug("Got all word IDs.")
     return word_ids
 
 
+@router.get(
+    "/batch",
+    response_model=list[schemas.WordLookup],
+    status_code=status.HTTP_200_OK,
+    summary="Returns the data of many words.",
+    description="""Returns the complete SQL models of the requested words in a single
+        response, in the order of the ids. Words that do not exist are returned with
+        found set to false instead of failing the request.""",
+    responses={
+        status.HTTP_400_BAD_REQUEST: {
+            "description": "Too many words were requested.",
+        },
+    },
+)
+async def get_words(
+    ids: list[int] = fastapi.Query(..., title="The ids of the words."),
+    session: orm.Session = fastapi.Depends(sql.get_session),
+    word_catalog: catalog.WordCatalog = fastapi.Depends(catalog.get_word_catalog),
+) -> list[schemas.WordLookup]:
+    """Returns the data of many words.
+
+    Args:
+        ids: The ids of the words.
+        session: The database session.
+        word_catalog: The word catalog.
+    """
+    logger.debug("Getting words.")
+    words = await controller.get_words(ids, session, word_catalog)
+    logger.debug("Got words.")
+    return words
+
+
+@router.get(
+    "/random",
+    response_model=list[schemas.WordData],
+    status_code=status.HTTP_200_OK,
+    summary="Returns random words.",
+    description="""Returns the complete SQL models of n distinct random words, none of
+        which is in exclude. Fewer words are returned if the word bank does not have
+        enough words that are not excluded.""",
+    responses={
+        status.HTTP_400_BAD_REQUEST: {
+            "description": "Too many words were requested.",
+        },
+    },
+)
+async def get_random_words(
+    n: int = fastapi.Query(1, ge=1, title="The number of words."),
+    exclude: list[int] = fastapi.Query([], title="The ids of words to leave out."),
+    session: orm.Session = fastapi.Depends(sql.get_session),
+    word_catalog: catalog.WordCatalog = fastapi.Depends(catalog.get_word_catalog),
+) -> list[schemas.WordData]:
+    """Returns random words.
+
+    Args:
+        n: The number of words.
+        exclude: The ids of words to leave out.
+        session: The database session.
+        word_catalog: The word catalog.
+    """
+    logger.debug("Getting random words.")
+    words = await controller.get_random_words(n, exclude, session, word_catalog)
+    logger.debug("Got random words.")
+    return words  # type: ignore[return-value] # FastAPI magic casts to the type hint.
+
+
 @router.get(
     "/{identifier}",
     response_model=schemas.WordData,
@@ -53,17 +121,19 @@ async def get_all_word_ids(
 async def get_word(
     identifier: int = fastapi.Path(..., title="The id of the word."),
     session: orm.Session = fastapi.Depends(sql.get_session),
+    word_catalog: catalog.WordCatalog = fastapi.Depends(catalog.get_word_catalog),
 ) -> schemas.WordData:
     """Returns the description of a random word.
 
     Args:
         identifier: The id of the word.
         session: The database session.
+        word_catalog: The word catalog.
     """
     logger.debug("Getting word description.")
-    text_task = await controller.get_word(identifier, session)
+    text_task = await controller.get_word(identifier, session, word_catalog)
     logger.debug("Got word description.")
-    return text_task
+    return text_task  # type: ignore[return-value] # FastAPI magic casts to the type hint.
 
 
 @router.post(
@@ -76,6 +146,7 @@ async def check_word(
     word_id: int = fastapi.Path(..., title="The ID of the word to check."),
     word: str = fastapi.Form(..., title="The information to check."),
     session: orm.Session = fastapi.Depends(sql.get_session),
+    word_catalog: catalog.WordCatalog = fastapi.Depends(catalog.get_word_catalog),
 ) -> bool:
     """Checks attributes of a word.
 
@@ -83,9 +154,10 @@ async def check_word(
         word_id: The ID of the word to check.
         word: The information to check.
         session: The database session.
+        word_catalog: The word catalog.
     """
     logger.debug("Checking word.")
-    is_correct = await controller.check_word(word_id, word, session)
+    is_correct = await controller.check_word(word_id, word, session, word_catalog)
     logger.debug("Checked word.")
     return is_correct
 
@@ -94,22 +166,54 @@ async def check_word(
     "/download/{identifier}",
     status_code=status.HTTP_200_OK,
     summary="Returns the audio of a word.",
-    description="Downloads the audio file for a specific word by its ID.",
+    description="""Downloads the audio file for a specific word by its ID. If the API
+    is configured to redirect, responds with a redirect to a short-lived
+    presigned URL instead.""",
+    response_class=responses.StreamingResponse,
+    responses={
+        status.HTTP_206_PARTIAL_CONTENT: {
+            "description": "The requested byte range of the audio.",
+        },
+        status.HTTP_304_NOT_MODIFIED: {
+            "description": "The audio was not modified.",
+        },
+        status.HTTP_307_TEMPORARY_REDIRECT: {
+            "description": "Redirect to a presigned URL of the audio.",
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "description": "Audio not found.",
+        },
+        status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE: {
+            "description": "Requested range not satisfiable.",
+        },
+    },
 )
-async def get_audio(
+async def get_audio(  # noqa: PLR0913
+    request: fastapi.Request,
     identifier: int = fastapi.Path(..., title="The id of the word."),
     session: orm.Session = fastapi.Depends(sql.get_session),
-    s3_client: s3.S3 = fastapi.Depends(s3.S3),
+    word_catalog: catalog.WordCatalog = fastapi.Depends(catalog.get_word_catalog),
+    s3_client: s3.S3 = fastapi.Depends(s3.get_s3_client),
+    audio_cache: cache.AudioCache = fastapi.Depends(cache.get_audio_cache),
 ) -> fastapi.Response:
     """Returns the audio of a word.
 
     Args:
+        request: The request, used for its range and conditional headers.
         identifier: The id of the word.
         session: The database session.
+        word_catalog: The word catalog.
         s3_client: The S3 client to use.
+        audio_cache: The audio cache to use.
     """
     logger.debug("Downloading audio.")
-    audio_bytes = controller.download_audio(identifier, session, s3_client)
+    response = await controller.download_audio(
+        identifier,
+        session,
+        word_catalog,
+        s3_client,
+        audio_cache,
+        request.headers,
+    )
     logger.debug("Downloaded audio.")
-
-    return fastapi.Response(audio_bytes, media_type="audio/mp3")
+    return response
@@ -0,0 +1,39 @@
+"""Entrypoint for a standalone ingestion job worker.
+
+Run with `python -m linguaweb_api.worker`. This allows ingestion to scale
+independently of the API, in which case the in-process worker of the API can be
+disabled by setting JOB_WORKERS to 0 for the API processes.
+"""
+import asyncio
+import logging
+
+from linguaweb_api.core import config, generation_cache
+from linguaweb_api.microservices import openai, sql
+from linguaweb_api.routers.admin import jobs
+
+settings = config.get_settings()
+LOGGER_NAME = settings.LOGGER_NAME
+JOB_WORKERS = settings.JOB_WORKERS
+
+config.initialize_logger()
+logger = logging.getLogger(LOGGER_NAME)
+
+
+async def run() -> None:
+    """Processes ingestion jobs until cancelled."""
+    sql.get_database().create_database()
+    worker = jobs.JobWorker(concurrency=max(JOB_WORKERS, 1))
+    worker.start()
+    logger.info("Started job worker with %d tasks.", worker.concurrency)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        logger.info("Stopping job worker.")
+        await worker.stop()
+        sql.dispose_database()
+        await openai.close_client()
+        generation_cache.close_generation_cache()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
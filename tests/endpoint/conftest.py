@@ -7,7 +7,8 @@ from fastapi import testclient
 from sqlalchemy import orm
 
 from linguaweb_api import main
-from linguaweb_api.microservices import sql
+from linguaweb_api.core import cache, catalog
+from linguaweb_api.microservices import s3, sql
 
 API_ROOT = "/api/v1"
 
@@ -17,13 +18,20 @@ class Endpoints(str, enum.Enum):
 
     POST_ADD_WORD = f"{API_ROOT}/admin/add_word"
     POST_ADD_PRESET_WORDS = f"{API_ROOT}/admin/add_preset_words"
+    POST_JOB = f"{API_ROOT}/admin/jobs"
+    GET_JOB = f"{API_ROOT}/admin/jobs/{{job_id}}"
 
     GET_WORD = f"{API_ROOT}/words/{{word_id}}"
     GET_ALL_WORD_IDS = f"{API_ROOT}/words"
+    GET_WORDS_BATCH = f"{API_ROOT}/words/batch"
+    GET_RANDOM_WORDS = f"{API_ROOT}/words/random"
     GET_AUDIO = f"{API_ROOT}/words/download/{{audio_id}}"
     POST_CHECK_WORD = f"{API_ROOT}/words/check/{{word_id}}"
 
     POST_SPEECH_TRANSCRIBE = f"{API_ROOT}/speech/transcribe"
+    POST_SPEECH_TRANSCRIBE_BATCH = f"{API_ROOT}/speech/transcribe/batch"
+    POST_SPEECH_CHECK = f"{API_ROOT}/speech/check/{{word_id}}"
+    WS_SPEECH_STREAM = f"{API_ROOT}/speech/stream"
 
     GET_HEALTH = f"{API_ROOT}/health"
 
@@ -43,7 +51,31 @@ def client() -> testclient.TestClient:
 @pytest.fixture(autouse=True, scope="session")
 def _start_database() -> None:
     """Starts the database."""
-    main.database.create_database()
+    sql.get_database().create_database()
+
+
+@pytest.fixture(autouse=True)
+def _clear_s3_client() -> None:
+    """Clears the shared S3 client, as each test mocks its own S3 backend."""
+    s3.get_s3_client.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def _clear_audio_cache() -> None:
+    """Clears the shared audio cache, as each test mocks its own S3 backend."""
+    cache.get_audio_cache.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def _clear_transcription_cache() -> None:
+    """Clears the shared transcription cache, as tests reuse the same audio."""
+    cache.get_transcription_cache.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def _clear_word_catalog() -> None:
+    """Clears the shared word catalog, as each test starts with empty tables."""
+    catalog.get_word_catalog.cache_clear()
 
 
 @pytest.fixture()
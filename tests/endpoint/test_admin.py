@@ -1,12 +1,19 @@
 """Tests for the admin endpoints."""
+import asyncio
+import datetime
 from collections.abc import Generator
 
+import fastapi
 import moto
 import pytest
 import pytest_mock
+import sqlalchemy
 from fastapi import status, testclient
+from sqlalchemy import orm
 
-from linguaweb_api.core import dictionary
+from linguaweb_api.core import deadline, dictionary, middleware, models
+from linguaweb_api.microservices import s3, sql
+from linguaweb_api.routers.admin import controller, jobs, schemas
 from tests.endpoint import conftest
 
 
@@ -47,6 +54,62 @@ def test_add_word(
     assert all(item in response.json() for item in TextTask().__dict__)
 
 
+def test_add_word_coalesces_concurrent_requests(
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    """Tests that concurrent requests for a word share one generation."""
+    calls = 0
+
+    async def get_listening_task(_word: str) -> bytes:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return b"test_bytes"
+
+    mocker.patch.object(controller, "_get_listening_task", get_listening_task)
+
+    async def add_concurrently() -> tuple[schemas.Word, schemas.Word]:
+        return await asyncio.gather(
+            controller.add_word("test_word", s3.get_s3_client()),
+            controller.add_word(" Test_Word ", s3.get_s3_client()),
+        )
+
+    first, second = asyncio.run(add_concurrently())
+
+    assert first == second
+    assert first.word == "test_word"
+    assert calls == 1
+
+
+def test_add_word_releases_session_while_generating(
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    """Tests that no database transaction is open while a word is generated."""
+    database = sql.get_database()
+    session_factory = database.session_factory
+    sessions: list[orm.Session] = []
+
+    def track_session() -> orm.Session:
+        session = session_factory()
+        sessions.append(session)
+        return session
+
+    mocker.patch.object(database, "session_factory", track_session)
+    generate_word = controller.generate_word
+    open_transactions: list[bool] = []
+
+    async def check_and_generate_word(word: str, s3_client: s3.S3) -> models.Word:
+        open_transactions.extend(session.in_transaction() for session in sessions)
+        return await generate_word(word, s3_client)
+
+    mocker.patch.object(controller, "generate_word", check_and_generate_word)
+
+    asyncio.run(controller.add_word("test_word", s3.get_s3_client()))
+
+    assert sessions
+    assert not any(open_transactions)
+
+
 def test_add_word_already_exists(
     client: testclient.TestClient,
     endpoints: conftest.Endpoints,
@@ -59,6 +122,45 @@ def test_add_word_already_exists(
     assert response.status_code == status.HTTP_409_CONFLICT
 
 
+def test_add_word_already_exists_in_other_case(
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+    session: orm.Session,
+) -> None:
+    """Tests that words stored before normalization are found regardless of case."""
+    session.add(
+        models.Word(
+            word="Test_Word",
+            description="test_description",
+            synonyms=[],
+            antonyms=[],
+            jeopardy="test_jeopardy",
+            s3_key="Test_Word.mp3",
+        ),
+    )
+    session.commit()
+
+    response = client.post(endpoints.POST_ADD_WORD, data={"word": "test_word"})
+
+    assert response.status_code == status.HTTP_409_CONFLICT
+
+
+def test_add_word_conflict_deletes_audio(
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    """Tests that the uploaded audio is deleted if the insert conflicts."""
+    mocker.patch.object(controller, "insert_word_if_absent", return_value=None)
+
+    response = client.post(endpoints.POST_ADD_WORD, data={"word": "test_word"})
+
+    s3_client = s3.get_s3_client()
+    objects = s3_client.client.list_objects_v2(Bucket=s3_client.bucket_name)
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert objects["KeyCount"] == 0
+
+
 def test_add_preset_words(
     client: testclient.TestClient,
     endpoints: conftest.Endpoints,
@@ -68,7 +170,29 @@ def test_add_preset_words(
     words = dictionary.read_words()
 
     assert response.status_code == status.HTTP_201_CREATED
-    assert [word["word"] for word in response.json()] == words
+    assert [word["word"] for word in response.json()["added"]] == words
+    assert response.json()["failed"] == []
+
+
+def test_add_preset_words_outlives_request_timeout(
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    """Tests that the ingestion of preset words is not bound by REQUEST_TIMEOUT."""
+    mocker.patch.object(middleware, "REQUEST_TIMEOUT", 0.01)
+
+    async def get_listening_task(_word: str) -> bytes:
+        async with deadline.timeout():
+            await asyncio.sleep(0.02)
+        return b"test_bytes"
+
+    mocker.patch.object(controller, "_get_listening_task", get_listening_task)
+
+    response = client.post(endpoints.POST_ADD_PRESET_WORDS)
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json()["failed"] == []
 
 
 def test_add_preset_words_already_exist(
@@ -81,3 +205,254 @@ def test_add_preset_words_already_exist(
     response = client.post(endpoints.POST_ADD_PRESET_WORDS)
 
     assert response.status_code == status.HTTP_409_CONFLICT
+
+
+def test_add_preset_words_only_missing(
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+) -> None:
+    """Tests that only the preset words missing from the database are added."""
+    words = dictionary.read_words()
+    client.post(endpoints.POST_ADD_WORD, data={"word": words[0]})
+
+    response = client.post(endpoints.POST_ADD_PRESET_WORDS)
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert [word["word"] for word in response.json()["added"]] == words[1:]
+
+
+def test_add_preset_words_partial_failure(
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    """Tests that a failing word is reported without aborting the others."""
+    words = dictionary.read_words()
+    mocker.patch.object(controller, "INGESTION_BATCH_SIZE", 2)
+
+    async def get_listening_task(word: str) -> bytes:
+        if word == words[1]:
+            raise fastapi.HTTPException(status_code=500, detail="Faulty response.")
+        return b"test_bytes"
+
+    mocker.patch.object(controller, "_get_listening_task", get_listening_task)
+
+    response = client.post(endpoints.POST_ADD_PRESET_WORDS)
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert [word["word"] for word in response.json()["added"]] == [
+        word for word in words if word != words[1]
+    ]
+    assert response.json()["failed"] == [
+        {"word": words[1], "detail": "Faulty response."},
+    ]
+
+
+def _run_jobs() -> None:
+    """Processes all pending job words with a single worker."""
+    worker = jobs.JobWorker(concurrency=1, retry_backoff=0)
+
+    async def run_until_idle() -> None:
+        while await worker.run_once():
+            pass
+
+    asyncio.run(run_until_idle())
+
+
+def test_create_job(
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+) -> None:
+    """Tests that a job is accepted and its words are processed by a worker."""
+    response = client.post(endpoints.POST_JOB, json={"words": ["cat", "dog"]})
+    job_id = response.json()["id"]
+    _run_jobs()
+    progress = client.get(endpoints.GET_JOB.format(job_id=job_id))
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert response.json()["total"] == len(["cat", "dog"])
+    assert progress.status_code == status.HTTP_200_OK
+    assert progress.json()["status"] == "completed"
+    assert progress.json()["added"] == len(["cat", "dog"])
+    assert progress.json()["words_per_minute"] > 0
+    assert [word["status"] for word in progress.json()["words"]] == [
+        "added",
+        "added",
+    ]
+
+
+def test_create_job_normalizes_words(
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+) -> None:
+    """Tests that job words are normalized like words added one at a time."""
+    client.post(endpoints.POST_ADD_WORD, data={"word": "cat"})
+
+    duplicate = client.post(endpoints.POST_JOB, json={"words": [" Cat "]})
+    response = client.post(endpoints.POST_JOB, json={"words": [" Dog ", "dog"]})
+    job_id = response.json()["id"]
+    _run_jobs()
+    progress = client.get(endpoints.GET_JOB.format(job_id=job_id))
+
+    assert duplicate.status_code == status.HTTP_409_CONFLICT
+    assert response.json()["total"] == 1
+    assert [word["word"] for word in progress.json()["words"]] == ["dog"]
+
+
+def test_create_job_preset_words(
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+) -> None:
+    """Tests that a job without words adds the preset words."""
+    response = client.post(endpoints.POST_JOB)
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert response.json()["total"] == len(dictionary.read_words())
+
+
+def test_create_job_already_exists(
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+) -> None:
+    """Tests that a job of only existing words is rejected."""
+    client.post(endpoints.POST_ADD_WORD, data={"word": "cat"})
+
+    response = client.post(endpoints.POST_JOB, json={"words": ["cat"]})
+
+    assert response.status_code == status.HTTP_409_CONFLICT
+
+
+def test_job_retries_and_fails(
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    """Tests that words are retried and reported once out of attempts."""
+    attempts: dict[str, int] = {}
+
+    async def get_listening_task(word: str) -> bytes:
+        attempts[word] = attempts.get(word, 0) + 1
+        if word == "dog" or attempts[word] == 1:
+            raise fastapi.HTTPException(status_code=500, detail="Faulty response.")
+        return b"test_bytes"
+
+    mocker.patch.object(controller, "_get_listening_task", get_listening_task)
+    response = client.post(endpoints.POST_JOB, json={"words": ["cat", "dog"]})
+    _run_jobs()
+
+    progress = client.get(endpoints.GET_JOB.format(job_id=response.json()["id"]))
+
+    assert progress.json()["status"] == "completed"
+    assert progress.json()["words"] == [
+        {
+            "word": "cat",
+            "status": "added",
+            "attempts": 2,
+            "detail": None,
+            "word_id": progress.json()["words"][0]["word_id"],
+        },
+        {
+            "word": "dog",
+            "status": "failed",
+            "attempts": jobs.JOB_MAX_ATTEMPTS,
+            "detail": "Faulty response.",
+            "word_id": None,
+        },
+    ]
+
+
+def test_get_job_not_found(
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+) -> None:
+    """Tests that an unknown job is not found."""
+    response = client.get(endpoints.GET_JOB.format(job_id=1))
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_job_reclaims_abandoned_words(
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+    session: orm.Session,
+) -> None:
+    """Tests that a word claimed by a crashed worker is claimed again."""
+    response = client.post(endpoints.POST_JOB, json={"words": ["cat"]})
+    session.execute(
+        sqlalchemy.update(models.IngestionJobWord).values(
+            status=models.JobWordStatus.RUNNING,
+            time_claimed=datetime.datetime(2000, 1, 1, tzinfo=datetime.UTC),
+        ),
+    )
+    session.commit()
+    _run_jobs()
+
+    progress = client.get(endpoints.GET_JOB.format(job_id=response.json()["id"]))
+
+    assert progress.json()["added"] == 1
+
+
+def test_job_reclaim_keeps_attempts(
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+    mocker: pytest_mock.MockerFixture,
+    session: orm.Session,
+) -> None:
+    """Tests that attempts of earlier claims count towards the maximum."""
+    calls = 0
+
+    async def get_listening_task(_word: str) -> bytes:
+        nonlocal calls
+        calls += 1
+        raise fastapi.HTTPException(status_code=500, detail="Faulty response.")
+
+    mocker.patch.object(controller, "_get_listening_task", get_listening_task)
+    response = client.post(endpoints.POST_JOB, json={"words": ["cat"]})
+    session.execute(
+        sqlalchemy.update(models.IngestionJobWord).values(
+            status=models.JobWordStatus.RUNNING,
+            attempts=jobs.JOB_MAX_ATTEMPTS - 1,
+            time_claimed=datetime.datetime(2000, 1, 1, tzinfo=datetime.UTC),
+        ),
+    )
+    session.commit()
+    _run_jobs()
+
+    progress = client.get(endpoints.GET_JOB.format(job_id=response.json()["id"]))
+
+    assert calls == 1
+    assert progress.json()["words"][0]["status"] == "failed"
+    assert progress.json()["words"][0]["attempts"] == jobs.JOB_MAX_ATTEMPTS
+
+
+def test_job_renews_claim(
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    """Tests that a word is not claimed again while it is being processed."""
+    calls = 0
+
+    async def get_listening_task(_word: str) -> bytes:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.6)
+        return b"test_bytes"
+
+    mocker.patch.object(controller, "_get_listening_task", get_listening_task)
+    client.post(endpoints.POST_JOB, json={"words": ["cat"]})
+    s3.get_s3_client()
+    first = jobs.JobWorker(concurrency=1, lease_timeout=0.2)
+    second = jobs.JobWorker(concurrency=1, lease_timeout=0.2)
+
+    async def claim_late() -> bool:
+        await asyncio.sleep(0.4)
+        return await second.run_once()
+
+    async def run_both() -> list[bool]:
+        return await asyncio.gather(first.run_once(), claim_late())
+
+    processed = asyncio.run(run_both())
+
+    assert processed == [True, False]
+    assert calls == 1
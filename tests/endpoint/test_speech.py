@@ -1,5 +1,8 @@
 """Tests for the speech endpoints."""
 import array
+import io
+import json
+import math
 import tempfile
 import wave
 from collections.abc import Generator
@@ -8,9 +11,13 @@ from typing import Any
 import ffmpeg
 import pytest
 import pytest_mock
-from fastapi import status, testclient
+from fastapi import status, testclient, websockets
+from sqlalchemy import orm
+from starlette import testclient as starlette_testclient
 
-from linguaweb_api.microservices import openai
+from linguaweb_api.core import config, models
+from linguaweb_api.microservices import openai, transcoder
+from linguaweb_api.routers.speech import controller
 from tests.endpoint import conftest
 
 
@@ -65,3 +72,408 @@ def test_transcribe(
     mock_stt_run.assert_called_once()
     assert response.status_code == status.HTTP_200_OK
     assert response.json() == expected_transcription
+    audio = mock_stt_run.call_args.args[0]
+    assert isinstance(audio, bytes)
+    assert audio.startswith((b"ID3", b"\xff"))
+
+
+def test_transcribe_mp4_with_index_at_end(
+    mocker: pytest_mock.MockerFixture,
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+) -> None:
+    """Tests that MP4 recordings, which need seeking, are converted in full."""
+    mock_stt_run = mocker.patch.object(
+        openai.SpeechToText,
+        "run",
+        return_value="Transcription",
+    )
+    with tempfile.NamedTemporaryFile(suffix=".m4a") as f:
+        ffmpeg.input("sine=duration=30", f="lavfi").output(
+            f.name,
+            acodec="aac",
+        ).overwrite_output().run(quiet=True)
+        response = client.post(
+            endpoints.POST_SPEECH_TRANSCRIBE,
+            files={"audio": ("audio.m4a", f.read())},
+        )
+
+    assert response.status_code == status.HTTP_200_OK
+    audio = mock_stt_run.call_args.args[0]
+    # 30 seconds at 32 kbit/s, rather than the header of an empty MP3.
+    assert len(audio) > 100_000  # noqa: PLR2004
+
+
+def test_transcribe_too_large(
+    mocker: pytest_mock.MockerFixture,
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+) -> None:
+    """Tests that audio larger than the maximum size is rejected."""
+    mock_stt_run = mocker.patch.object(openai.SpeechToText, "run")
+
+    response = client.post(
+        endpoints.POST_SPEECH_TRANSCRIBE,
+        files={"audio": ("audio.wav", b"\0" * (controller.SPEECH_MAX_FILE_SIZE + 1))},
+    )
+
+    mock_stt_run.assert_not_called()
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+
+def test_transcribe_too_large_cors(
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+) -> None:
+    """Tests that rejected oversized requests carry CORS headers."""
+    response = client.post(
+        endpoints.POST_SPEECH_TRANSCRIBE,
+        headers={"Origin": "https://example.com"},
+        files={"audio": ("audio.wav", b"\0" * (controller.MAX_BODY_SIZE + 1))},
+    )
+
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    assert "access-control-allow-origin" in response.headers
+
+
+def test_transcribe_invalid_audio(
+    mocker: pytest_mock.MockerFixture,
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+) -> None:
+    """Tests that audio that ffmpeg cannot convert is rejected."""
+    mock_stt_run = mocker.patch.object(openai.SpeechToText, "run")
+
+    response = client.post(
+        endpoints.POST_SPEECH_TRANSCRIBE,
+        files={"audio": ("audio.wav", b"not audio")},
+    )
+
+    mock_stt_run.assert_not_called()
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_transcribe_passes_mp3_through_without_preprocessing(
+    mocker: pytest_mock.MockerFixture,
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+    mp3_file: str,
+) -> None:
+    """Tests that MP3 audio is not converted without a preprocessing profile."""
+    mocker.patch.object(
+        controller,
+        "AUDIO_PREPROCESSING_PROFILE",
+        config.AudioProfiles.DEFAULT,
+    )
+    mock_stt_run = mocker.patch.object(openai.SpeechToText, "run", return_value="")
+    mock_transcode = mocker.patch.object(transcoder.Transcoder, "transcode")
+
+    with open(mp3_file, "rb") as audio:  # noqa: PTH123
+        response = client.post(
+            endpoints.POST_SPEECH_TRANSCRIBE,
+            files={"audio": audio},
+        )
+
+    assert response.status_code == status.HTTP_200_OK
+    mock_transcode.assert_not_called()
+    with open(mp3_file, "rb") as audio:  # noqa: PTH123
+        assert mock_stt_run.call_args.args[0] == audio.read()
+
+
+def test_transcribe_caches_identical_audio(
+    mocker: pytest_mock.MockerFixture,
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+    wav_file: str,
+) -> None:
+    """Tests that repeated uploads of the same audio are transcribed once."""
+    mock_stt_run = mocker.patch.object(
+        openai.SpeechToText,
+        "run",
+        return_value="Transcription",
+    )
+    mock_transcode = mocker.spy(transcoder.Transcoder, "transcode")
+
+    responses = []
+    for _ in range(2):
+        with open(wav_file, "rb") as audio:  # noqa: PTH123
+            responses.append(
+                client.post(endpoints.POST_SPEECH_TRANSCRIBE, files={"audio": audio}),
+            )
+
+    assert [response.json() for response in responses] == ["Transcription"] * 2
+    mock_stt_run.assert_called_once()
+    mock_transcode.assert_called_once()
+
+
+@pytest.fixture()
+def word(session: orm.Session) -> models.Word:
+    """Inserts a word into the database."""
+    word = models.Word(
+        word="apple",
+        description="A fruit.",
+        synonyms=[],
+        antonyms=[],
+        jeopardy="This fruit keeps the doctor away.",
+        s3_key="mock_s3_key",
+    )
+    session.add(word)
+    session.commit()
+    return word
+
+
+@pytest.mark.parametrize(
+    ("transcription", "expected_correct"),
+    [("Apple.", True), ("Banana.", False)],
+)
+def test_check_speech(  # noqa: PLR0913
+    mocker: pytest_mock.MockerFixture,
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+    wav_file: str,
+    word: models.Word,
+    transcription: str,
+    expected_correct: bool,
+) -> None:
+    """Tests that a spoken guess is transcribed and checked in one request."""
+    mocker.patch.object(openai.SpeechToText, "run", return_value=transcription)
+
+    with open(wav_file, "rb") as audio:  # noqa: PTH123
+        response = client.post(
+            endpoints.POST_SPEECH_CHECK.format(word_id=word.id),
+            files={"audio": audio},
+        )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "transcription": transcription,
+        "is_correct": expected_correct,
+    }
+
+
+def test_check_speech_word_not_found(
+    mocker: pytest_mock.MockerFixture,
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+    wav_file: str,
+) -> None:
+    """Tests that a spoken guess for an unknown word is not transcribed."""
+    mock_stt_run = mocker.patch.object(
+        openai.SpeechToText,
+        "run",
+        return_value="Apple.",
+    )
+    mock_transcode = mocker.spy(transcoder.Transcoder, "transcode")
+
+    with open(wav_file, "rb") as audio:  # noqa: PTH123
+        response = client.post(
+            endpoints.POST_SPEECH_CHECK.format(word_id=0),
+            files={"audio": audio},
+        )
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    mock_transcode.assert_not_called()
+    mock_stt_run.assert_not_called()
+
+
+def test_transcribe_batch(
+    mocker: pytest_mock.MockerFixture,
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+    wav_file: str,
+    mp3_file: str,
+) -> None:
+    """Tests that a batch streams one result per file, including failures."""
+    mock_stt_run = mocker.patch.object(
+        openai.SpeechToText,
+        "run",
+        return_value="Transcription",
+    )
+
+    with open(wav_file, "rb") as wav, open(mp3_file, "rb") as mp3:  # noqa: PTH123
+        response = client.post(
+            endpoints.POST_SPEECH_TRANSCRIBE_BATCH,
+            files=[
+                ("audio", ("first.wav", wav.read())),
+                ("audio", ("second.wav", b"not audio")),
+                ("audio", ("third.mp3", mp3.read())),
+            ],
+        )
+
+    results = sorted(
+        (json.loads(line) for line in response.text.splitlines()),
+        key=lambda result: result["index"],
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == controller.NDJSON_MEDIA_TYPE
+    assert [result["filename"] for result in results] == [
+        "first.wav",
+        "second.wav",
+        "third.mp3",
+    ]
+    assert [result["status_code"] for result in results] == [
+        status.HTTP_200_OK,
+        status.HTTP_400_BAD_REQUEST,
+        status.HTTP_200_OK,
+    ]
+    assert results[0]["transcription"] == "Transcription"
+    assert results[1]["detail"] == "The audio file could not be converted."
+    assert mock_stt_run.call_count == 2  # noqa: PLR2004
+
+
+def test_transcribe_batch_unexpected_error(
+    mocker: pytest_mock.MockerFixture,
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+    wav_file: str,
+) -> None:
+    """Tests that unexpected errors fail only their file of a batch."""
+    mocker.patch.object(
+        openai.SpeechToText,
+        "run",
+        side_effect=[RuntimeError("Unexpected"), "Transcription"],
+    )
+    mocker.patch.object(controller, "SPEECH_BATCH_CONCURRENCY", 1)
+
+    with open(wav_file, "rb") as audio:  # noqa: PTH123
+        data = audio.read()
+    response = client.post(
+        endpoints.POST_SPEECH_TRANSCRIBE_BATCH,
+        files=[
+            ("audio", ("first.wav", data)),
+            ("audio", ("second.wav", data + b"\0\0")),
+        ],
+    )
+
+    results = sorted(
+        (json.loads(line) for line in response.text.splitlines()),
+        key=lambda result: result["index"],
+    )
+    assert [result["status_code"] for result in results] == [
+        status.HTTP_500_INTERNAL_SERVER_ERROR,
+        status.HTTP_200_OK,
+    ]
+    assert results[1]["transcription"] == "Transcription"
+
+
+def test_transcribe_batch_too_many_files(
+    mocker: pytest_mock.MockerFixture,
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+) -> None:
+    """Tests that batches with too many files are rejected."""
+    mocker.patch.object(controller, "SPEECH_BATCH_MAX_FILES", 1)
+
+    response = client.post(
+        endpoints.POST_SPEECH_TRANSCRIBE_BATCH,
+        files=[("audio", ("a.wav", b"a")), ("audio", ("b.wav", b"b"))],
+    )
+
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+
+def _speech_wav(*parts: tuple[float, bool]) -> bytes:
+    """Returns 16 kHz WAV audio of consecutive parts of tone or silence."""
+    samples: list[int] = []
+    for seconds, voiced in parts:
+        count = int(seconds * 16000)
+        if voiced:
+            samples.extend(int(10000 * math.sin(index / 10)) for index in range(count))
+        else:
+            samples.extend([0] * count)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(array.array("h", samples).tobytes())
+    return buffer.getvalue()
+
+
+def _stream(websocket: starlette_testclient.WebSocketTestSession, audio: bytes) -> None:
+    """Streams audio in chunks and ends the stream."""
+    for start in range(0, len(audio), 4096):
+        websocket.send_bytes(audio[start : start + 4096])
+    websocket.send_text(controller.END_OF_STREAM)
+
+
+def test_stream_transcription(
+    mocker: pytest_mock.MockerFixture,
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+) -> None:
+    """Tests that streamed speech is transcribed segment by segment."""
+    mock_stt_run = mocker.patch.object(
+        openai.SpeechToText,
+        "run",
+        side_effect=["hello", "world"],
+    )
+    audio = _speech_wav((1, True), (1, False), (1, True), (0.2, False))
+
+    with client.websocket_connect(endpoints.WS_SPEECH_STREAM) as websocket:
+        _stream(websocket, audio)
+        messages = [websocket.receive_json() for _ in range(3)]
+
+    partials = sorted(messages[:2], key=lambda message: message["segment"])
+    assert partials == [
+        {"event": "partial", "segment": 0, "transcription": "hello"},
+        {"event": "partial", "segment": 1, "transcription": "world"},
+    ]
+    assert messages[2] == {"event": "final", "transcription": "hello world"}
+    assert mock_stt_run.call_count == 2  # noqa: PLR2004
+    segment = mock_stt_run.call_args.args[0]
+    assert segment.startswith(b"RIFF")
+
+
+def test_stream_transcription_too_long(
+    mocker: pytest_mock.MockerFixture,
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+) -> None:
+    """Tests that streams longer than the maximum duration are closed."""
+    mocker.patch.object(openai.SpeechToText, "run", return_value="hello")
+    mocker.patch.object(controller, "MAX_STREAM_PCM_SIZE", 16000)
+
+    with client.websocket_connect(endpoints.WS_SPEECH_STREAM) as websocket:
+        _stream(websocket, _speech_wav((2, True)))
+        message = websocket.receive_json()
+        with pytest.raises(websockets.WebSocketDisconnect) as exception_info:
+            websocket.receive_json()
+
+    assert message["event"] == "error"
+    assert exception_info.value.code == status.WS_1009_MESSAGE_TOO_BIG
+
+
+def test_stream_transcription_invalid_audio(
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+) -> None:
+    """Tests that undecodable streams are reported and closed."""
+    with client.websocket_connect(endpoints.WS_SPEECH_STREAM) as websocket:
+        _stream(websocket, b"not audio" * 100)
+        message = websocket.receive_json()
+        with pytest.raises(websockets.WebSocketDisconnect) as exception_info:
+            websocket.receive_json()
+
+    assert message == {
+        "event": "error",
+        "detail": "The audio stream could not be decoded.",
+    }
+    assert exception_info.value.code == status.WS_1003_UNSUPPORTED_DATA
+
+
+def test_stream_transcription_idle(
+    mocker: pytest_mock.MockerFixture,
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+) -> None:
+    """Tests that streams without messages are closed after the idle timeout."""
+    mocker.patch.object(controller, "SPEECH_STREAM_IDLE_TIMEOUT", 0.1)
+
+    with client.websocket_connect(endpoints.WS_SPEECH_STREAM) as websocket:
+        message = websocket.receive_json()
+        with pytest.raises(websockets.WebSocketDisconnect) as exception_info:
+            websocket.receive_json()
+
+    assert message["event"] == "error"
+    assert exception_info.value.code == status.WS_1008_POLICY_VIOLATION
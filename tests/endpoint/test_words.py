@@ -1,11 +1,16 @@
 """Tests for the words endpoints."""
+import pathlib
+
 import moto
 import pytest
 import pytest_mock
 from fastapi import status, testclient
 from sqlalchemy import orm
 
-from linguaweb_api.core import models
+from linguaweb_api import main
+from linguaweb_api.core import cache, config, http_headers, models
+from linguaweb_api.microservices import s3
+from linguaweb_api.routers.words import controller
 from tests.endpoint import conftest
 
 WORD = "The bird"
@@ -80,6 +85,79 @@ def test_get_word_does_not_exist(
     assert response.status_code == status.HTTP_404_NOT_FOUND
 
 
+def test_get_words(
+    word: models.Word,
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+) -> None:
+    """Tests that many words are returned at once, marking unknown ids."""
+    response = client.get(
+        endpoints.GET_WORDS_BATCH,
+        params={"ids": [-1, word.id, word.id]},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    missing, found = response.json()
+    assert missing == {"id": -1, "found": False, "data": None}
+    assert found["id"] == word.id
+    assert found["found"]
+    assert found["data"]["word"] == WORD
+
+
+def test_get_words_too_many(
+    mocker: pytest_mock.MockerFixture,
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+) -> None:
+    """Tests that batches with too many ids are rejected."""
+    mocker.patch.object(controller, "WORDS_BATCH_MAX_IDS", 1)
+
+    response = client.get(endpoints.GET_WORDS_BATCH, params={"ids": [1, 2]})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_get_random_words(
+    word: models.Word,
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+) -> None:
+    """Tests that random words are returned with their data."""
+    response = client.get(endpoints.GET_RANDOM_WORDS, params={"n": 3})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [item["id"] for item in response.json()] == [word.id]
+    assert response.json()[0]["word"] == WORD
+
+
+def test_get_random_words_exclude(
+    word: models.Word,
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+) -> None:
+    """Tests that excluded words are not returned."""
+    response = client.get(
+        endpoints.GET_RANDOM_WORDS,
+        params={"n": 1, "exclude": [word.id]},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == []
+
+
+def test_get_random_words_too_many(
+    mocker: pytest_mock.MockerFixture,
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+) -> None:
+    """Tests that requests for too many random words are rejected."""
+    mocker.patch.object(controller, "WORDS_BATCH_MAX_IDS", 1)
+
+    response = client.get(endpoints.GET_RANDOM_WORDS, params={"n": 2})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
 @pytest.mark.parametrize(
     "tested_word",
     [
@@ -108,19 +186,156 @@ def test_post_check_word(
 
 @moto.mock_s3
 def test_get_audio(
-    mocker: pytest_mock.MockFixture,
     word: models.Word,
     client: testclient.TestClient,
     endpoints: conftest.Endpoints,
 ) -> None:
     """Tests the get audio endpoint."""
-    mocker.patch(
-        "linguaweb_api.microservices.s3.S3.read",
-        return_value=b"mock_audio_bytes",
-    )
+    s3.get_s3_client().create(word.s3_key, b"mock_audio_bytes")
+    endpoint = endpoints.GET_AUDIO.format(audio_id=word.id)
+
+    response = client.get(endpoint)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.content == b"mock_audio_bytes"
+
+
+@moto.mock_s3
+def test_get_audio_missing_object(
+    word: models.Word,
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+) -> None:
+    """Tests the get audio endpoint when the audio is missing from S3."""
+    endpoint = endpoints.GET_AUDIO.format(audio_id=word.id)
+
+    response = client.get(endpoint)
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@moto.mock_s3
+def test_get_audio_is_cached(
+    word: models.Word,
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+) -> None:
+    """Tests that repeated audio downloads are served from the cache."""
+    s3_client = s3.get_s3_client()
+    s3_client.create(word.s3_key, b"mock_audio_bytes")
     endpoint = endpoints.GET_AUDIO.format(audio_id=word.id)
+    client.get(endpoint)
+    s3_client.client.delete_object(Bucket=s3_client.bucket_name, Key=word.s3_key)
 
     response = client.get(endpoint)
 
     assert response.status_code == status.HTTP_200_OK
     assert response.content == b"mock_audio_bytes"
+
+
+@moto.mock_s3
+def test_get_audio_redirect(
+    mocker: pytest_mock.MockFixture,
+    word: models.Word,
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+) -> None:
+    """Tests that the audio endpoint can redirect to a presigned URL."""
+    mocker.patch(
+        "linguaweb_api.routers.words.controller.AUDIO_DOWNLOAD_MODE",
+        config.AudioDownloadModes.REDIRECT,
+    )
+    endpoint = endpoints.GET_AUDIO.format(audio_id=word.id)
+
+    response = client.get(endpoint, follow_redirects=False)
+
+    assert response.status_code == status.HTTP_307_TEMPORARY_REDIRECT
+    assert word.s3_key in response.headers["location"]
+
+
+@moto.mock_s3
+@pytest.mark.parametrize("is_cached", [False, True])
+def test_get_audio_range(
+    word: models.Word,
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+    is_cached: bool,
+) -> None:
+    """Tests that a byte range of the audio can be requested."""
+    s3.get_s3_client().create(word.s3_key, b"mock_audio_bytes")
+    endpoint = endpoints.GET_AUDIO.format(audio_id=word.id)
+    if is_cached:
+        client.get(endpoint)
+
+    response = client.get(endpoint, headers={"Range": "bytes=5-9"})
+
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.content == b"audio"
+    assert response.headers["content-range"] == "bytes 5-9/16"
+
+
+@moto.mock_s3
+def test_get_audio_range_from_disk(
+    tmp_path: pathlib.Path,
+    word: models.Word,
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+) -> None:
+    """Tests that a byte range of audio cached on disk can be requested."""
+    audio_cache = cache.AudioCache(memory_size=0, directory=tmp_path)
+    main.app.dependency_overrides[cache.get_audio_cache] = lambda: audio_cache
+    s3.get_s3_client().create(word.s3_key, b"mock_audio_bytes")
+    endpoint = endpoints.GET_AUDIO.format(audio_id=word.id)
+    client.get(endpoint)
+
+    full_response = client.get(endpoint)
+    range_response = client.get(endpoint, headers={"Range": "bytes=-5"})
+    main.app.dependency_overrides.clear()
+
+    assert full_response.content == b"mock_audio_bytes"
+    assert full_response.headers[
+        "etag"
+    ] == f'"{cache.content_digest(b"mock_audio_bytes")}"'
+    assert range_response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert range_response.content == b"bytes"
+
+
+@moto.mock_s3
+@pytest.mark.parametrize("is_cached", [False, True])
+def test_get_audio_if_none_match(
+    word: models.Word,
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+    is_cached: bool,
+) -> None:
+    """Tests that unmodified audio is answered with a 304."""
+    s3.get_s3_client().create(word.s3_key, b"mock_audio_bytes")
+    endpoint = endpoints.GET_AUDIO.format(audio_id=word.id)
+    first_response = client.get(endpoint)
+    if not is_cached:
+        cache.get_audio_cache().invalidate(word.s3_key)
+
+    response = client.get(
+        endpoint,
+        headers={"If-None-Match": first_response.headers["etag"]},
+    )
+
+    assert first_response.headers["cache-control"].startswith("public")
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.headers["etag"] == first_response.headers["etag"]
+    assert response.content == b""
+
+
+@moto.mock_s3
+def test_get_audio_if_modified_since(
+    word: models.Word,
+    client: testclient.TestClient,
+    endpoints: conftest.Endpoints,
+) -> None:
+    """Tests that audio not modified since a date is answered with a 304."""
+    endpoint = endpoints.GET_AUDIO.format(audio_id=word.id)
+    last_modified = http_headers.format_http_date(word.time_updated)
+
+    response = client.get(endpoint, headers={"If-Modified-Since": last_modified})
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
@@ -0,0 +1,251 @@
+"""Unit tests for the admin controller."""
+import json
+from unittest import mock
+
+import fastapi
+import pytest
+import pytest_mock
+import sqlalchemy
+from sqlalchemy import orm, pool
+
+from linguaweb_api.core import config, models
+from linguaweb_api.microservices import openai_constants, sql
+from linguaweb_api.routers.admin import controller, schemas
+
+
+@pytest.fixture()
+def mock_gpt_run(mocker: pytest_mock.MockerFixture) -> mock.AsyncMock:
+    """Mocks the GPT run method."""
+    return mocker.patch(
+        "linguaweb_api.microservices.openai.GPT.run",
+        new_callable=mock.AsyncMock,
+    )
+
+
+@pytest.fixture()
+def session() -> orm.Session:
+    """Returns a session of an in-memory database."""
+    engine = sqlalchemy.create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=pool.StaticPool,
+    )
+    sql.Base.metadata.create_all(engine)
+    return orm.sessionmaker(bind=engine)()
+
+
+def _word(word: str) -> models.Word:
+    """Returns a word model that is not yet inserted."""
+    return models.Word(
+        word=word,
+        description="description",
+        synonyms=["synonym"],
+        antonyms=["antonym"],
+        jeopardy="jeopardy",
+        s3_key=f"{word}.mp3",
+    )
+
+
+@pytest.fixture(autouse=True)
+def _mock_openai_client(mocker: pytest_mock.MockerFixture) -> None:
+    """Avoids constructing a real OpenAI client."""
+    mocker.patch("linguaweb_api.microservices.openai.get_client")
+
+
+@pytest.mark.asyncio()
+async def test_get_text_tasks_structured(mock_gpt_run: mock.AsyncMock) -> None:
+    """Tests that all text tasks are fetched in a single JSON call."""
+    mock_gpt_run.return_value = json.dumps(
+        {
+            "description": "A domesticated feline.",
+            "synonyms": ["kitty", " feline "],
+            "antonyms": [],
+            "jeopardy": "It says meow.",
+        },
+    )
+
+    text_tasks = await controller._get_text_tasks("cat")
+
+    mock_gpt_run.assert_awaited_once_with(
+        prompt="cat",
+        system_prompt=openai_constants.Prompts.WORD_TEXT_TASKS,
+        json_mode=True,
+    )
+    assert text_tasks.synonyms == ["kitty", "feline"]
+    assert text_tasks.antonyms == []
+
+
+@pytest.mark.asyncio()
+async def test_get_text_tasks_falls_back_per_field(
+    mock_gpt_run: mock.AsyncMock,
+) -> None:
+    """Tests that invalid JSON falls back to one call per field."""
+    mock_gpt_run.side_effect = [
+        '{"description": "A domesticated feline."}',
+        "A domesticated feline.",
+        "kitty, feline",
+        "dog",
+        "It says meow.",
+    ]
+
+    text_tasks = await controller._get_text_tasks("cat")
+
+    expected_calls = 5
+    assert mock_gpt_run.await_count == expected_calls
+    assert text_tasks == schemas.TextTasks(
+        description="A domesticated feline.",
+        synonyms=["kitty", "feline"],
+        antonyms=["dog"],
+        jeopardy="It says meow.",
+    )
+
+
+@pytest.mark.asyncio()
+async def test_get_text_tasks_structured_null_list(
+    mock_gpt_run: mock.AsyncMock,
+) -> None:
+    """Tests that a null list in the JSON response is an empty list."""
+    mock_gpt_run.return_value = json.dumps(
+        {
+            "description": "A domesticated feline.",
+            "synonyms": None,
+            "antonyms": ["dog"],
+            "jeopardy": "It says meow.",
+        },
+    )
+
+    text_tasks = await controller._get_text_tasks("cat")
+
+    mock_gpt_run.assert_awaited_once()
+    assert text_tasks.synonyms == []
+
+
+@pytest.mark.asyncio()
+async def test_get_text_tasks_non_list_falls_back_per_field(
+    mock_gpt_run: mock.AsyncMock,
+) -> None:
+    """Tests that a list field of another type falls back to one call per field."""
+    mock_gpt_run.side_effect = [
+        json.dumps(
+            {
+                "description": "A domesticated feline.",
+                "synonyms": 3,
+                "antonyms": ["dog"],
+                "jeopardy": "It says meow.",
+            },
+        ),
+        "A domesticated feline.",
+        "kitty, feline",
+        "dog",
+        "It says meow.",
+    ]
+
+    text_tasks = await controller._get_text_tasks("cat")
+
+    expected_calls = 5
+    assert mock_gpt_run.await_count == expected_calls
+    assert text_tasks.synonyms == ["kitty", "feline"]
+
+
+@pytest.mark.asyncio()
+async def test_get_text_tasks_without_json_mode_support(
+    mocker: pytest_mock.MockerFixture,
+    mock_gpt_run: mock.AsyncMock,
+) -> None:
+    """Tests that models without JSON mode get one call per field."""
+    mocker.patch.object(
+        controller,
+        "OPENAI_GPT_MODEL",
+        openai_constants.GPTModels.GPT4,
+    )
+    mock_gpt_run.return_value = "text"
+
+    await controller._get_text_tasks("cat")
+
+    expected_calls = 4
+    assert mock_gpt_run.await_count == expected_calls
+    assert all(
+        not call.kwargs.get("json_mode") for call in mock_gpt_run.await_args_list
+    )
+
+
+@pytest.mark.asyncio()
+async def test_get_text_tasks_per_field_mode(
+    mocker: pytest_mock.MockerFixture,
+    mock_gpt_run: mock.AsyncMock,
+) -> None:
+    """Tests that the per field mode does not attempt a JSON call."""
+    mocker.patch.object(
+        controller,
+        "OPENAI_TEXT_TASK_MODE",
+        config.TextTaskModes.PER_FIELD,
+    )
+    mock_gpt_run.return_value = "text"
+
+    await controller._get_text_tasks("cat")
+
+    expected_calls = 4
+    assert mock_gpt_run.await_count == expected_calls
+    assert all(
+        not call.kwargs.get("json_mode") for call in mock_gpt_run.await_args_list
+    )
+
+
+@pytest.mark.asyncio()
+async def test_get_text_tasks_per_field_empty(mock_gpt_run: mock.AsyncMock) -> None:
+    """Tests that empty per field responses raise a server error."""
+    mock_gpt_run.side_effect = ["not json", " ", "a", "b", "c"]
+
+    with pytest.raises(fastapi.HTTPException) as exception_info:
+        await controller._get_text_tasks("cat")
+
+    assert (
+        exception_info.value.status_code
+        == fastapi.status.HTTP_500_INTERNAL_SERVER_ERROR
+    )
+
+
+def test_find_missing_words(session: orm.Session) -> None:
+    """Tests that only words absent from the database are returned."""
+    session.add(_word("cat"))
+    session.commit()
+
+    missing = controller.find_missing_words(["dog", "cat", "emu"], session)
+
+    assert missing == ["dog", "emu"]
+
+
+def test_insert_batch(session: orm.Session) -> None:
+    """Tests that a batch of words is inserted."""
+    added, failed = controller._insert_batch([_word("cat"), _word("dog")], session)
+
+    assert [word.word for word in added] == ["cat", "dog"]
+    assert failed == []
+    assert session.query(models.Word).count() == len(added)
+
+
+def test_insert_batch_conflict(session: orm.Session) -> None:
+    """Tests that a conflicting word only fails itself, not its batch."""
+    session.add(_word("cat"))
+    session.commit()
+
+    added, failed = controller._insert_batch(
+        [_word("dog"), _word("cat"), _word("emu")],
+        session,
+    )
+
+    assert [word.word for word in added] == ["dog", "emu"]
+    assert failed == [
+        schemas.FailedWord(word="cat", detail="Word already exists in database."),
+    ]
+
+
+def test_insert_word_if_absent(session: orm.Session) -> None:
+    """Tests that a word is inserted only if it does not exist yet."""
+    inserted = controller.insert_word_if_absent(_word("cat"), session)
+    duplicate = controller.insert_word_if_absent(_word("cat"), session)
+
+    assert inserted is not None
+    assert inserted.word == "cat"
+    assert duplicate is None
+    assert session.query(models.Word).count() == 1
@@ -0,0 +1,170 @@
+"""Unit tests for the cache module."""
+import pathlib
+
+import pytest
+import pytest_mock
+
+from linguaweb_api.core import cache
+
+
+def test_memory_cache_evicts_least_recently_used() -> None:
+    """Tests that the least recently used value is evicted when over budget."""
+    memory = cache.MemoryCache(max_size=8)
+    memory.put("a", b"1234")
+    memory.put("b", b"1234")
+    memory.get("a")
+
+    memory.put("c", b"1234")
+
+    assert memory.get("a") == b"1234"
+    assert memory.get("b") is None
+    assert memory.get("c") == b"1234"
+    assert memory.size == 8  # noqa: PLR2004
+
+
+def test_memory_cache_skips_values_over_budget() -> None:
+    """Tests that values larger than the budget are not cached."""
+    memory = cache.MemoryCache(max_size=2)
+
+    memory.put("a", b"123")
+
+    assert memory.get("a") is None
+    assert memory.size == 0
+
+
+def test_expiring_cache_evicts_least_recently_used() -> None:
+    """Tests that the least recently used value is evicted when full."""
+    expiring = cache.ExpiringCache(max_entries=2, ttl=60)
+    expiring.put("a", "1")
+    expiring.put("b", "2")
+    expiring.get("a")
+
+    expiring.put("c", "3")
+
+    assert expiring.get("a") == "1"
+    assert expiring.get("b") is None
+    assert expiring.get("c") == "3"
+    assert len(expiring) == 2  # noqa: PLR2004
+
+
+def test_expiring_cache_expires(mocker: pytest_mock.MockerFixture) -> None:
+    """Tests that values are not returned after their time to live."""
+    monotonic = mocker.patch("time.monotonic", return_value=0)
+    expiring = cache.ExpiringCache(max_entries=2, ttl=60)
+    expiring.put("a", "1")
+
+    fresh = expiring.get("a")
+    monotonic.return_value = 60
+    expired = expiring.get("a")
+
+    assert fresh == "1"
+    assert expired is None
+    assert expiring.hits == 1
+    assert expiring.misses == 1
+    assert len(expiring) == 0
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path: pathlib.Path) -> None:
+    """Tests that the least recently used file is evicted when over budget."""
+    disk = cache.DiskCache(tmp_path, max_size=8)
+    disk.put("a", b"1234")
+    disk.put("b", b"1234")
+    disk.get("a")
+
+    disk.put("c", b"1234")
+
+    assert disk.get("a") is not None
+    assert disk.get("b") is None
+    assert len(list(tmp_path.iterdir())) == 2  # noqa: PLR2004
+
+
+def test_disk_cache_survives_restart(tmp_path: pathlib.Path) -> None:
+    """Tests that the index of the disk cache is rebuilt from the directory."""
+    cache.DiskCache(tmp_path, max_size=8).put("a", b"1234")
+
+    entry = cache.DiskCache(tmp_path, max_size=8).get("a")
+
+    assert entry is not None
+    assert entry.path.read_bytes() == b"1234"
+    assert entry.digest == cache.content_digest(b"1234")
+
+
+def test_disk_cache_restart_does_not_read_files(
+    mocker: pytest_mock.MockerFixture,
+    tmp_path: pathlib.Path,
+) -> None:
+    """Tests that the digests are restored without rehashing the files."""
+    cache.DiskCache(tmp_path, max_size=8).put("a", b"1234")
+    mock_read_bytes = mocker.patch.object(pathlib.Path, "read_bytes")
+
+    entry = cache.DiskCache(tmp_path, max_size=8).get("a")
+
+    mock_read_bytes.assert_not_called()
+    assert entry is not None
+    assert entry.digest == cache.content_digest(b"1234")
+
+
+def test_disk_cache_writer_discards_on_error(tmp_path: pathlib.Path) -> None:
+    """Tests that partially written files are not cached."""
+    disk = cache.DiskCache(tmp_path, max_size=8)
+
+    def write_and_fail() -> None:
+        with disk.writer("a") as writer:
+            writer.write(b"12")
+            raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        write_and_fail()
+
+    assert disk.get("a") is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_audio_cache_tee_fills_both_tiers(tmp_path: pathlib.Path) -> None:
+    """Tests that streamed audio ends up in both tiers."""
+    audio_cache = cache.AudioCache(memory_size=8, directory=tmp_path, disk_size=8)
+
+    chunks = list(audio_cache.tee("key", iter([b"12", b"34"])))
+
+    assert chunks == [b"12", b"34"]
+    assert audio_cache.get_bytes("key") == b"1234"
+    entry = audio_cache.get_file("key")
+    assert entry is not None
+    assert entry.path.read_bytes() == b"1234"
+    assert entry.digest == cache.content_digest(b"1234")
+
+
+def test_audio_cache_tee_incomplete_stream(tmp_path: pathlib.Path) -> None:
+    """Tests that audio is not cached if the stream was not fully consumed."""
+    audio_cache = cache.AudioCache(memory_size=8, directory=tmp_path, disk_size=8)
+
+    stream = audio_cache.tee("key", iter([b"12", b"34"]))
+    next(stream)
+    stream.close()
+
+    assert audio_cache.get_bytes("key") is None
+    assert audio_cache.get_file("key") is None
+
+
+def test_audio_cache_tiers_warm_each_other(tmp_path: pathlib.Path) -> None:
+    """Tests that each tier can be warmed from the other."""
+    audio_cache = cache.AudioCache(memory_size=8, directory=tmp_path, disk_size=8)
+    assert audio_cache.disk is not None
+    audio_cache.disk.put("disk", b"1234")
+
+    audio_cache.warm_memory("disk", tmp_path / next(tmp_path.iterdir()).name)
+    audio_cache.warm_disk("memory", b"5678")
+
+    assert audio_cache.get_bytes("disk") == b"1234"
+    assert audio_cache.get_file("memory") is not None
+
+
+def test_audio_cache_invalidate(tmp_path: pathlib.Path) -> None:
+    """Tests that invalidation removes audio from both tiers."""
+    audio_cache = cache.AudioCache(memory_size=8, directory=tmp_path, disk_size=8)
+    list(audio_cache.tee("key", iter([b"1234"])))
+
+    audio_cache.invalidate("key")
+
+    assert audio_cache.get_bytes("key") is None
+    assert audio_cache.get_file("key") is None
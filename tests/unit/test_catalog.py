@@ -0,0 +1,222 @@
+"""Unit tests for the word catalog."""
+import datetime
+
+import pytest
+import pytest_mock
+import sqlalchemy
+from sqlalchemy import orm, pool
+
+from linguaweb_api.core import catalog, models
+from linguaweb_api.microservices import sql
+
+
+@pytest.fixture()
+def session() -> orm.Session:
+    """Returns a session of an in-memory database."""
+    engine = sqlalchemy.create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=pool.StaticPool,
+    )
+    sql.Base.metadata.create_all(engine)
+    return orm.sessionmaker(bind=engine)()
+
+
+def _add_word(
+    session: orm.Session,
+    word: str,
+    identifier: int | None = None,
+) -> models.Word:
+    """Adds a word to the database.
+
+    Args:
+        session: The database session.
+        word: The word to add.
+        identifier: The id of the word, None to generate one.
+
+    Returns:
+        The word model.
+    """
+    model = models.Word(
+        id=identifier,
+        word=word,
+        description="description",
+        synonyms=["synonym"],
+        antonyms=["antonym"],
+        jeopardy="jeopardy",
+        s3_key=f"{word}.mp3",
+    )
+    session.add(model)
+    session.commit()
+    return model
+
+
+@pytest.mark.asyncio()
+async def test_get_loads_catalog(session: orm.Session) -> None:
+    """Tests that the catalog is loaded on first use."""
+    model = _add_word(session, "word")
+    word_catalog = catalog.WordCatalog()
+
+    record = await word_catalog.get(model.id, session)
+
+    assert word_catalog.is_loaded
+    assert record is not None
+    assert record.word == "word"
+    assert record.synonyms == ["synonym"]
+
+
+@pytest.mark.asyncio()
+async def test_get_does_not_query_when_fresh(
+    mocker: pytest_mock.MockerFixture,
+    session: orm.Session,
+) -> None:
+    """Tests that a fresh catalog answers without querying the database."""
+    model = _add_word(session, "word")
+    word_catalog = catalog.WordCatalog()
+    await word_catalog.get(model.id, session)
+    spy = mocker.spy(session, "query")
+
+    record = await word_catalog.get(model.id, session)
+    ids = await word_catalog.get_ids(session)
+
+    assert record is not None
+    assert ids == [model.id]
+    spy.assert_not_called()
+
+
+@pytest.mark.asyncio()
+async def test_get_refreshes_on_miss(
+    mocker: pytest_mock.MockerFixture,
+    session: orm.Session,
+) -> None:
+    """Tests that unknown ids trigger an incremental refresh."""
+    mocker.patch.object(catalog, "_MISS_REFRESH_INTERVAL", -1)
+    word_catalog = catalog.WordCatalog()
+    first = _add_word(session, "first")
+    await word_catalog.get_ids(session)
+    second = _add_word(session, "second")
+
+    record = await word_catalog.get(second.id, session)
+
+    assert record is not None
+    assert await word_catalog.get_ids(session) == [first.id, second.id]
+
+
+@pytest.mark.asyncio()
+async def test_get_refreshes_when_stale(session: orm.Session) -> None:
+    """Tests that the catalog is refreshed after the refresh interval."""
+    word_catalog = catalog.WordCatalog(refresh_interval=-1)
+    await word_catalog.get_ids(session)
+    model = _add_word(session, "word")
+
+    ids = await word_catalog.get_ids(session)
+
+    assert ids == [model.id]
+
+
+@pytest.mark.asyncio()
+async def test_upsert(session: orm.Session) -> None:
+    """Tests that upserted words are served without a refresh."""
+    word_catalog = catalog.WordCatalog()
+    await word_catalog.get_ids(session)
+    model = _add_word(session, "word")
+
+    word_catalog.upsert(model)
+
+    assert await word_catalog.get_ids(session) == [model.id]
+
+
+@pytest.mark.asyncio()
+async def test_get_many_refreshes_once(
+    mocker: pytest_mock.MockerFixture,
+    session: orm.Session,
+) -> None:
+    """Tests that a batch of unknown ids triggers a single refresh."""
+    mocker.patch.object(catalog, "_MISS_REFRESH_INTERVAL", -1)
+    word_catalog = catalog.WordCatalog()
+    first = _add_word(session, "first")
+    await word_catalog.get_ids(session)
+    second = _add_word(session, "second")
+    spy = mocker.spy(word_catalog, "load")
+
+    records = await word_catalog.get_many([second.id, -1, first.id, -2], session)
+
+    assert list(records) == [second.id, -1, first.id, -2]
+    assert records[second.id] is not None
+    assert records[first.id] is not None
+    assert records[-1] is None
+    assert records[-2] is None
+    spy.assert_called_once()
+
+
+@pytest.mark.parametrize("count", [2, 7])
+@pytest.mark.asyncio()
+async def test_sample(session: orm.Session, count: int) -> None:
+    """Tests that words are sampled without replacement and exclusions."""
+    words = [_add_word(session, f"word{index}") for index in range(10)]
+    excluded = {words[0].id, words[1].id, -1}
+    word_catalog = catalog.WordCatalog()
+
+    records = await word_catalog.sample(count, session, exclude=excluded)
+
+    ids = [record.id for record in records]
+    assert len(ids) == count
+    assert len(set(ids)) == count
+    assert not excluded.intersection(ids)
+
+
+@pytest.mark.asyncio()
+async def test_sample_more_than_available(session: orm.Session) -> None:
+    """Tests that all remaining words are returned if too few remain."""
+    first = _add_word(session, "first")
+    second = _add_word(session, "second")
+    word_catalog = catalog.WordCatalog()
+
+    records = await word_catalog.sample(5, session, exclude=[first.id])
+
+    assert [record.id for record in records] == [second.id]
+    assert await word_catalog.sample(5, session, exclude=[first.id, second.id]) == []
+
+
+@pytest.mark.asyncio()
+async def test_sample_does_not_list_ids(
+    mocker: pytest_mock.MockerFixture,
+    session: orm.Session,
+) -> None:
+    """Tests that small samples are drawn without filtering the id list."""
+    for index in range(100):
+        _add_word(session, f"word{index}")
+    word_catalog = catalog.WordCatalog()
+    await word_catalog.get_ids(session)
+    spy = mocker.spy(catalog.random, "sample")
+
+    records = await word_catalog.sample(3, session)
+
+    assert len({record.id for record in records}) == 3  # noqa: PLR2004
+    spy.assert_not_called()
+
+
+@pytest.mark.parametrize("late_id", [None, 1])
+@pytest.mark.asyncio()
+async def test_get_finds_words_committed_late(
+    mocker: pytest_mock.MockerFixture,
+    session: orm.Session,
+    late_id: int | None,
+) -> None:
+    """Tests that rows updated before the last refresh are found on a miss.
+
+    On PostgreSQL, time_updated is the start time of the inserting
+    transaction, which can precede the last refresh of the catalog.
+    """
+    mocker.patch.object(catalog, "_MISS_REFRESH_INTERVAL", -1)
+    _add_word(session, "first", identifier=10)
+    word_catalog = catalog.WordCatalog()
+    await word_catalog.get_ids(session)
+    late = _add_word(session, "late", identifier=late_id)
+    late.time_updated = datetime.datetime(2000, 1, 1, tzinfo=datetime.UTC)
+    session.commit()
+
+    record = await word_catalog.get(late.id, session)
+
+    assert record is not None
+    assert record.word == "late"
@@ -0,0 +1,47 @@
+"""Unit tests for the deadline module."""
+import asyncio
+
+import pytest
+
+from linguaweb_api.core import deadline
+
+
+def test_no_deadline() -> None:
+    """Test that there is no deadline outside of a scope."""
+    assert deadline.remaining() is None
+
+
+def test_scope_sets_deadline() -> None:
+    """Test that a scope sets the deadline and restores it on exit."""
+    with deadline.scope(10):
+        remaining = deadline.remaining()
+
+    assert remaining is not None
+    assert 9 < remaining <= 10  # noqa: PLR2004
+    assert deadline.remaining() is None
+
+
+def test_scope_cannot_extend_deadline() -> None:
+    """Test that an enclosing, earlier deadline remains in effect."""
+    with deadline.scope(1), deadline.scope(10):
+        remaining = deadline.remaining()
+
+    assert remaining is not None
+    assert remaining <= 1
+
+
+@pytest.mark.asyncio()
+async def test_timeout_is_bounded_by_deadline() -> None:
+    """Test that a timeout expires at the deadline if that is earlier."""
+    with deadline.scope(0.01), pytest.raises(TimeoutError):
+        async with deadline.timeout(10):
+            await asyncio.sleep(1)
+
+
+@pytest.mark.asyncio()
+async def test_deadline_propagates_to_tasks() -> None:
+    """Test that tasks started within a scope inherit its deadline."""
+    with deadline.scope(10):
+        remaining = await asyncio.create_task(asyncio.to_thread(deadline.remaining))
+
+    assert remaining is not None
@@ -0,0 +1,116 @@
+"""Unit tests for the generation cache."""
+import pathlib
+from collections.abc import Generator
+
+import moto
+import pytest
+
+from linguaweb_api.core import generation_cache
+from linguaweb_api.microservices import s3
+
+
+@pytest.fixture()
+def store(tmp_path: pathlib.Path) -> generation_cache.SQLiteStore:
+    """Returns a store in a temporary directory."""
+    return generation_cache.SQLiteStore(tmp_path / "cache.sqlite", max_size=10)
+
+
+def test_generation_key_depends_on_all_inputs() -> None:
+    """Tests that keys differ if any input differs, regardless of order."""
+    key = generation_cache.generation_key(model="tts-1", voice="onyx", input="cat")
+
+    assert key == generation_cache.generation_key(
+        input="cat",
+        voice="onyx",
+        model="tts-1",
+    )
+    assert key != generation_cache.generation_key(
+        model="tts-1",
+        voice="echo",
+        input="cat",
+    )
+
+
+def test_store_persists(tmp_path: pathlib.Path) -> None:
+    """Tests that values survive reopening the store."""
+    path = tmp_path / "cache.sqlite"
+    generation_cache.SQLiteStore(path, max_size=10).put("key", b"value")
+
+    reopened = generation_cache.SQLiteStore(path, max_size=10)
+
+    assert reopened.get("key") == b"value"
+    assert reopened.get("missing") is None
+
+
+def test_store_evicts_least_recently_used(
+    store: generation_cache.SQLiteStore,
+) -> None:
+    """Tests that the least recently read values are evicted first."""
+    store.put("a", b"1234")
+    store.put("b", b"1234")
+    store.get("a")
+
+    store.put("c", b"1234")
+
+    assert store.get("a") == b"1234"
+    assert store.get("b") is None
+    assert store.get("c") == b"1234"
+    assert store.size == len(b"12341234")
+
+
+def test_store_skips_values_over_budget(
+    store: generation_cache.SQLiteStore,
+) -> None:
+    """Tests that values larger than the budget are not stored."""
+    store.put("key", b"12345678901")
+
+    assert len(store) == 0
+
+
+@pytest.mark.asyncio()
+async def test_cache_counts_hits_and_misses(
+    store: generation_cache.SQLiteStore,
+) -> None:
+    """Tests that hits and misses are counted."""
+    cache = generation_cache.GenerationCache(store)
+
+    missed = await cache.get("key")
+    await cache.put("key", b"value")
+    hit = await cache.get("key")
+
+    assert missed is None
+    assert hit == b"value"
+    assert (cache.hits, cache.shared_hits, cache.misses) == (1, 0, 1)
+
+
+@pytest.fixture()
+def s3_client() -> Generator[s3.S3, None, None]:
+    """Returns an S3 client of a mocked backend."""
+    with moto.mock_s3():
+        yield s3.S3()
+
+
+@pytest.mark.asyncio()
+async def test_cache_shared_tier(
+    s3_client: s3.S3,
+    tmp_path: pathlib.Path,
+) -> None:
+    """Tests that generations are shared through S3."""
+    writer = generation_cache.GenerationCache(
+        generation_cache.SQLiteStore(tmp_path / "writer.sqlite", max_size=10),
+        s3_client,
+        "generations/",
+    )
+    reader = generation_cache.GenerationCache(
+        generation_cache.SQLiteStore(tmp_path / "reader.sqlite", max_size=10),
+        s3_client,
+        "generations/",
+    )
+
+    await writer.put("key", b"value")
+    shared = await reader.get("key")
+    local = await reader.get("key")
+
+    assert shared == local == b"value"
+    assert s3_client.read("generations/key") == b"value"
+    assert (reader.hits, reader.shared_hits, reader.misses) == (1, 1, 0)
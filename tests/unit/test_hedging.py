@@ -0,0 +1,112 @@
+"""Unit tests for the hedging module."""
+import asyncio
+
+import pytest
+
+from linguaweb_api.microservices import hedging
+
+
+def _policy(latency: float) -> hedging.HedgingPolicy:
+    """Returns a policy that hedges after the given latency."""
+    policy = hedging.HedgingPolicy(percentile=0.5, min_samples=1)
+    policy._latencies.append(latency)
+    return policy
+
+
+@pytest.mark.asyncio()
+async def test_no_hedging_without_samples() -> None:
+    """Test that requests are not hedged before latencies are observed."""
+    policy = hedging.HedgingPolicy(percentile=0.5, min_samples=2)
+    calls = 0
+
+    async def request() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    await policy.run(request)
+
+    assert calls == 1
+    assert policy.hedges == 0
+    assert policy.delay() is None
+
+
+def test_delay_percentile() -> None:
+    """Test that the delay is the percentile of the observed latencies."""
+    policy = hedging.HedgingPolicy(percentile=0.9, min_samples=1)
+    policy._latencies.extend(range(100))
+
+    assert policy.delay() == 90  # noqa: PLR2004
+
+
+@pytest.mark.asyncio()
+async def test_hedge_wins_slow_request() -> None:
+    """Test that a slow request is hedged and the faster response is used."""
+    policy = _policy(0.01)
+    delays = iter([10, 0])
+
+    async def request() -> str:
+        delay = next(delays)
+        await asyncio.sleep(delay)
+        return f"slept {delay}"
+
+    result = await policy.run(request)
+
+    assert result == "slept 0"
+    assert policy.hedges == 1
+    assert policy.hedge_wins == 1
+
+
+@pytest.mark.asyncio()
+async def test_hedge_answers_failed_request() -> None:
+    """Test that the hedge is awaited if the original request fails."""
+    policy = _policy(0.01)
+    calls = 0
+
+    async def request() -> str:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await asyncio.sleep(0.05)
+            raise ValueError
+        await asyncio.sleep(0.1)
+        return "hedge"
+
+    result = await policy.run(request)
+
+    assert result == "hedge"
+    assert policy.hedge_wins == 1
+
+
+@pytest.mark.asyncio()
+async def test_all_requests_fail() -> None:
+    """Test that the exception of the original request is raised."""
+    policy = _policy(0.01)
+    errors = iter([KeyError, ValueError])
+
+    async def request() -> None:
+        error = next(errors)
+        await asyncio.sleep(0.05)
+        raise error
+
+    with pytest.raises(KeyError):
+        await policy.run(request)
+
+
+@pytest.mark.asyncio()
+async def test_hedge_not_admitted() -> None:
+    """Test that a slow request is not hedged if the hedge is not admitted."""
+    policy = _policy(0.01)
+    calls = 0
+
+    async def request() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return calls
+
+    result = await policy.run(request, admit=lambda: False)
+
+    assert result == 1
+    assert policy.hedges == 0
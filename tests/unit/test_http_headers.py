@@ -0,0 +1,71 @@
+"""Unit tests for the HTTP header helpers."""
+import datetime
+
+import fastapi
+import pytest
+from fastapi import status
+
+from linguaweb_api.core import http_headers
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        ("bytes=0-3", http_headers.ByteRange(0, 3)),
+        ("bytes=4-", http_headers.ByteRange(4, 9)),
+        ("bytes=-3", http_headers.ByteRange(7, 9)),
+        ("bytes=5-100", http_headers.ByteRange(5, 9)),
+        ("bytes=-100", http_headers.ByteRange(0, 9)),
+        (None, None),
+        ("bytes=0-1,3-4", None),
+        ("bytes=5-2", None),
+        ("items=0-3", None),
+    ],
+)
+def test_resolve_range(
+    header: str | None,
+    expected: http_headers.ByteRange | None,
+) -> None:
+    """Tests that Range headers are resolved against the content size."""
+    assert http_headers.resolve_range(header, size=10) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=10-", "bytes=-0"])
+def test_resolve_range_not_satisfiable(header: str) -> None:
+    """Tests that unsatisfiable ranges raise a 416."""
+    with pytest.raises(fastapi.HTTPException) as exception_info:
+        http_headers.resolve_range(header, size=10)
+
+    assert (
+        exception_info.value.status_code
+        == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+    )
+    assert exception_info.value.headers == {"Content-Range": "bytes */10"}
+
+
+@pytest.mark.parametrize(
+    ("if_none_match", "expected"),
+    [
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"def", "abc"', True),
+        ("*", True),
+        ('"def"', False),
+    ],
+)
+def test_etag_matches(if_none_match: str, expected: bool) -> None:
+    """Tests that If-None-Match headers are compared weakly."""
+    assert http_headers.etag_matches(if_none_match, '"abc"') is expected
+
+
+def test_is_modified_since() -> None:
+    """Tests that If-Modified-Since compares at second precision."""
+    last_modified = datetime.datetime(2024, 1, 1, 12, 0, 0, 500, tzinfo=datetime.UTC)
+    header = http_headers.format_http_date(last_modified)
+
+    assert not http_headers.is_modified_since(header, last_modified)
+    assert http_headers.is_modified_since(
+        header,
+        last_modified + datetime.timedelta(seconds=1),
+    )
+    assert http_headers.is_modified_since("not a date", last_modified)
@@ -1,14 +1,19 @@
 """Unit tests for the middleware module."""
 import logging
+from collections import abc
 
 import fastapi
 import pytest
 from fastapi import status, testclient
 
-from linguaweb_api.core import middleware
+from linguaweb_api.core import deadline, middleware
 
 app = fastapi.FastAPI()
 app.add_middleware(middleware_class=middleware.RequestLoggerMiddleware)
+app.add_middleware(
+    middleware_class=middleware.DeadlineMiddleware,
+    exempt=["/deadline/exempt"],
+)
 
 
 @app.get("/test/")
@@ -21,8 +26,32 @@ def example_route() -> dict[str, str]:
     return {"message": "Test route"}
 
 
+@app.get("/deadline/")
+@app.get("/deadline/exempt/")
+async def deadline_route() -> float | None:
+    """Test function that returns the seconds until the request's deadline."""
+    return deadline.remaining()
+
+
 client = testclient.TestClient(app)
 
+limited_app = fastapi.FastAPI()
+limited_app.add_middleware(
+    middleware_class=middleware.BodySizeLimitMiddleware,
+    limits={"/upload": 10, "/upload/large": 500},
+)
+
+
+@limited_app.post("/upload/")
+@limited_app.post("/upload/large/")
+@limited_app.post("/other/")
+async def upload_route(file: fastapi.UploadFile) -> int:
+    """Test function that returns the size of an uploaded file."""
+    return len(await file.read())
+
+
+limited_client = testclient.TestClient(limited_app)
+
 
 def test_log_middleware(caplog: pytest.LogCaptureFixture) -> None:
     """Checking if log messages are correctly generated."""
@@ -32,3 +61,91 @@ def test_log_middleware(caplog: pytest.LogCaptureFixture) -> None:
     assert response.status_code == status.HTTP_200_OK
     assert "Starting request" in caplog.text
     assert "Finished request" in caplog.text
+
+
+def test_deadline_middleware_default() -> None:
+    """Test that requests get a deadline of REQUEST_TIMEOUT seconds."""
+    response = client.get("/deadline/")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert 0 < response.json() <= middleware.REQUEST_TIMEOUT
+
+
+def test_deadline_middleware_header() -> None:
+    """Test that clients can shorten the deadline."""
+    response = client.get(
+        "/deadline/",
+        headers={middleware.REQUEST_TIMEOUT_HEADER: "1.5"},
+    )
+
+    assert 0 < response.json() <= 1.5  # noqa: PLR2004
+
+
+def test_deadline_middleware_exempt() -> None:
+    """Test that exempt routes only get a deadline if the client sets one."""
+    default = client.get("/deadline/exempt/")
+    shortened = client.get(
+        "/deadline/exempt/",
+        headers={middleware.REQUEST_TIMEOUT_HEADER: "1.5"},
+    )
+
+    assert default.json() is None
+    assert 0 < shortened.json() <= 1.5  # noqa: PLR2004
+
+
+def _multipart(size: int) -> tuple[bytes, str]:
+    """Returns a multipart body with a file of the given size.
+
+    Args:
+        size: The size of the file in bytes.
+
+    Returns:
+        The body and its content type.
+    """
+    boundary = "boundary"
+    body = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="a.txt"\r\n\r\n'
+    ).encode()
+    body += b"a" * size + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def test_body_size_limit_content_length() -> None:
+    """Test that bodies with a Content-Length over the limit are rejected."""
+    response = limited_client.post("/upload/", files={"file": b"a" * 100})
+
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+
+def test_body_size_limit_streamed() -> None:
+    """Test that chunked bodies are rejected once they cross the limit."""
+    body, content_type = _multipart(1000)
+
+    def chunks() -> abc.Iterator[bytes]:
+        for start in range(0, len(body), 10):
+            yield body[start : start + 10]
+
+    response = limited_client.post(
+        "/upload/large/",
+        content=chunks(),
+        headers={"Content-Type": content_type},
+    )
+
+    assert "content-length" not in response.request.headers
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+
+def test_body_size_limit_longest_prefix() -> None:
+    """Test that the limit of the longest matching prefix applies."""
+    response = limited_client.post("/upload/large/", files={"file": b"a" * 20})
+
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_body_size_limit_other_routes() -> None:
+    """Test that routes without a limit accept large bodies."""
+    response = limited_client.post("/other/", files={"file": b"a" * 1000})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == 1000  # noqa: PLR2004
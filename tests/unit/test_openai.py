@@ -1,11 +1,18 @@
 """Unit tests for the OpenAI microservice."""
 # pylint: disable=redefined-outer-name
+import asyncio
+import json
+import pathlib
+from collections import abc
 from unittest import mock
 
+import fastapi
+import httpx
+import openai as openai_sdk
 import pytest
 import pytest_mock
 
-from linguaweb_api.core import config
+from linguaweb_api.core import config, deadline, generation_cache
 from linguaweb_api.microservices import openai
 
 settings = config.get_settings()
@@ -46,6 +53,15 @@ class MockedOpenAiResponse:
             choices: The choices of the response.
         """
         self.choices = choices
+        self.usage = None
+
+
+@pytest.fixture(autouse=True)
+def _clear_client_cache() -> None:
+    """Clears the shared OpenAI client and rate limiters before each test."""
+    openai.get_client.cache_clear()
+    openai.get_rate_limiter.cache_clear()
+    openai.get_hedging_policy.cache_clear()
 
 
 @pytest.fixture()
@@ -59,8 +75,10 @@ def mock_openai_client(
             MockedChoice(message=MockedMessage(content="Mocked response")),
         ],
     )
-    mock_client.chat.completions.create.return_value = mocked_response
-    mocker.patch("openai.OpenAI", return_value=mock_client)
+    mock_client.chat.completions.create = mock.AsyncMock(
+        return_value=mocked_response,
+    )
+    mocker.patch("openai.AsyncOpenAI", return_value=mock_client)
     return mock_client
 
 
@@ -94,7 +112,7 @@ async def test_gpt_run_method(
         system_prompt=system_prompt,
     )
 
-    gpt_instance.client.chat.completions.create.assert_called_once_with(  # type: ignore[attr-defined]
+    gpt_instance.client.chat.completions.create.assert_awaited_once_with(  # type: ignore[attr-defined]
         model=OPENAI_GPT_MODEL,
         messages=[
             {"role": "system", "content": system_prompt},
@@ -104,3 +122,368 @@ async def test_gpt_run_method(
     assert (
         actual_response == expected_response
     ), "The run method should return the expected mocked response"
+
+
+def test_get_client_is_shared(mock_openai_client: mock.MagicMock) -> None:
+    """Test that all model classes share a single OpenAI client."""
+    gpt = openai.GPT()
+    tts = openai.TextToSpeech()
+
+    assert gpt.client is tts.client is mock_openai_client
+
+
+@pytest.mark.asyncio()
+async def test_gpt_calls_run_concurrently(
+    mock_openai_client: mock.MagicMock,
+) -> None:
+    """Test that concurrent GPT calls overlap instead of running in sequence."""
+    n_calls = 4
+    in_flight = 0
+    max_in_flight = 0
+
+    async def slow_create(**_kwargs: object) -> MockedOpenAiResponse:
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return MockedOpenAiResponse(
+            choices=[MockedChoice(message=MockedMessage(content="Mocked"))],
+        )
+
+    mock_openai_client.chat.completions.create = slow_create
+    gpt = openai.GPT()
+
+    await asyncio.gather(
+        *[gpt.run(prompt="word", system_prompt="prompt") for _ in range(n_calls)],
+    )
+
+    assert max_in_flight == n_calls
+
+
+@pytest.mark.asyncio()
+async def test_text_to_speech_run(mock_openai_client: mock.MagicMock) -> None:
+    """Test that the Text-To-Speech model returns the audio bytes."""
+    mock_openai_client.audio.speech.create = mock.AsyncMock(
+        return_value=mock.MagicMock(content=b"audio"),
+    )
+
+    actual_response = await openai.TextToSpeech().run("word")
+
+    assert actual_response == b"audio"
+
+
+@pytest.mark.asyncio()
+async def test_gpt_run_json_mode(gpt_instance: openai.GPT) -> None:
+    """Test that JSON mode requests a JSON object response format."""
+    await gpt_instance.run(prompt="word", system_prompt="prompt", json_mode=True)
+
+    call = gpt_instance.client.chat.completions.create.await_args  # type: ignore[attr-defined]
+    assert call.kwargs["response_format"] == {"type": "json_object"}
+
+
+@pytest.mark.asyncio()
+async def test_gpt_run_uses_generation_cache(
+    mock_openai_client: mock.MagicMock,
+    mocker: pytest_mock.MockerFixture,
+    tmp_path: pathlib.Path,
+) -> None:
+    """Test that identical GPT requests are only sent to OpenAI once."""
+    cache = generation_cache.GenerationCache(
+        generation_cache.SQLiteStore(tmp_path / "cache.sqlite", max_size=1024),
+    )
+    mocker.patch.object(generation_cache, "get_generation_cache", return_value=cache)
+
+    first = await openai.GPT().run(prompt="word", system_prompt="prompt")
+    second = await openai.GPT().run(prompt="word", system_prompt="prompt")
+    await openai.GPT().run(prompt="word", system_prompt="other prompt")
+
+    expected_calls = 2
+    assert first == second == "Mocked response"
+    assert mock_openai_client.chat.completions.create.await_count == expected_calls
+    assert cache.hits == 1
+
+
+@pytest.mark.asyncio()
+async def test_text_to_speech_uses_generation_cache(
+    mock_openai_client: mock.MagicMock,
+    mocker: pytest_mock.MockerFixture,
+    tmp_path: pathlib.Path,
+) -> None:
+    """Test that identical Text-To-Speech requests are only sent once."""
+    cache = generation_cache.GenerationCache(
+        generation_cache.SQLiteStore(tmp_path / "cache.sqlite", max_size=1024),
+    )
+    mocker.patch.object(generation_cache, "get_generation_cache", return_value=cache)
+    mock_openai_client.audio.speech.create = mock.AsyncMock(
+        return_value=mock.MagicMock(content=b"audio"),
+    )
+
+    await openai.TextToSpeech().run("word")
+    cached = await openai.TextToSpeech().run("word")
+
+    assert cached == b"audio"
+    mock_openai_client.audio.speech.create.assert_awaited_once()
+
+
+def _fake_server(
+    responses: list[tuple[int, dict[str, str], dict[str, object] | str]],
+    delays: list[float] | None = None,
+) -> openai_sdk.AsyncOpenAI:
+    """Returns an OpenAI client of a local fake server.
+
+    Args:
+        responses: The status code, headers and JSON body of each response.
+        delays: The seconds before each response is sent, defaults to none.
+
+    Returns:
+        The OpenAI client.
+    """
+    remaining = iter(responses)
+    remaining_delays = iter(delays or [])
+
+    async def handler(_request: httpx.Request) -> httpx.Response:
+        status_code, headers, body = next(remaining)
+        await asyncio.sleep(next(remaining_delays, 0))
+        if isinstance(body, str):
+            return httpx.Response(status_code, headers=headers, text=body)
+        return httpx.Response(status_code, headers=headers, json=body)
+
+    return openai_sdk.AsyncOpenAI(
+        api_key="fake_key",
+        base_url="http://openai.test/v1",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        max_retries=0,
+    )
+
+
+def _completion(content: str) -> dict[str, object]:
+    """Returns the JSON body of a chat completion."""
+    return {
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 0,
+        "model": OPENAI_GPT_MODEL.value,
+        "choices": [
+            {
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+            },
+        ],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+    }
+
+
+def _rate_limit_error(code: str = "rate_limit_exceeded") -> dict[str, object]:
+    """Returns the JSON body of a rate limit error."""
+    return {"error": {"message": "Rate limited.", "type": "requests", "code": code}}
+
+
+@pytest.fixture()
+def patch_client(
+    mocker: pytest_mock.MockerFixture,
+) -> abc.Callable[[openai_sdk.AsyncOpenAI], None]:
+    """Returns a function that replaces the shared OpenAI client."""
+
+    def patch(client: openai_sdk.AsyncOpenAI) -> None:
+        mocker.patch.object(openai, "get_client", return_value=client)
+
+    return patch
+
+
+@pytest.mark.asyncio()
+async def test_gpt_retries_after_rate_limit(
+    patch_client: abc.Callable[[openai_sdk.AsyncOpenAI], None],
+) -> None:
+    """Test that a 429 is retried after the retry-after of the response."""
+    patch_client(
+        _fake_server(
+            [
+                (429, {"retry-after-ms": "10"}, _rate_limit_error()),
+                (200, {}, _completion("Mocked response")),
+            ],
+        ),
+    )
+    gpt = openai.GPT()
+
+    response = await gpt.run(prompt="word", system_prompt="prompt")
+
+    assert response == "Mocked response"
+    assert gpt.rate_limiter.concurrency.limit < openai.OPENAI_MAX_CONCURRENCY
+
+
+@pytest.mark.asyncio()
+async def test_gpt_gives_up_after_retries(
+    mocker: pytest_mock.MockerFixture,
+    patch_client: abc.Callable[[openai_sdk.AsyncOpenAI], None],
+) -> None:
+    """Test that persistent 429s become a 503 once out of retries."""
+    mocker.patch.object(openai, "OPENAI_RATE_LIMIT_RETRIES", 1)
+    patch_client(
+        _fake_server(
+            [(429, {"retry-after": "0"}, _rate_limit_error())] * 2,
+        ),
+    )
+
+    with pytest.raises(fastapi.HTTPException) as exception_info:
+        await openai.GPT().run(prompt="word", system_prompt="prompt")
+
+    assert (
+        exception_info.value.status_code == fastapi.status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+
+@pytest.mark.asyncio()
+async def test_gpt_does_not_retry_exhausted_quota(
+    patch_client: abc.Callable[[openai_sdk.AsyncOpenAI], None],
+) -> None:
+    """Test that an exhausted quota is not retried."""
+    patch_client(
+        _fake_server([(429, {}, _rate_limit_error("insufficient_quota"))]),
+    )
+
+    with pytest.raises(openai_sdk.RateLimitError):
+        await openai.GPT().run(prompt="word", system_prompt="prompt")
+
+
+@pytest.mark.asyncio()
+async def test_gpt_settles_token_usage(
+    patch_client: abc.Callable[[openai_sdk.AsyncOpenAI], None],
+) -> None:
+    """Test that the token bucket is charged the actual token usage."""
+    patch_client(_fake_server([(200, {}, _completion(json.dumps({})))]))
+    gpt = openai.GPT()
+    assert gpt.rate_limiter.tokens is not None
+    gpt.rate_limiter.tokens.rate = 0
+    capacity = gpt.rate_limiter.tokens.capacity
+
+    await gpt.run(prompt="word", system_prompt="prompt")
+
+    expected_usage = 15
+    assert capacity - gpt.rate_limiter.tokens._tokens == expected_usage
+
+
+@pytest.mark.asyncio()
+async def test_gpt_deadline_exceeded(
+    patch_client: abc.Callable[[openai_sdk.AsyncOpenAI], None],
+) -> None:
+    """Test that a request still running at the deadline returns a 504."""
+    patch_client(_fake_server([(200, {}, _completion("Late"))], delays=[10]))
+
+    with deadline.scope(0.05), pytest.raises(fastapi.HTTPException) as exception_info:
+        await openai.GPT().run(prompt="word", system_prompt="prompt")
+
+    assert exception_info.value.status_code == fastapi.status.HTTP_504_GATEWAY_TIMEOUT
+
+
+@pytest.mark.asyncio()
+async def test_gpt_per_call_timeout(
+    mocker: pytest_mock.MockerFixture,
+    patch_client: abc.Callable[[openai_sdk.AsyncOpenAI], None],
+) -> None:
+    """Test that a single request is bounded by the timeout of the model."""
+    mocker.patch.object(openai.GPT, "timeout", 0.05)
+    patch_client(_fake_server([(200, {}, _completion("Late"))], delays=[10]))
+
+    with pytest.raises(fastapi.HTTPException) as exception_info:
+        await openai.GPT().run(prompt="word", system_prompt="prompt")
+
+    assert exception_info.value.status_code == fastapi.status.HTTP_504_GATEWAY_TIMEOUT
+
+
+@pytest.mark.asyncio()
+async def test_gpt_hedges_slow_request(
+    mocker: pytest_mock.MockerFixture,
+    patch_client: abc.Callable[[openai_sdk.AsyncOpenAI], None],
+) -> None:
+    """Test that a slow request is hedged when hedging is enabled."""
+    mocker.patch.object(openai, "OPENAI_HEDGE_PERCENTILE", 0.5)
+    mocker.patch.object(openai, "OPENAI_HEDGE_MIN_SAMPLES", 1)
+    patch_client(
+        _fake_server(
+            [(200, {}, _completion("Slow")), (200, {}, _completion("Fast"))],
+            delays=[10, 0],
+        ),
+    )
+    gpt = openai.GPT()
+    assert gpt.hedging_policy is not None
+    gpt.hedging_policy._latencies.append(0.01)
+    try_acquire = mocker.spy(gpt.rate_limiter, "try_acquire")
+
+    response = await gpt.run(prompt="word", system_prompt="prompt")
+
+    assert response == "Fast"
+    assert gpt.hedging_policy.hedge_wins == 1
+    assert try_acquire.spy_return is True
+
+
+@pytest.mark.asyncio()
+async def test_gpt_does_not_hedge_without_rate_limit_budget(
+    mocker: pytest_mock.MockerFixture,
+    patch_client: abc.Callable[[openai_sdk.AsyncOpenAI], None],
+) -> None:
+    """Test that a slow request is not hedged if the rate limit is reached."""
+    mocker.patch.object(openai, "OPENAI_HEDGE_PERCENTILE", 0.5)
+    mocker.patch.object(openai, "OPENAI_HEDGE_MIN_SAMPLES", 1)
+    patch_client(_fake_server([(200, {}, _completion("Slow"))], delays=[0.05]))
+    gpt = openai.GPT()
+    assert gpt.hedging_policy is not None
+    gpt.hedging_policy._latencies.append(0.01)
+    mocker.patch.object(gpt.rate_limiter, "try_acquire", return_value=False)
+
+    response = await gpt.run(prompt="word", system_prompt="prompt")
+
+    assert response == "Slow"
+    assert gpt.hedging_policy.hedges == 0
+
+
+@pytest.mark.asyncio()
+async def test_gpt_does_not_hedge_rate_limited_request(
+    mocker: pytest_mock.MockerFixture,
+    patch_client: abc.Callable[[openai_sdk.AsyncOpenAI], None],
+) -> None:
+    """Test that time spent waiting for the rate limiter is not hedged."""
+    mocker.patch.object(openai, "OPENAI_HEDGE_PERCENTILE", 0.5)
+    mocker.patch.object(openai, "OPENAI_HEDGE_MIN_SAMPLES", 1)
+    patch_client(_fake_server([(200, {}, _completion("Response"))]))
+    gpt = openai.GPT()
+    assert gpt.hedging_policy is not None
+    gpt.hedging_policy._latencies.append(0.01)
+
+    async def wait() -> None:
+        await asyncio.sleep(0.1)
+
+    mocker.patch.object(gpt.rate_limiter, "_wait", wait)
+
+    response = await gpt.run(prompt="word", system_prompt="prompt")
+
+    assert response == "Response"
+    assert gpt.hedging_policy.hedges == 0
+    assert max(gpt.hedging_policy._latencies) < 0.1  # noqa: PLR2004
+
+
+def test_text_to_speech_is_not_hedged(mocker: pytest_mock.MockerFixture) -> None:
+    """Test that models that did not opt in to hedging are not hedged."""
+    mocker.patch.object(openai, "OPENAI_HEDGE_PERCENTILE", 0.5)
+
+    assert openai.TextToSpeech().hedging_policy is None
+
+
+@pytest.mark.asyncio()
+async def test_speech_to_text_retries_from_memory(
+    patch_client: abc.Callable[[openai_sdk.AsyncOpenAI], None],
+) -> None:
+    """Test that audio in memory is sent again when a request is retried."""
+    patch_client(
+        _fake_server(
+            [
+                (429, {"retry-after-ms": "0"}, _rate_limit_error()),
+                (200, {}, "Transcription"),
+            ],
+        ),
+    )
+
+    response = await openai.SpeechToText().run(b"audio", filename="audio.mp3")
+
+    assert response == "Transcription"
@@ -0,0 +1,135 @@
+"""Unit tests for the rate limiter."""
+import asyncio
+
+import fastapi
+import pytest
+import pytest_mock
+
+from linguaweb_api.microservices import rate_limit
+
+
+@pytest.mark.asyncio()
+async def test_token_bucket_allows_burst(mocker: pytest_mock.MockerFixture) -> None:
+    """Tests that requests within the capacity do not wait."""
+    sleep = mocker.patch("asyncio.sleep")
+    bucket = rate_limit.TokenBucket(rate=1, capacity=3)
+
+    await asyncio.gather(*[bucket.acquire() for _ in range(3)])
+
+    sleep.assert_not_called()
+
+
+@pytest.mark.asyncio()
+async def test_token_bucket_waits_for_reservation(
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    """Tests that requests beyond the capacity wait in order of arrival."""
+    mocker.patch("time.monotonic", return_value=0)
+    sleep = mocker.patch("asyncio.sleep")
+    bucket = rate_limit.TokenBucket(rate=2, capacity=1)
+
+    for _ in range(3):
+        await bucket.acquire()
+
+    assert [call.args[0] for call in sleep.await_args_list] == [0.5, 1.0]
+
+
+def test_token_bucket_refund(mocker: pytest_mock.MockerFixture) -> None:
+    """Tests that refunds are capped by the capacity and may be negative."""
+    mocker.patch("time.monotonic", return_value=0)
+    bucket = rate_limit.TokenBucket(rate=1, capacity=10)
+
+    bucket.refund(5)
+    capped = bucket._tokens
+    bucket.refund(-4)
+
+    assert capped == bucket.capacity
+    assert bucket._tokens == bucket.capacity - 4
+
+
+def test_rate_limiter_try_acquire(mocker: pytest_mock.MockerFixture) -> None:
+    """Tests that optional requests only take requests and tokens available now."""
+    mocker.patch("time.monotonic", return_value=0)
+    limiter = rate_limit.RateLimiter(requests_per_minute=2, tokens_per_minute=10)
+
+    admitted = [
+        limiter.try_acquire(tokens=20),
+        limiter.try_acquire(tokens=5),
+        limiter.try_acquire(tokens=5),
+        limiter.try_acquire(tokens=0),
+    ]
+
+    assert admitted == [False, True, True, False]
+    assert limiter.tokens is not None
+    assert limiter.tokens._tokens == 0
+
+
+@pytest.mark.asyncio()
+async def test_adaptive_concurrency_limits_in_flight() -> None:
+    """Tests that callers beyond the limit wait for a released slot."""
+    concurrency = rate_limit.AdaptiveConcurrency(maximum=2)
+    await concurrency.acquire()
+    await concurrency.acquire()
+
+    waiter = asyncio.create_task(concurrency.acquire())
+    await asyncio.sleep(0)
+    waiting = not waiter.done()
+    concurrency.release()
+    await waiter
+
+    assert waiting
+    assert concurrency.in_flight == concurrency.maximum
+
+
+def test_adaptive_concurrency_aimd() -> None:
+    """Tests the additive increase and multiplicative decrease of the limit."""
+    concurrency = rate_limit.AdaptiveConcurrency(maximum=8, minimum=2)
+
+    concurrency.on_overload()
+    halved = concurrency.limit
+    concurrency.on_success()
+    increased = concurrency.limit
+    for _ in range(10):
+        concurrency.on_overload()
+
+    assert halved == concurrency.maximum / 2
+    assert increased == halved + 1 / halved
+    assert concurrency.limit == concurrency.minimum
+
+
+@pytest.mark.asyncio()
+async def test_rate_limiter_retries_overloaded(
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    """Tests that rejected requests are retried after the requested delay."""
+    sleep = mocker.patch("asyncio.sleep")
+    limiter = rate_limit.RateLimiter(requests_per_minute=60, max_concurrency=4)
+    attempts = 0
+
+    async def request() -> str:
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise rate_limit.Overloaded(retry_after=3)
+        return "done"
+
+    result = await limiter.run(request)
+
+    assert result == "done"
+    assert sleep.await_args_list[0].args[0] == pytest.approx(3, abs=0.1)
+    assert limiter.concurrency.limit == 2 + 1 / 2
+    assert limiter.concurrency.in_flight == 0
+
+
+@pytest.mark.asyncio()
+async def test_rate_limiter_gives_up(mocker: pytest_mock.MockerFixture) -> None:
+    """Tests that requests rejected on every retry raise a 503."""
+    mocker.patch("asyncio.sleep")
+    limiter = rate_limit.RateLimiter(requests_per_minute=60, max_retries=2)
+    request = mocker.AsyncMock(side_effect=rate_limit.Overloaded(retry_after=1))
+
+    with pytest.raises(fastapi.HTTPException) as exception_info:
+        await limiter.run(request)
+
+    assert request.await_count == limiter.max_retries + 1
+    assert exception_info.value.headers == {"Retry-After": "1"}
@@ -1,6 +1,7 @@
 """Unit tests for the S3 client."""
 import moto
 import pytest
+import pytest_mock
 from botocore import errorfactory
 
 from linguaweb_api.microservices import s3
@@ -19,6 +20,69 @@ def test_s3_create() -> None:
     assert stored_data == test_data
 
 
+@moto.mock_s3
+def test_s3_stream() -> None:
+    """Test that an object is streamed in chunks."""
+    test_key = "test_key"
+    test_data = b"0123456789"
+    client = s3.S3()
+    client.create(test_key, test_data)
+
+    streamed = client.stream(test_key, chunk_size=4)
+
+    assert list(streamed.chunks) == [b"0123", b"4567", b"89"]
+    assert streamed.content_length == len(test_data)
+    assert streamed.content_range is None
+
+
+@moto.mock_s3
+def test_s3_stream_range() -> None:
+    """Test that part of an object can be streamed."""
+    test_key = "test_key"
+    client = s3.S3()
+    client.create(test_key, b"0123456789")
+
+    streamed = client.stream(test_key, byte_range="bytes=2-5")
+
+    assert b"".join(streamed.chunks) == b"2345"
+    assert streamed.content_range == "bytes 2-5/10"
+
+
+@moto.mock_s3
+def test_s3_stream_nonexistent_key() -> None:
+    """Test that streaming a nonexistent key raises before iterating."""
+    client = s3.S3()
+
+    with pytest.raises(errorfactory.ClientError):
+        client.stream("nonexistent_key")
+
+
+@moto.mock_s3
+def test_s3_presigned_url() -> None:
+    """Test that presigned URLs point to the object and are cached."""
+    client = s3.S3()
+
+    url = client.presigned_url("test_key")
+
+    assert "test_key" in url
+    assert "Signature" in url or "X-Amz-Signature" in url
+    assert client.presigned_url("test_key") == url
+
+
+@moto.mock_s3
+def test_s3_presigned_url_renewed(mocker: pytest_mock.MockFixture) -> None:
+    """Test that presigned URLs are renewed shortly before they expire."""
+    client = s3.S3()
+    mock_time = mocker.patch("time.monotonic", return_value=0)
+    client.presigned_url("test_key")
+    spy = mocker.spy(client.client, "generate_presigned_url")
+
+    mock_time.return_value = s3.S3_PRESIGNED_URL_EXPIRY - s3.S3_PRESIGNED_URL_MARGIN
+    client.presigned_url("test_key")
+
+    spy.assert_called_once()
+
+
 @moto.mock_s3
 def test_s3_read_nonexistent_key() -> None:
     """Test that reading a nonexistent key raises an exception."""
@@ -36,3 +100,25 @@ def test__is_existing_bucket() -> None:
 
     assert client._is_existing_bucket(s3.S3_BUCKET_NAME)
     assert not client._is_existing_bucket("nonexistent_bucket")
+
+
+@moto.mock_s3
+def test_s3_creates_missing_bucket() -> None:
+    """Test that a missing bucket is created on initialization."""
+    client = s3.S3(bucket_name="new_bucket")
+
+    assert client._is_existing_bucket("new_bucket")
+
+
+@moto.mock_s3
+def test_get_s3_client_checks_bucket_once(mocker: pytest_mock.MockFixture) -> None:
+    """Test that the shared client only looks up the bucket once."""
+    s3.get_s3_client.cache_clear()
+    spy = mocker.spy(s3.S3, "_is_existing_bucket")
+
+    first = s3.get_s3_client()
+    second = s3.get_s3_client()
+
+    assert first is second
+    spy.assert_called_once()
+    s3.get_s3_client.cache_clear()
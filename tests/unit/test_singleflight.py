@@ -0,0 +1,71 @@
+"""Unit tests for the coalescing of concurrent operations."""
+import asyncio
+
+import pytest
+
+from linguaweb_api.core import singleflight
+
+
+@pytest.mark.asyncio()
+async def test_do_coalesces_concurrent_calls() -> None:
+    """Tests that concurrent calls for a key share one operation."""
+    flights: singleflight.SingleFlight[int] = singleflight.SingleFlight()
+    calls = 0
+
+    async def operation() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(*[flights.do("key", operation) for _ in range(3)])
+
+    assert results == [1, 1, 1]
+    assert "key" not in flights
+
+
+@pytest.mark.asyncio()
+async def test_do_runs_again_after_landing() -> None:
+    """Tests that sequential calls each run the operation."""
+    flights: singleflight.SingleFlight[str] = singleflight.SingleFlight()
+
+    first = await flights.do("key", lambda: asyncio.sleep(0, "first"))
+    second = await flights.do("key", lambda: asyncio.sleep(0, "second"))
+
+    assert (first, second) == ("first", "second")
+
+
+@pytest.mark.asyncio()
+async def test_do_shares_exceptions() -> None:
+    """Tests that all callers receive the exception of the operation."""
+    flights: singleflight.SingleFlight[None] = singleflight.SingleFlight()
+
+    async def operation() -> None:
+        await asyncio.sleep(0.01)
+        raise ValueError
+
+    results = await asyncio.gather(
+        flights.do("key", operation),
+        flights.do("key", operation),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+@pytest.mark.asyncio()
+async def test_do_survives_cancelled_caller() -> None:
+    """Tests that cancelling the first caller does not cancel the operation."""
+    flights: singleflight.SingleFlight[str] = singleflight.SingleFlight()
+
+    async def operation() -> str:
+        await asyncio.sleep(0.01)
+        return "done"
+
+    first = asyncio.create_task(flights.do("key", operation))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(flights.do("key", operation))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == "done"
@@ -0,0 +1,62 @@
+"""Unit tests for the speech controller."""
+import asyncio
+import io
+from collections import abc
+from unittest import mock
+
+import fastapi
+import pytest
+import pytest_mock
+
+from linguaweb_api.core import cache
+from linguaweb_api.microservices import transcoder
+from linguaweb_api.routers.speech import controller
+
+
+@pytest.fixture(autouse=True)
+def _mock_openai_client(mocker: pytest_mock.MockerFixture) -> None:
+    """Avoids constructing a real OpenAI client."""
+    mocker.patch("linguaweb_api.microservices.openai.get_client")
+
+
+@pytest.fixture(autouse=True)
+def _clear_transcription_cache() -> None:
+    """Clears the shared transcription cache, as tests reuse the same audio."""
+    cache.get_transcription_cache.cache_clear()
+
+
+@pytest.mark.asyncio()
+async def test_transcribe_does_not_share_uploads(
+    mocker: pytest_mock.MockerFixture,
+) -> None:
+    """Tests that joined transcriptions do not read the first request's upload."""
+    converting = asyncio.Event()
+    first_closed = asyncio.Event()
+
+    async def fake_transcode(
+        _self: transcoder.Transcoder,
+        chunks: abc.AsyncIterable[bytes],
+        *_args: object,
+    ) -> bytes:
+        converting.set()
+        await first_closed.wait()
+        return b"".join([chunk async for chunk in chunks])
+
+    mocker.patch.object(transcoder.Transcoder, "transcode", fake_transcode)
+    mock_stt_run = mocker.patch(
+        "linguaweb_api.microservices.openai.SpeechToText.run",
+        new_callable=mock.AsyncMock,
+        return_value="transcription",
+    )
+    first = fastapi.UploadFile(io.BytesIO(b"audio"), filename="first.wav")
+    second = fastapi.UploadFile(io.BytesIO(b"audio"), filename="second.wav")
+
+    first_task = asyncio.ensure_future(controller.transcribe(first))
+    await converting.wait()
+    second_task = asyncio.ensure_future(controller.transcribe(second))
+    await asyncio.sleep(0)
+    await first.close()
+    first_closed.set()
+
+    assert await first_task == await second_task == "transcription"
+    mock_stt_run.assert_awaited_once_with(b"audio", filename="audio.mp3")
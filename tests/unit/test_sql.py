@@ -29,9 +29,7 @@ def mock_session_factory(
     """Fixture for creating a mocked session factory."""
     session_factory = mocker.patch("sqlalchemy.orm.sessionmaker")
     session_factory.return_value = mocker.Mock(spec=sessionmaker)
-    scoped_session_factory = mocker.patch("sqlalchemy.orm.scoped_session")
-    scoped_session_factory.return_value = session_factory.return_value
-    return scoped_session_factory
+    return session_factory
 
 
 @pytest.fixture()
@@ -86,12 +84,63 @@ def test_get_db_url(
 def test_get_session(mocker: pytest_mock.MockFixture) -> None:
     """Test that a session is provided properly."""
     mock_session = mocker.MagicMock()
-    mock_scoped_session = mocker.patch("sqlalchemy.orm.scoped_session")
-    mock_scoped_session.return_value = mocker.MagicMock(return_value=mock_session)
-    db_instance = sql.Database()
-    db_instance.session_factory = mock_scoped_session
+    mock_database = mocker.patch.object(sql, "get_database")
+    mock_database.return_value.session_factory.return_value = mock_session
 
     session_generator = sql.get_session()
     session = next(session_generator)
 
     assert session == mock_session
+
+
+def test_get_session_closes_session(mocker: pytest_mock.MockFixture) -> None:
+    """Test that the session is closed once the request is finished."""
+    mock_session = mocker.MagicMock()
+    mock_database = mocker.patch.object(sql, "get_database")
+    mock_database.return_value.session_factory.return_value = mock_session
+
+    session_generator = sql.get_session()
+    next(session_generator)
+    with pytest.raises(StopIteration):
+        next(session_generator)
+
+    mock_session.close.assert_called_once()
+
+
+def test_get_database_is_shared() -> None:
+    """Test that the database engine is created once per process."""
+    sql.dispose_database()
+
+    first = sql.get_database()
+    second = sql.get_database()
+
+    assert first is second
+    assert first.engine is second.engine
+
+
+def test_dispose_database(mocker: pytest_mock.MockFixture) -> None:
+    """Test that disposing releases the pool and the cached instance."""
+    first = sql.get_database()
+    mock_dispose = mocker.patch.object(first, "dispose")
+
+    sql.dispose_database()
+
+    mock_dispose.assert_called_once()
+    assert sql.get_database() is not first
+
+
+def test_database_pool_settings(mocker: pytest_mock.MockFixture) -> None:
+    """Test that the pool settings are passed to the engine."""
+    mocker.patch("linguaweb_api.microservices.sql.ENVIRONMENT", "production")
+    mock_create_engine = mocker.patch("sqlalchemy.create_engine")
+
+    sql.Database()
+
+    _, kwargs = mock_create_engine.call_args
+    assert kwargs["pool_size"] == sql.SQL_POOL_SIZE
+    assert kwargs["max_overflow"] == sql.SQL_MAX_OVERFLOW
+    assert kwargs["pool_recycle"] == sql.SQL_POOL_RECYCLE
+    assert kwargs["pool_pre_ping"] == sql.SQL_POOL_PRE_PING
+    assert kwargs["connect_args"] == {
+        "options": f"-c statement_timeout={sql.SQL_STATEMENT_TIMEOUT}",
+    }
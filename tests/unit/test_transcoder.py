@@ -0,0 +1,232 @@
+"""Unit tests for the transcoder module."""
+import array
+import asyncio
+import io
+import math
+import pathlib
+import wave
+from collections import abc
+
+import fastapi
+import ffmpeg
+import pytest
+from fastapi import status
+
+from linguaweb_api.core import config
+from linguaweb_api.microservices import transcoder
+
+
+def _wav(
+    seconds_of_silence: float = 1,
+    seconds_of_tone: float = 0,
+    channels: int = 1,
+    rate: int = 16000,
+) -> bytes:
+    """Returns a tone surrounded by silence as WAV."""
+    silence = [0] * int(seconds_of_silence * rate * channels)
+    tone = [
+        int(10000 * math.sin(index / 10))
+        for index in range(int(seconds_of_tone * rate * channels))
+    ]
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(array.array("h", silence + tone + silence).tobytes())
+    return buffer.getvalue()
+
+
+async def _chunks(data: bytes, size: int = 4096) -> abc.AsyncIterator[bytes]:
+    """Yields the data in chunks."""
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+async def _stalled() -> abc.AsyncIterator[bytes]:
+    """Yields nothing until cancelled."""
+    await asyncio.sleep(10)
+    yield b""
+
+
+@pytest.mark.asyncio()
+async def test_transcode_to_mp3() -> None:
+    """Test that audio is converted to MP3 through pipes."""
+    output = await transcoder.transcode(_chunks(_wav()))
+
+    assert output.startswith((b"ID3", b"\xff"))
+
+
+@pytest.mark.asyncio()
+async def test_speech_profile_reduces_size() -> None:
+    """Test that the speech profile encodes stereo audio much smaller."""
+    audio = _wav(seconds_of_tone=2, channels=2, rate=44100)
+
+    default = await transcoder.transcode(
+        _chunks(audio),
+        config.AudioProfiles.DEFAULT,
+    )
+    speech = await transcoder.transcode(_chunks(audio), config.AudioProfiles.SPEECH)
+
+    assert len(speech) < len(default) / 2
+
+
+@pytest.mark.asyncio()
+async def test_trimmed_profile_removes_silence() -> None:
+    """Test that leading and trailing silence is trimmed."""
+    audio = _wav(seconds_of_silence=3, seconds_of_tone=1)
+
+    speech = await transcoder.transcode(_chunks(audio), config.AudioProfiles.SPEECH)
+    trimmed = await transcoder.transcode(
+        _chunks(audio),
+        config.AudioProfiles.SPEECH_TRIMMED,
+    )
+
+    assert len(trimmed) < len(speech) / 3
+
+
+@pytest.mark.asyncio()
+async def test_trimmed_profile_keeps_silent_audio() -> None:
+    """Test that audio of only silence is still converted to valid audio."""
+    output = await transcoder.transcode(
+        _chunks(_wav()),
+        config.AudioProfiles.SPEECH_TRIMMED,
+    )
+
+    assert output.startswith((b"ID3", b"\xff"))
+    assert len(output) > 100  # noqa: PLR2004
+
+
+@pytest.mark.parametrize(
+    ("profile", "expected_filters"),
+    [
+        (config.AudioProfiles.DEFAULT, False),
+        (config.AudioProfiles.SPEECH, False),
+        (config.AudioProfiles.SPEECH_TRIMMED, True),
+    ],
+)
+def test_ffmpeg_arguments(
+    profile: config.AudioProfiles,
+    expected_filters: bool,
+) -> None:
+    """Test that only the trimmed profile filters the audio."""
+    arguments = transcoder.ffmpeg_arguments(profile)
+
+    assert ("-filter_complex" in arguments) == expected_filters
+    assert ("16000" in arguments) == (profile != config.AudioProfiles.DEFAULT)
+
+
+@pytest.mark.asyncio()
+async def test_transcode_invalid_audio() -> None:
+    """Test that input ffmpeg cannot decode raises a 400."""
+    with pytest.raises(fastapi.HTTPException) as exception_info:
+        await transcoder.transcode(_chunks(b"not audio"))
+
+    assert exception_info.value.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio()
+async def test_transcoder_metrics() -> None:
+    """Test that conversions are counted and timed."""
+    instance = transcoder.Transcoder(workers=2, queue_size=2, timeout=10)
+
+    await asyncio.gather(*[instance.transcode(_chunks(_wav())) for _ in range(3)])
+
+    expected_completed = 3
+    assert instance.completed == expected_completed
+    assert instance.running == 0
+    assert instance.waiting == 0
+    assert instance.queue_seconds > 0
+    assert instance.conversion_seconds > 0
+
+
+@pytest.mark.asyncio()
+async def test_transcoder_rejects_when_queue_is_full() -> None:
+    """Test that conversions beyond the queue size get a 503."""
+    instance = transcoder.Transcoder(workers=1, queue_size=1, timeout=10)
+    running = asyncio.create_task(instance.transcode(_stalled()))
+    queued = asyncio.create_task(instance.transcode(_chunks(_wav())))
+    await asyncio.sleep(0.1)
+
+    with pytest.raises(fastapi.HTTPException) as exception_info:
+        await instance.transcode(_chunks(_wav()))
+
+    running.cancel()
+    await asyncio.gather(running, queued, return_exceptions=True)
+    assert exception_info.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert instance.rejected == 1
+    assert instance.completed == 1
+
+
+@pytest.mark.asyncio()
+async def test_transcoder_timeout() -> None:
+    """Test that a conversion running past the timeout is abandoned."""
+    instance = transcoder.Transcoder(workers=1, queue_size=1, timeout=0.1)
+
+    with pytest.raises(fastapi.HTTPException) as exception_info:
+        await instance.transcode(_stalled())
+
+    assert exception_info.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert instance.failed == 1
+    assert instance.running == 0
+
+
+@pytest.mark.asyncio()
+async def test_decode_to_pcm() -> None:
+    """Test that streamed audio is decoded to 16 kHz mono PCM."""
+    pcm = b"".join(
+        [chunk async for chunk in transcoder.decode(_chunks(_wav(rate=44100)), 16000)],
+    )
+
+    assert len(pcm) == 2 * 16000 * 2
+
+
+@pytest.mark.asyncio()
+async def test_decode_invalid_audio() -> None:
+    """Test that undecodable streams raise a 400."""
+    decoded = transcoder.decode(_chunks(b"not audio" * 100), 16000)
+
+    with pytest.raises(fastapi.HTTPException) as exception_info:
+        await anext(decoded)
+
+    assert exception_info.value.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio()
+async def test_transcoder_decode_holds_worker() -> None:
+    """Test that a stream holds a worker until it ends."""
+    instance = transcoder.Transcoder(workers=1, queue_size=0, timeout=10)
+    decoded = instance.decode(_chunks(_wav()), 16000)
+
+    await anext(decoded)
+    running = instance.running
+    with pytest.raises(fastapi.HTTPException) as exception_info:
+        await instance.transcode(_chunks(_wav()))
+    async for _ in decoded:
+        pass
+
+    assert running == 1
+    assert exception_info.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert instance.running == 0
+    assert instance.completed == 1
+
+
+@pytest.fixture()
+def m4a_file(tmp_path: pathlib.Path) -> pathlib.Path:
+    """Returns the path to 30 seconds of M4A audio with its index at the end."""
+    path = tmp_path / "audio.m4a"
+    ffmpeg.input("sine=duration=30", f="lavfi").output(
+        str(path),
+        acodec="aac",
+    ).run(quiet=True)
+    return path
+
+
+@pytest.mark.asyncio()
+async def test_transcode_file_seeks_in_mp4(m4a_file: pathlib.Path) -> None:
+    """Test that MP4 with its index at the end converts from a file, not a pipe."""
+    piped = await transcoder.transcode(_chunks(m4a_file.read_bytes()))
+
+    output = await transcoder.transcode_file(m4a_file)
+
+    assert len(output) > 100 * len(piped)
@@ -0,0 +1,97 @@
+"""Unit tests for the voice activity detection module."""
+import array
+import io
+import math
+import wave
+
+from linguaweb_api.core import vad
+
+THRESHOLD = 500
+
+
+def _pcm(*parts: tuple[float, bool]) -> bytes:
+    """Returns 16 kHz PCM of consecutive parts of tone or silence."""
+    samples: list[int] = []
+    for seconds, voiced in parts:
+        count = int(seconds * vad.SAMPLE_RATE)
+        if voiced:
+            samples.extend(int(10000 * math.sin(index / 10)) for index in range(count))
+        else:
+            samples.extend([0] * count)
+    return array.array("h", samples).tobytes()
+
+
+def _segmenter() -> vad.VoiceActivitySegmenter:
+    """Returns a segmenter that ends segments after half a second of silence."""
+    return vad.VoiceActivitySegmenter(threshold=THRESHOLD, min_silence=0.5)
+
+
+def test_splits_at_pauses() -> None:
+    """Test that speech is split at pauses longer than the minimal silence."""
+    segmenter = _segmenter()
+
+    segments = segmenter.feed(_pcm((0.5, False), (1, True), (1, False), (1, True)))
+    last_segment = segmenter.flush()
+
+    assert len(segments) == 1
+    assert last_segment is not None
+    assert 1 < len(segments[0]) / (vad.SAMPLE_RATE * vad.SAMPLE_WIDTH) < 2  # noqa: PLR2004
+
+
+def test_short_pauses_do_not_split() -> None:
+    """Test that pauses shorter than the minimal silence do not end a segment."""
+    segmenter = _segmenter()
+
+    segments = segmenter.feed(_pcm((1, True), (0.2, False), (1, True)))
+
+    assert segments == []
+    assert segmenter.flush() is not None
+
+
+def test_feed_in_small_chunks() -> None:
+    """Test that the segments do not depend on the size of the chunks."""
+    pcm = _pcm((1, True), (1, False), (1, True), (1, False))
+    whole = _segmenter().feed(pcm)
+    segmenter = _segmenter()
+
+    chunked = [
+        segment
+        for start in range(0, len(pcm), 1000)
+        for segment in segmenter.feed(pcm[start : start + 1000])
+    ]
+
+    assert chunked == whole
+    assert len(chunked) == 2  # noqa: PLR2004
+
+
+def test_silence_and_clicks_are_dropped() -> None:
+    """Test that silence and very short sounds do not produce segments."""
+    segmenter = _segmenter()
+
+    segments = segmenter.feed(_pcm((1, False), (0.05, True), (1, False)))
+
+    assert segments == []
+    assert segmenter.flush() is None
+
+
+def test_max_segment_duration() -> None:
+    """Test that continuous speech is split at the maximum segment duration."""
+    segmenter = vad.VoiceActivitySegmenter(
+        threshold=THRESHOLD,
+        min_silence=0.5,
+        max_segment=1,
+    )
+
+    segments = segmenter.feed(_pcm((2.5, True)))
+
+    assert len(segments) == 2  # noqa: PLR2004
+
+
+def test_to_wav() -> None:
+    """Test that PCM is wrapped in a readable WAV container."""
+    pcm = _pcm((1, True))
+
+    with wave.open(io.BytesIO(vad.to_wav(pcm))) as wav:
+        assert wav.getnchannels() == 1
+        assert wav.getframerate() == vad.SAMPLE_RATE
+        assert wav.readframes(wav.getnframes()) == pcm